@@ -1,15 +1,54 @@
 import os
 import asyncio
+import logging
+import threading
 from contextvars import ContextVar
 from mcp.server.fastmcp import FastMCP
-from markitdown import MarkItDown
-from utils.pdf_converter import PyMuPdfConverter
+from utils import coordination
+from utils.ttl_registry import TTLRegistry
+
+logger = logging.getLogger(__name__)
 
 mcp = FastMCP(name="buildin_tools", json_response=False, stateless_http=False)
 
 # ── 全域 MarkItDown 單例（避免每次呼叫重新初始化 requests.Session / magika.Magika）──
-_md = MarkItDown(enable_plugins=True)
-_md.register_converter(PyMuPdfConverter(), priority=-1.0)  # 優先於 pdfminer（priority 越小越先執行），修正 CJK 亂碼
+# markitdown 連同全部 converter 載入很慢，延遲到第一次 read_file 轉檔（或背景預熱）時才建立
+_md = None
+_md_lock = threading.Lock()
+
+
+def get_markitdown():
+    """取得 MarkItDown 單例（同步，首次呼叫會 import markitdown，請在 thread 內呼叫）。"""
+    global _md
+    if _md is None:
+        with _md_lock:
+            if _md is None:
+                from markitdown import MarkItDown
+                from utils.pdf_converter import PyMuPdfConverter
+
+                md = MarkItDown(enable_plugins=True)
+                md.register_converter(PyMuPdfConverter(), priority=-1.0)  # 優先於 pdfminer（priority 越小越先執行），修正 CJK 亂碼
+                _md = md
+    return _md
+
+
+def warm_up() -> None:
+    """預先載入工具用到的重量級套件（同步，於背景 thread 執行），缺少或載入失敗的套件略過。"""
+    import importlib
+
+    for name in ("yt_dlp", "PIL.Image", "defusedxml.minidom", "pygments.lexers"):
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+        except Exception:
+            logger.warning("[warm_up] 載入 %s 失敗", name, exc_info=True)
+    try:
+        get_markitdown()
+    except ImportError:
+        pass
+    except Exception:
+        logger.warning("[warm_up] 建立 MarkItDown 失敗", exc_info=True)
 
 # ── Session Context (contextvars，取代 FastMCP Context) ──
 _session_ctx: ContextVar[dict] = ContextVar(
@@ -17,20 +56,45 @@ _session_ctx: ContextVar[dict] = ContextVar(
     default={"session_id": "", "user_id": "", "conversation_id": "", "conversation_folder": ""}
 )
 
+# 以下登記表皆為 TTLRegistry（dict 介面）：正常流程結束時由使用方移除，
+# 表單被放棄、上傳中止、session 異常結束時則於期限後由背景清除（utils.ttl_registry.start_sweeper）
+
 # ── AgentSkills session registry ──
 # 因為 buildin MCP server 是 in-process（同進程 HTTP transport），
 # 無法透過 env var 傳遞資料，改用 module-level dict 按 Chainlit session_id 儲存技能目錄。
-_session_skill_catalogs: dict[str, str] = {}
+# value 為 name → SkillInfo 查詢表（註冊時解析一次，activate_skill 不再每次反序列化 JSON）
+# session 使用中每次查詢都會延長期限，閒置超過 12 小時才清除
+_session_skill_catalogs = TTLRegistry("session_skill_catalogs", ttl=12 * 3600, maxsize=10000, sliding=True)
+
+
+def _expire_form(session_id: str, entry: dict) -> None:
+    # 被淘汰時仍在等待的 ask_user_question 視同使用者取消
+    entry["result"]["cancelled"] = True
+    entry["event"].set()
+
+
+def _expire_pptx_upload(pptx_id: str, entry: dict) -> None:
+    # 讓仍在等待的 render_pptx / _handle_render_pptx 醒來並回報失敗
+    if "event" in entry and not entry["event"].is_set():
+        entry["result"]["success"] = False
+        entry["result"]["error"] = entry["result"].get("error") or "等待逾時"
+        entry["event"].set()
+    if "png_event" in entry and not entry["png_event"].is_set():
+        entry["png_result"]["success"] = False
+        entry["png_result"]["error"] = entry["png_result"].get("error") or "等待逾時"
+        entry["png_event"].set()
+
 
 # ── 動態表單等待機制 ──
 # key: Chainlit session_id（cl.user_session.get('id')，不是 conversation_id）
 # value: {"form_id": str, "event": asyncio.Event, "result": dict,
 #         "elem_id": str|None, "msg_id": str|None, "original_props": dict}
-_pending_forms: dict[str, dict] = {}
+# ask_user_question 最多等待 600 秒，期限略長於此
+_pending_forms = TTLRegistry("pending_forms", ttl=660, maxsize=10000, on_expire=_expire_form)
 
 # ── HTML Render 暫存機制 ──
 # key: Chainlit session_id，value: {"artifact_id": str, "html_code": str, "title": str}
-_pending_renders: dict[str, dict] = {}
+_pending_renders = TTLRegistry("pending_renders", ttl=600, maxsize=1000)
 
 # ── PPTX 上傳等待機制 ──
 # key: pptx_id（全域唯一），value: {
@@ -39,11 +103,48 @@ _pending_renders: dict[str, dict] = {}
 #   "result":     {"success": bool, "error": str},
 #   "png_result": {"success": bool, "error": str, "slide_count": int},
 # }
-_pptx_upload_events: dict[str, dict] = {}
+# render_pptx 最多等待 30 + 120 秒
+_pptx_upload_events = TTLRegistry("pptx_upload_events", ttl=300, maxsize=1000, on_expire=_expire_pptx_upload)
+
+
+def _on_pptx_upload_signal(pptx_id: str, payload: dict) -> bool:
+    """routers/pptx_preview 以 coordination.signal("pptx_upload", ...) 通知上傳進度（可能來自其他 worker）。
+
+    payload["stage"]：saved（.pptx 已存檔）、png（開頭縮圖就緒或失敗）、abort（前端中止）。
+    """
+    entry = _pptx_upload_events.get(pptx_id)
+    if entry is None:
+        return False
+    stage = payload.get("stage")
+    if stage == "saved":
+        entry["result"]["success"] = True
+        if "event" in entry:
+            entry["event"].set()
+    elif stage == "png":
+        if "png_event" in entry and not entry["png_event"].is_set():
+            entry["png_result"]["success"] = payload.get("success", False)
+            entry["png_result"]["error"] = payload.get("error", "")
+            entry["png_result"]["slide_count"] = payload.get("slide_count", 0)
+            entry["png_result"]["ready_count"] = payload.get("ready_count", 0)
+            entry["png_event"].set()
+    elif stage == "abort":
+        error = payload.get("error") or "前端中止"
+        entry["result"]["success"] = False
+        entry["result"]["error"] = error
+        if "event" in entry:
+            entry["event"].set()
+        if "png_event" in entry and not entry["png_event"].is_set():
+            entry["png_result"]["success"] = False
+            entry["png_result"]["error"] = error
+            entry["png_event"].set()
+    return True
+
+
+coordination.subscribe("pptx_upload", _on_pptx_upload_signal)
 
 # ── Markdown Render 暫存機制 ──
 # key: Chainlit session_id，value: {"md_id": str, "markdown_content": str, "title": str, "file_path": str}
-_pending_md_renders: dict[str, dict] = {}
+_pending_md_renders = TTLRegistry("pending_md_renders", ttl=600, maxsize=1000)
 
 
 def get_conversation_folder() -> str:
@@ -4,13 +4,16 @@ from agent_tools._context import mcp, _session_skill_catalogs
 from utils.skills_manager import (
     _parse_frontmatter as _pfm,
     discover_skills as _discover_skills,
-    skills_to_json as _s2j,
+    invalidate_skill as _invalidate_skill,
+    refresh_skill as _refresh_skill,
+    skills_from_json as _sfj,
+    skills_index as _skills_index,
 )
 
 
 def register_session_skills(session_id: str, skills_json: str):
     """在 on_chat_start 時將該 session 的技能目錄（JSON）註冊進來。"""
-    _session_skill_catalogs[session_id] = skills_json
+    _session_skill_catalogs[session_id] = _skills_index(_sfj(skills_json))
 
 
 def unregister_session_skills(session_id: str):
@@ -81,11 +84,24 @@ def _validate_skill_frontmatter(metadata: dict, skill_dir_name: str) -> list[str
     return errors
 
 
+def _skill_root(target_abs: str, user_skills_abs: str) -> str:
+    """回傳 target_abs 所屬的技能目錄（user_skills_abs 下的第一層子目錄）。"""
+    rel = os.path.relpath(target_abs, user_skills_abs)
+    return os.path.join(user_skills_abs, rel.split(os.sep, 1)[0])
+
+
+def invalidate_skill_path(target_abs: str, user_skills_abs: str) -> None:
+    """技能目錄內任何檔案寫入或刪除後呼叫：activate_skill 的快取版本只涵蓋 SKILL.md 與資源目錄第一層，
+    更深層的資源新增 / 刪除需主動丟棄快取。"""
+    _invalidate_skill(_skill_root(target_abs, user_skills_abs))
+
+
 async def _write_skill_file(target_abs: str, user_skills_abs: str, content: str, session_id: str, user_id: str) -> str:
     from agent_tools._path_utils import _PROJECT_ROOT
     os.makedirs(os.path.dirname(target_abs), exist_ok=True)
     with open(target_abs, "w", encoding="utf-8") as f:
         f.write(content)
+    invalidate_skill_path(target_abs, user_skills_abs)
 
     fname = os.path.basename(target_abs)
     if fname not in ("SKILL.md", "skill.md"):
@@ -102,9 +118,10 @@ async def _write_skill_file(target_abs: str, user_skills_abs: str, content: str,
     if errors:
         return "SKILL.md 驗證失敗，請修正以下錯誤後重新寫入：\n" + "\n".join(f"- {e}" for e in errors)
 
+    _refresh_skill(os.path.dirname(target_abs))
     updated_skills = _discover_skills(user_id)
     if session_id:
-        _session_skill_catalogs[session_id] = _s2j(updated_skills)
+        _session_skill_catalogs[session_id] = _skills_index(updated_skills)
 
     skill_name = metadata["name"]
     return (
@@ -2,24 +2,26 @@ import os
 import asyncio
 import json
 import uuid
+import time
 import aiofiles
 from pathlib import Path
 from pydantic import Field
 from agent_tools._context import mcp, _session_ctx, _pending_md_renders, get_conversation_folder
 from agent_tools._path_utils import _resolve_file_path, _resolve_user_path, _check_path_in_allowed_roots, _PROJECT_ROOT
 from agent_tools._edit_utils import _apply_edit
-from agent_tools._skill_utils import _write_skill_file
+from agent_tools._skill_utils import _write_skill_file, invalidate_skill_path
 from utils.user_profile import (
     get_user_profile_dir, get_user_memory_dir, get_user_skills_dir,
     get_conversation_artifacts_dir,
 )
 from utils.signed_url import fix_md_relative_paths
 from utils.file_handler import _get_text_file_info
+from utils import search_index, search_executor
 from utils.memory_manager import (
     write_memory_file, write_memory_index,
     validate_memory_path, list_memory_files,
 )
-from agent_tools._context import _md, _list_conversation_files
+from agent_tools._context import get_markitdown, _list_conversation_files
 
 
 @mcp.tool()
@@ -94,7 +96,9 @@ async def read_file(
         )
 
     try:
-        result = await asyncio.to_thread(_md.convert, abs_path, extract_pages=True)
+        result = await asyncio.to_thread(
+            lambda: get_markitdown().convert(abs_path, extract_pages=True)
+        )
     except FileNotFoundError:
         return f"檔案不存在：{filename}"
     except Exception as e:
@@ -121,6 +125,7 @@ async def read_file(
                 with open(saved_path, 'w', encoding='utf-8') as f:
                     f.write(full_text)
             await asyncio.to_thread(_write)
+            await asyncio.to_thread(search_index.notify_changed, saved_path)
         persist_note = (
             f"[完整轉換結果已儲存至：{os.path.basename(saved_path)}（共 {total} 行，{total_chars:,} 字元）]\n"
             f"可使用 read_file 指定 start_line/end_line 分段讀取。\n\n"
@@ -208,8 +213,11 @@ async def write_file(
     if target_abs.startswith(memory_dir_abs + os.sep) or target_abs == memory_dir_abs:
         filename = os.path.basename(target_abs)
         if filename == "MEMORY.md":
-            return write_memory_index(user_id, content)
-        return write_memory_file(user_id, filename, content)
+            result = write_memory_index(user_id, content)
+        else:
+            result = write_memory_file(user_id, filename, content)
+        await asyncio.to_thread(search_index.notify_changed, target_abs)
+        return result
 
     user_skills_abs = os.path.realpath(get_user_skills_dir(user_id))
     if target_abs.startswith(user_skills_abs + os.sep):
@@ -222,6 +230,7 @@ async def write_file(
         content = fix_md_relative_paths(content, target_abs)
     with open(target_abs, "w", encoding="utf-8") as f:
         f.write(content)
+    await asyncio.to_thread(search_index.notify_changed, target_abs)
 
     is_text, lang = _get_text_file_info(os.path.basename(target_abs))
     if is_text and session_id:
@@ -284,6 +293,24 @@ async def grep_files(
     if not _check_path_in_allowed_roots(target_abs, [conv_abs, memory_dir_abs]):
         return "存取拒絕：只能搜尋對話資料夾或記憶目錄。"
 
+    try:
+        flags = re.IGNORECASE if ignore_case else 0
+        regex = re.compile(pattern, flags)
+    except re.error as e:
+        return f"正則表達式錯誤：{e}"
+
+    # 索引以對話資料夾 / 記憶目錄為單位，搜尋與驗證全部在 thread 內執行，不佔用 event loop
+    index_root = memory_dir_abs if _check_path_in_allowed_roots(target_abs, [memory_dir_abs]) else conv_abs
+    return await asyncio.to_thread(
+        _grep_sync, regex, pattern, ignore_case, path, target_abs, glob, index_root,
+        conv_abs, memory_dir_abs, context_lines, head_limit, offset,
+    )
+
+
+def _grep_sync(
+    regex, pattern: str, ignore_case: bool, path: str, target_abs: str, glob: str, index_root: str,
+    conv_abs: str, memory_dir_abs: str, context_lines: int, head_limit: int, offset: int,
+) -> str:
     target_path = Path(target_abs)
     if target_path.is_file():
         files = [target_path]
@@ -295,38 +322,16 @@ async def grep_files(
     if not files:
         return f"沒有找到符合 '{glob}' 的檔案。"
 
-    try:
-        flags = re.IGNORECASE if ignore_case else 0
-        regex = re.compile(pattern, flags)
-    except re.error as e:
-        return f"正則表達式錯誤：{e}"
-
-    all_output_lines: list[str] = []
-    total_matches = 0
+    # 建索引與搜尋共用同一個時間預算；預算用完時其餘檔案不建索引、直接交給 worker 全掃描
+    deadline = time.monotonic() + search_executor.TIME_BUDGET
+    index = search_index.get_index(index_root)
+    trigrams = search_index.required_trigrams(pattern, ignore_case)
 
+    tasks: list[search_executor.FileTask] = []
     for file_path in files:
-        try:
-            text = file_path.read_text(encoding="utf-8", errors="replace")
-        except OSError:
+        ranges = index.candidate_ranges(str(file_path), trigrams, deadline)
+        if ranges == []:
             continue
-
-        lines = text.splitlines()
-        file_match_blocks = []
-
-        for lineno, line in enumerate(lines, start=1):
-            if regex.search(line):
-                total_matches += 1
-                start = max(0, lineno - 1 - context_lines)
-                end = min(len(lines), lineno + context_lines)
-                file_match_blocks.append({
-                    "match_line": lineno,
-                    "start": start + 1,
-                    "lines": lines[start:end],
-                })
-
-        if not file_match_blocks:
-            continue
-
         try:
             rel = file_path.relative_to(Path(conv_abs))
         except ValueError:
@@ -334,19 +339,23 @@ async def grep_files(
                 rel = file_path.relative_to(Path(memory_dir_abs).parent)
             except ValueError:
                 rel = file_path
-
-        all_output_lines.append(str(rel).replace("\\", "/"))
-        prev_end = -1
-        for block in file_match_blocks:
-            if prev_end != -1 and block["start"] > prev_end + 1:
-                all_output_lines.append("--")
-            for i, ln in enumerate(block["lines"]):
-                lno = block["start"] + i
-                prefix = ">" if lno == block["match_line"] else " "
-                all_output_lines.append(f"  {prefix}{lno:4d}: {ln}")
-            prev_end = block["start"] + len(block["lines"]) - 1
-        all_output_lines.append("")
-
+        tasks.append(search_executor.FileTask(str(file_path), str(rel).replace("\\", "/"), ranges))
+
+    # 分頁所需的輸出行數填滿後即停止（多取 1 行以判斷是否還有後續）
+    needed = offset + head_limit + 1 if head_limit > 0 else None
+    outcome = search_executor.search(
+        regex.pattern, regex.flags, tasks, context_lines, needed,
+        budget=max(deadline - time.monotonic(), 0.0),
+    )
+    all_output_lines = outcome.lines
+    total_matches = outcome.total_matches
+    stopped_early = outcome.stopped_early
+
+    if outcome.timed_out and total_matches == 0:
+        return (
+            f"搜尋逾時（超過 {search_executor.TIME_BUDGET:g} 秒，停在 {outcome.current_file}），未找到匹配。"
+            "請縮小 path / glob 範圍，或簡化正則表達式（避免 (a+)+ 這類巢狀重複）。"
+        )
     if total_matches == 0:
         return f"沒有找到符合 '{pattern}' 的內容。"
 
@@ -357,7 +366,17 @@ async def grep_files(
         windowed = windowed[:head_limit]
         truncated = True
 
-    summary_parts = [f"共 {total_matches} 個匹配，輸出 {total_lines} 行"]
+    if outcome.timed_out:
+        summary_parts = [
+            f"搜尋逾時（超過 {search_executor.TIME_BUDGET:g} 秒，停在 {outcome.current_file}），"
+            f"以下為部分結果：至少 {total_matches} 個匹配"
+        ]
+    elif stopped_early:
+        summary_parts = [f"至少 {total_matches} 個匹配（已取得本頁所需結果，未掃描全部檔案）"]
+    else:
+        summary_parts = [f"共 {total_matches} 個匹配，輸出 {total_lines} 行"]
+    if outcome.skipped_binary:
+        summary_parts.append(f"略過 {outcome.skipped_binary} 個二進位檔")
     if truncated:
         shown_end = offset + head_limit
         summary_parts.append(f"已截斷（顯示第 {offset + 1}–{shown_end} 行）；用 offset={shown_end} 取得後續結果")
@@ -416,8 +435,11 @@ async def edit_file(
         if error:
             return f"編輯失敗：{error}"
         if filename == "MEMORY.md":
-            return write_memory_index(user_id, new_content)
-        return write_memory_file(user_id, filename, new_content)
+            result = write_memory_index(user_id, new_content)
+        else:
+            result = write_memory_file(user_id, filename, new_content)
+        await asyncio.to_thread(search_index.notify_changed, abs_path)
+        return result
 
     if target_abs.startswith(user_skills_abs + os.sep):
         if not os.path.isfile(target_abs):
@@ -446,6 +468,7 @@ async def edit_file(
 
     async with aiofiles.open(target_abs, "w", encoding="utf-8") as f:
         await f.write(new_content)
+    await asyncio.to_thread(search_index.notify_changed, target_abs)
 
     if target_abs.endswith(".md") and session_id:
         md_id = f"md_{uuid.uuid4().hex[:8]}"
@@ -494,6 +517,7 @@ async def delete_file(
         if not os.path.exists(filepath):
             return f"記憶檔案不存在：{filename}"
         os.remove(filepath)
+        search_index.notify_deleted(filepath)
         return f"已刪除記憶檔案：{filename}（請記得更新 MEMORY.md）"
 
     if target_abs.startswith(profile_dir_abs + os.sep):
@@ -502,11 +526,16 @@ async def delete_file(
         parent = os.path.dirname(target_abs)
         if os.path.realpath(parent) == profile_dir_abs:
             return f"存取拒絕：不能刪除第一層目錄 {os.path.basename(target_abs)}/。"
+        user_skills_abs = os.path.realpath(get_user_skills_dir(user_id))
         if os.path.isdir(target_abs):
             shutil.rmtree(target_abs)
-            return f"已刪除資料夾：{os.path.basename(target_abs)}/"
-        os.remove(target_abs)
-        return f"已刪除：{os.path.basename(target_abs)}"
+            result = f"已刪除資料夾：{os.path.basename(target_abs)}/"
+        else:
+            os.remove(target_abs)
+            result = f"已刪除：{os.path.basename(target_abs)}"
+        if target_abs.startswith(user_skills_abs + os.sep):
+            invalidate_skill_path(target_abs, user_skills_abs)
+        return result
 
     if not target_abs.startswith(conv_abs + os.sep):
         return "存取拒絕：只能刪除自己的對話資料夾或記憶目錄中的檔案。"
@@ -518,6 +547,8 @@ async def delete_file(
             return f"存取拒絕：不能刪除第一層目錄 {os.path.basename(target_abs)}/。"
     if os.path.isdir(target_abs):
         shutil.rmtree(target_abs)
+        search_index.notify_deleted(target_abs)
         return f"已刪除資料夾：{os.path.basename(target_abs)}/"
     os.remove(target_abs)
+    search_index.notify_deleted(target_abs)
     return f"已刪除：{os.path.basename(target_abs)}"
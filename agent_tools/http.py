@@ -1,10 +1,14 @@
 import os
 import json
 import time
+import uuid
+import codecs
+import aiofiles
 from pydantic import Field
 from agent_tools._context import mcp, _session_ctx, get_conversation_folder
 from agent_tools._path_utils import _resolve_file_path, _check_path_in_allowed_roots
 from utils.user_profile import get_user_profile_dir, get_conversation_artifacts_dir
+from utils.tool_formatter import TOOL_RESULT_SIZE_THRESHOLD
 
 
 def _get_internal_auth_rules() -> list[tuple[str, dict]]:
@@ -37,8 +41,13 @@ async def http_request(
     目標 URL 若符合內部服務白名單，系統自動注入 Authorization header，key 明文不對外暴露。"""
     import aiohttp
 
+    from utils.http_client import request_session
+
     ALLOWED_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
     STREAM_DISPLAY_LIMIT = 200
+    STREAM_CHUNK_SIZE = 64 * 1024
+    STREAM_UPDATE_INTERVAL = 0.25  # 秒；UI 子步驟更新節流
+    PREVIEW_CHARS = 2000
 
     method = method.upper()
     if method not in ALLOWED_METHODS:
@@ -107,45 +116,100 @@ async def http_request(
         except Exception:
             pass
 
-    full_text = ""
+    # 回應以 chunk 讀取：未超過 TOOL_RESULT_SIZE_THRESHOLD 時保留全文；超過後改寫入 artifacts/ 檔案，
+    # 記憶體只保留開頭預覽與串流顯示用的尾端字元
+    artifacts_dir = get_conversation_artifacts_dir(get_conversation_folder())
+    if stream and stream_save_filename.strip():
+        save_name = os.path.basename(stream_save_filename.strip())
+    else:
+        save_name = f"{'http_stream' if stream else 'http_response'}_{int(time.time())}_{uuid.uuid4().hex[:8]}.txt"
+    save_abs = os.path.join(artifacts_dir, save_name)
+
+    buffer: list[str] | None = []
+    buffered_chars = 0
+    total_chars = 0
+    preview = ""
+    tail = ""
+    spool = None
     try:
-        timeout = aiohttp.ClientTimeout(connect=10)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.request(
-                method, url,
-                headers=parsed_headers or None,
-                proxy=proxy,
-                **request_kwargs
-            ) as response:
-                status_line = f"HTTP {response.status} {response.reason}"
-                key_headers = list(response.headers.items())[:5]
-                header_lines = "\n".join(f"{k}: {v}" for k, v in key_headers)
-
-                if stream:
-                    async for chunk in response.content.iter_chunked(1024):
-                        decoded = chunk.decode("utf-8", errors="replace")
-                        full_text += decoded
-                        if parent_step:
-                            parent_step.output = full_text[-STREAM_DISPLAY_LIMIT:]
+        async with request_session() as session, session.request(
+            method, url,
+            headers=parsed_headers or None,
+            proxy=proxy,
+            timeout=aiohttp.ClientTimeout(connect=10),
+            **request_kwargs
+        ) as response:
+            status_line = f"HTTP {response.status} {response.reason}"
+            key_headers = list(response.headers.items())[:5]
+            header_lines = "\n".join(f"{k}: {v}" for k, v in key_headers)
+
+            try:
+                decoder = codecs.getincrementaldecoder(response.charset or "utf-8")(errors="replace")
+            except LookupError:
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+            if stream:
+                # 串流模式一律寫檔
+                os.makedirs(artifacts_dir, exist_ok=True)
+                spool = await aiofiles.open(save_abs, "w", encoding="utf-8")
+
+            last_update = 0.0
+            chunks = response.content.iter_chunked(STREAM_CHUNK_SIZE)
+            while True:
+                chunk = await anext(chunks, None)
+                text = decoder.decode(chunk or b"", final=chunk is None)
+                if text:
+                    total_chars += len(text)
+                    if len(preview) < PREVIEW_CHARS:
+                        preview += text[:PREVIEW_CHARS - len(preview)]
+                    if buffer is not None:
+                        buffer.append(text)
+                        buffered_chars += len(text)
+                    if spool is not None:
+                        await spool.write(text)
+                    if buffer is not None and buffered_chars > TOOL_RESULT_SIZE_THRESHOLD:
+                        # 超過上限：改為寫檔，釋放記憶體中的全文
+                        if spool is None:
+                            os.makedirs(artifacts_dir, exist_ok=True)
+                            spool = await aiofiles.open(save_abs, "w", encoding="utf-8")
+                            await spool.write("".join(buffer))
+                        buffer = None
+                    if parent_step:
+                        tail = (tail + text)[-STREAM_DISPLAY_LIMIT:]
+                        now = time.monotonic()
+                        if now - last_update >= STREAM_UPDATE_INTERVAL:
+                            last_update = now
+                            parent_step.output = tail
                             await parent_step.update()
-                else:
-                    full_text = await response.text()
-
-        saved_file_info = ""
-        if stream:
-            artifacts_dir = get_conversation_artifacts_dir(get_conversation_folder())
-            os.makedirs(artifacts_dir, exist_ok=True)
-            if stream_save_filename.strip():
-                save_name = os.path.basename(stream_save_filename.strip())
-            else:
-                save_name = f"http_stream_{int(time.time())}.txt"
-            save_abs = os.path.join(artifacts_dir, save_name)
-            with open(save_abs, "w", encoding="utf-8") as _f:
-                _f.write(full_text)
-            saved_file_info = f"\n[串流內容已寫入檔案：{save_name}]"
-
-        return f"{status_line}\n{header_lines}\n\n{full_text}{saved_file_info}"
+                if chunk is None:
+                    break
 
+            if parent_step and tail:
+                parent_step.output = tail
+                await parent_step.update()
     except aiohttp.ClientError as e:
         error_detail = repr(e) if not str(e) else str(e)
         return f"HTTP 請求失敗：{type(e).__name__}: {error_detail}"
+    finally:
+        if spool is not None:
+            await spool.close()
+
+    saved_file_info = ""
+    if spool is not None and stream:
+        saved_file_info = f"\n[串流內容已寫入檔案：{save_name}]"
+
+    if buffer is not None:
+        return f"{status_line}\n{header_lines}\n\n{''.join(buffer)}{saved_file_info}"
+
+    # 過大：只回傳預覽（格式與 maybe_persist_large_tool_result 一致）
+    last_nl = preview.rfind("\n")
+    preview_text = preview[:last_nl] if last_nl > PREVIEW_CHARS // 2 else preview
+    return (
+        f"{status_line}\n{header_lines}\n\n"
+        f"<tool-result-too-large>\n"
+        f"回應過大（{total_chars:,} 字元）。完整內容已儲存至：artifacts/{save_name}\n\n"
+        f"預覽（前 {PREVIEW_CHARS} 字元）：\n"
+        f"{preview_text}\n...\n"
+        f"</tool-result-too-large>"
+        f"{saved_file_info}"
+    )
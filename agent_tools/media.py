@@ -2,15 +2,21 @@ import os
 import json
 import asyncio
 import shutil
-import subprocess
 import zipfile
 from pathlib import Path
+from typing import TYPE_CHECKING
 from pydantic import Field
-import defusedxml.minidom
-from PIL import Image, ImageDraw, ImageFont
 from agent_tools._context import mcp, _session_ctx, get_conversation_folder
 from agent_tools._path_utils import _resolve_file_path, _resolve_user_path, _check_path_in_allowed_roots, _PROJECT_ROOT
 from utils.user_profile import get_user_profile_dir, get_conversation_artifacts_dir
+from utils.office_converter import convert_to_pdf, find_soffice, OfficeConversionError, OfficeConversionTimeout
+from utils.render_cache import render_cache, hash_file, make_key, copy_files
+from utils.page_rasterizer import rasterize_pdf, get_page_count
+from utils.frame_extractor import FrameRequest, extract_frames, parse_timestamp
+from utils.file_handler import _MAX_IMAGE_SIDE
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 _GRID_THUMBNAIL_WIDTH = 600
 _GRID_MAX_COLS = 6
@@ -19,6 +25,7 @@ _GRID_PADDING = 20
 _GRID_BORDER_WIDTH = 2
 _GRID_FONT_SIZE_RATIO = 0.10
 _GRID_LABEL_PADDING_RATIO = 0.4
+_SLIDE_RENDER_SCALE = 2.0
 
 
 @mcp.tool()
@@ -58,33 +65,23 @@ async def capture_video_frames(
     successful_frames = []
     errors = []
 
-    def _run_ffmpeg(ts: str, output_path: str):
-        cmd = [
-            "ffmpeg", "-y",
-            "-ss", ts,
-            "-i", video_abs,
-            "-frames:v", "1",
-            "-q:v", "2",
-            output_path,
-        ]
-        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        return proc.returncode, proc.stderr
-
-    for ts in timestamps:
-        ts_safe = ts.replace(":", "-").replace(".", "_")
-        out_filename = f"{base_name}_frame_{ts_safe}.jpg"
-        out_abs = os.path.join(artifacts_dir, out_filename)
-
+    # 所有時間點一起規劃：密集區段以單一 ffmpeg + select 擷取，稀疏點平行 seek，並在解碼時縮圖
+    frame_requests: list[FrameRequest] = []
+    for ts in dict.fromkeys(timestamps):  # 去除重複時間點，保留順序
         try:
-            returncode, stderr = await asyncio.to_thread(_run_ffmpeg, ts, out_abs)
-            if returncode == 0 and os.path.isfile(out_abs):
-                successful_frames.append((ts, out_abs))
-            else:
-                errors.append(f"{ts}: ffmpeg 失敗 — {stderr.strip()[-200:]}")
-        except subprocess.TimeoutExpired:
-            errors.append(f"{ts}: 截圖逾時")
-        except Exception as e:
+            seconds = parse_timestamp(ts)
+        except ValueError as e:
             errors.append(f"{ts}: {str(e)}")
+            continue
+        ts_safe = ts.replace(":", "-").replace(".", "_")
+        out_abs = os.path.join(artifacts_dir, f"{base_name}_frame_{ts_safe}.jpg")
+        frame_requests.append(FrameRequest(ts, seconds, out_abs))
+
+    for res in await extract_frames(video_abs, frame_requests, max_side=_MAX_IMAGE_SIDE):
+        if res.ok:
+            successful_frames.append((res.label, res.output_path))
+        else:
+            errors.append(f"{res.label}: {res.error}")
 
     summary_lines = [f"截圖完成（{len(successful_frames)} 張）："]
     frames_paths: dict[str, str] = {}
@@ -103,6 +100,8 @@ async def capture_video_frames(
 
 def _get_slide_info(pptx_path: str) -> list[dict]:
     """從 PPTX XML 讀取投影片順序與隱藏狀態。回傳 [{"name": "slide1.xml", "hidden": False}, ...]。"""
+    import defusedxml.minidom
+
     with zipfile.ZipFile(pptx_path, "r") as zf:
         rels_content = zf.read("ppt/_rels/presentation.xml.rels").decode("utf-8")
         rels_dom = defusedxml.minidom.parseString(rels_content)
@@ -128,7 +127,9 @@ def _get_slide_info(pptx_path: str) -> list[dict]:
     return slides
 
 
-def _create_hidden_placeholder(size: tuple[int, int]) -> Image.Image:
+def _create_hidden_placeholder(size: tuple[int, int]) -> "Image.Image":
+    from PIL import Image, ImageDraw
+
     img = Image.new("RGB", size, color="#F0F0F0")
     draw = ImageDraw.Draw(img)
     line_width = max(5, min(size) // 100)
@@ -144,6 +145,8 @@ def _create_thumbnail_grid(
     output_path: str,
 ) -> list[str]:
     """將投影片縮圖排列成格格圖，超出單格上限時分成多張輸出。回傳已寫出的檔案路徑清單。"""
+    from PIL import Image, ImageDraw, ImageFont
+
     font_size = int(width * _GRID_FONT_SIZE_RATIO)
     label_padding = int(font_size * _GRID_LABEL_PADDING_RATIO)
 
@@ -211,6 +214,87 @@ def _create_thumbnail_grid(
     return grid_files
 
 
+class _SlideRenderError(Exception):
+    """PDF 已產生但未能渲染出任何投影片圖片。"""
+
+
+async def _render_slide_deck(ppt_abs: str, ext: str, entry_dir: str) -> dict:
+    """轉檔並逐頁渲染至 entry_dir（render cache 的 builder）。
+
+    回傳 manifest：{"slides": [{"seq", "file", "label"}], "errors": [...], "slide_info": [...]}；
+    file 為 entry_dir 內的檔名，由呼叫端複製到 artifacts/ 並改為語意化檔名。
+    """
+    try:
+        pdf_path = await convert_to_pdf(ppt_abs, entry_dir, timeout=120)
+    except OfficeConversionError:
+        raise
+    except Exception as e:
+        raise OfficeConversionError(f"錯誤：執行 soffice 時發生例外：{str(e)}") from e
+
+    # 解析 PPTX XML 取得投影片順序與隱藏狀態（僅限 .pptx）
+    slide_info: list[dict] = []
+    if ext == ".pptx":
+        try:
+            slide_info = await asyncio.to_thread(_get_slide_info, ppt_abs)
+        except Exception:
+            slide_info = []
+
+    # 轉換 PDF 每頁（對應非隱藏投影片），由 process pool 平行渲染
+    page_count = await asyncio.to_thread(get_page_count, pdf_path)
+    visible_pngs: list[str] = [""] * page_count  # 失敗頁保留空字串，保持索引對齊
+    page_errors: dict[int, str] = {}
+    async for result in rasterize_pdf(pdf_path, entry_dir, _SLIDE_RENDER_SCALE, pages=list(range(page_count))):
+        if result.error:
+            page_errors[result.index] = f"第 {result.index + 1} 張轉換失敗：{result.error}"
+        else:
+            visible_pngs[result.index] = os.path.basename(result.path)
+
+    def _build_slides() -> dict:
+        render_errors = [page_errors[i] for i in sorted(page_errors)]
+
+        slides: list[dict] = []
+        if slide_info:
+            # 若有 XML 投影片資訊，建立含隱藏頁的完整清單
+            visible_iter = iter(p for p in visible_pngs if p)
+            placeholder_name = ""
+            for seq, info in enumerate(slide_info, start=1):
+                name = info["name"]
+                if info["hidden"]:
+                    if not placeholder_name:
+                        # 用佔位圖取代（以第一張可見圖尺寸為準，若無則預設 1920x1080）
+                        if visible_pngs and visible_pngs[0]:
+                            from PIL import Image
+
+                            with Image.open(os.path.join(entry_dir, visible_pngs[0])) as ref:
+                                placeholder_size = ref.size
+                        else:
+                            placeholder_size = (1920, 1080)
+                        placeholder_name = "hidden.png"
+                        _create_hidden_placeholder(placeholder_size).save(os.path.join(entry_dir, placeholder_name))
+                    slides.append({"seq": seq, "file": placeholder_name, "label": f"{name} (hidden)"})
+                else:
+                    try:
+                        slides.append({"seq": seq, "file": next(visible_iter), "label": name})
+                    except StopIteration:
+                        render_errors.append(f"第 {seq} 張（{name}）無對應 PNG。")
+        else:
+            # 無 XML 資訊：直接用 fitz 頁順序
+            for i, png_name in enumerate(visible_pngs):
+                if png_name:
+                    slides.append({"seq": i + 1, "file": png_name, "label": f"slide{i + 1}.xml"})
+
+        if not slides:
+            raise _SlideRenderError(f"轉換失敗，未能產生任何投影片圖片。錯誤：{render_errors}")
+        return {
+            "pdf": os.path.basename(pdf_path),
+            "slides": slides,
+            "errors": render_errors,
+            "slide_info": slide_info,
+        }
+
+    return await asyncio.to_thread(_build_slides)
+
+
 @mcp.tool()
 async def capture_ppt_slides(
     ppt_path: str = Field(description="PPT/PPTX 檔案路徑。支援：對話資料夾（如 'uploads/slides.pptx'、'artifacts/report.ppt'）、系統技能資源（如 'system_skills/pptgenjs/assets/templates/auo.pptx'）、使用者技能資源（如 'skills/mypptskill/template.pptx'）"),
@@ -243,10 +327,7 @@ async def capture_ppt_slides(
 
     回傳格式為 JSON：{"__image_files__": {slide_num_or_grid_key: abs_path}, "summary": "..."}
     """
-    import fitz  # pymupdf
-
-    soffice = shutil.which("soffice") or shutil.which("soffice.bin")
-    if not soffice:
+    if not find_soffice():
         return "錯誤：找不到 soffice（LibreOffice），請確認系統已安裝 LibreOffice 並加入 PATH。"
 
     ctx_data = _session_ctx.get()
@@ -276,119 +357,68 @@ async def capture_ppt_slides(
     os.makedirs(artifacts_dir, exist_ok=True)
     base_name = os.path.splitext(os.path.basename(ppt_abs))[0]
 
-    tmp_dir = os.path.join(artifacts_dir, f"_ppt_tmp_{base_name}")
-    os.makedirs(tmp_dir, exist_ok=True)
-
-    def _run_soffice_pdf():
-        cmd = [soffice, "--headless", "--convert-to", "pdf", "--outdir", tmp_dir, ppt_abs]
-        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-        return proc.returncode, proc.stdout, proc.stderr
-
+    # 以檔案內容 hash 查快取：同一份簡報重複檢視時不再重新轉檔與渲染
     try:
-        returncode, stdout, stderr = await asyncio.to_thread(_run_soffice_pdf)
-    except subprocess.TimeoutExpired:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
-        return "錯誤：soffice 轉換逾時（超過 120 秒）。"
-    except Exception as e:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
-        return f"錯誤：執行 soffice 時發生例外：{str(e)}"
-
-    if returncode != 0:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
-        return f"soffice 轉換失敗（return code {returncode}）：\n{stderr.strip()[-500:]}"
+        content_hash = await asyncio.to_thread(hash_file, ppt_abs)
+    except OSError as e:
+        return f"錯誤：讀取 PPT 檔案失敗：{str(e)}"
+    deck_key = make_key(content_hash, _SLIDE_RENDER_SCALE, variant=f"deck{ext}")
 
-    pdf_path = os.path.join(tmp_dir, f"{base_name}.pdf")
-    if not os.path.isfile(pdf_path):
-        shutil.rmtree(tmp_dir, ignore_errors=True)
-        return f"soffice 執行成功但未找到輸出的 PDF 檔案。\nstdout: {stdout.strip()}\nstderr: {stderr.strip()}"
-
-    # 解析 PPTX XML 取得投影片順序與隱藏狀態（僅限 .pptx）
-    slide_info: list[dict] = []
-    if ext == ".pptx":
-        try:
-            slide_info = _get_slide_info(ppt_abs)
-        except Exception:
-            slide_info = []
-
-    def _render_and_build_slides():
-        doc = fitz.open(pdf_path)
-        mat = fitz.Matrix(2.0, 2.0)
-        render_errors: list[str] = []
-
-        # 轉換 PDF 每頁（對應非隱藏投影片）
-        visible_pngs: list[str] = []
-        for i in range(doc.page_count):
-            dst_name = f"{base_name}_slide_{i + 1:03d}.png"
-            dst_abs = os.path.join(artifacts_dir, dst_name)
-            try:
-                pix = doc[i].get_pixmap(matrix=mat, alpha=False)
-                pix.save(dst_abs)
-                visible_pngs.append(dst_abs)
-            except Exception as e:
-                render_errors.append(f"第 {i + 1} 張轉換失敗：{str(e)}")
-                visible_pngs.append("")  # 保持索引對齊
-        doc.close()
-
-        # 若有 XML 投影片資訊，重新建立含隱藏頁的完整清單
-        if slide_info:
-            # 重新命名已存在的 PNG，使其對應正確的投影片編號
-            visible_iter = iter(p for p in visible_pngs if p)
-            all_slide_map: dict[int, str] = {}
-            all_slide_labels: dict[int, str] = {}
-
-            for seq, info in enumerate(slide_info, start=1):
-                name = info["name"]
-                is_hidden = info["hidden"]
-                label = f"{name} (hidden)" if is_hidden else name
-
-                if is_hidden:
-                    # 用佔位圖取代（以第一張可見圖尺寸為準，若無則預設 1920x1080）
-                    ref_path = visible_pngs[0] if visible_pngs and visible_pngs[0] else None
-                    if ref_path:
-                        with Image.open(ref_path) as ref:
-                            placeholder_size = ref.size
-                    else:
-                        placeholder_size = (1920, 1080)
-                    placeholder_img = _create_hidden_placeholder(placeholder_size)
-                    ph_name = f"{base_name}_slide_{seq:03d}.png"
-                    ph_abs = os.path.join(artifacts_dir, ph_name)
-                    placeholder_img.save(ph_abs)
-                    all_slide_map[seq] = ph_abs
-                else:
-                    try:
-                        png_path = next(visible_iter)
-                        # 若原始檔名不符，重新命名
-                        expected_name = f"{base_name}_slide_{seq:03d}.png"
-                        expected_abs = os.path.join(artifacts_dir, expected_name)
-                        if png_path != expected_abs and os.path.isfile(png_path):
-                            os.rename(png_path, expected_abs)
-                        all_slide_map[seq] = expected_abs
-                    except StopIteration:
-                        render_errors.append(f"第 {seq} 張（{name}）無對應 PNG。")
-                all_slide_labels[seq] = label
-        else:
-            # 無 XML 資訊：直接用 fitz 頁順序，重新命名為語意化檔名
-            all_slide_map = {}
-            all_slide_labels = {}
-            for i, png_path in enumerate(visible_pngs):
-                seq = i + 1
-                if not png_path:
-                    continue
-                expected_name = f"{base_name}_slide_{seq:03d}.png"
-                expected_abs = os.path.join(artifacts_dir, expected_name)
-                if png_path != expected_abs and os.path.isfile(png_path):
-                    os.rename(png_path, expected_abs)
-                all_slide_map[seq] = expected_abs
-                all_slide_labels[seq] = f"slide{seq}.xml"
-
-        return all_slide_map, all_slide_labels, render_errors
+    async def _build_deck(entry_dir: str) -> dict:
+        return await _render_slide_deck(ppt_abs, ext, entry_dir)
 
+    grid_key = make_key(content_hash, _SLIDE_RENDER_SCALE, variant=f"grid{ext}:{cols}")
     try:
-        all_slide_map, all_slide_labels, render_errors = await asyncio.to_thread(_render_and_build_slides)
+        for attempt in range(2):
+            try:
+                async with render_cache.acquire(deck_key, _build_deck) as deck:
+                    slides_meta: list[dict] = deck.manifest["slides"]
+                    render_errors: list[str] = list(deck.manifest.get("errors", []))
+                    all_slide_map: dict[int, str] = {}
+                    all_slide_labels: dict[int, str] = {}
+                    copy_pairs: list[tuple[str, str]] = []
+                    for item in slides_meta:
+                        seq = item["seq"]
+                        dst_abs = os.path.join(artifacts_dir, f"{base_name}_slide_{seq:03d}.png")
+                        copy_pairs.append((deck.file(item["file"]), dst_abs))
+                        all_slide_map[seq] = dst_abs
+                        all_slide_labels[seq] = item["label"]
+                    await asyncio.to_thread(copy_files, copy_pairs)
+
+                    grid_files: list[str] = []
+                    if grid and slides_meta:
+                        grid_slides = [(deck.file(item["file"]), item["label"]) for item in slides_meta]
+
+                        async def _build_grid(entry_dir: str) -> dict:
+                            files = await asyncio.to_thread(
+                                _create_thumbnail_grid, grid_slides, cols, _GRID_THUMBNAIL_WIDTH,
+                                os.path.join(entry_dir, "grid.jpg"),
+                            )
+                            return {"files": [os.path.basename(f) for f in files]}
+
+                        try:
+                            async with render_cache.acquire(grid_key, _build_grid) as grid_entry:
+                                grid_pairs = [
+                                    (grid_entry.file(name), os.path.join(artifacts_dir, f"{base_name}_{name}"))
+                                    for name in grid_entry.manifest["files"]
+                                ]
+                                await asyncio.to_thread(copy_files, grid_pairs)
+                                grid_files = [dst for _, dst in grid_pairs]
+                        except FileNotFoundError:
+                            raise
+                        except Exception as e:
+                            return f"錯誤：產生格格圖時發生例外：{str(e)}"
+                break
+            except FileNotFoundError:
+                # 快取目錄在讀取途中被其他 worker 淘汰：作廢後重建一次
+                if attempt or not render_cache.discard_missing(deck_key, grid_key):
+                    raise
+    except OfficeConversionTimeout:
+        return "錯誤：soffice 轉換逾時（超過 120 秒）。"
+    except (OfficeConversionError, _SlideRenderError) as e:
+        return str(e)
     except Exception as e:
         return f"錯誤：pymupdf 轉換時發生例外：{str(e)}"
-    finally:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
 
     if not all_slide_map:
         return f"轉換失敗，未能產生任何投影片圖片。錯誤：{render_errors}"
@@ -405,21 +435,7 @@ async def capture_ppt_slides(
         summary_lines.extend(render_errors)
 
     if grid:
-        # Grid 模式：合成格格圖，注入 LLM
-        grid_slides = [
-            (all_slide_map[num], all_slide_labels.get(num, f"slide{num}.xml"))
-            for num in sorted(all_slide_map.keys())
-            if os.path.isfile(all_slide_map[num])
-        ]
-        grid_output = os.path.join(artifacts_dir, f"{base_name}_grid.jpg")
-
-        try:
-            grid_files = await asyncio.to_thread(
-                _create_thumbnail_grid, grid_slides, cols, _GRID_THUMBNAIL_WIDTH, grid_output
-            )
-        except Exception as e:
-            return f"錯誤：產生格格圖時發生例外：{str(e)}"
-
+        # Grid 模式：格格圖已於上方自快取取得，注入 LLM
         summary_lines.append(f"\nGrid 縮圖（{cols} 欄）已產生，共 {len(grid_files)} 張：")
         for gf in grid_files:
             summary_lines.append(f"  artifacts/{os.path.basename(gf)}")
@@ -336,7 +336,7 @@ async def render_pptx(
         "event":      asyncio.Event(),
         "png_event":  asyncio.Event(),
         "result":     {"success": False, "error": ""},
-        "png_result": {"success": False, "error": "", "slide_count": 0},
+        "png_result": {"success": False, "error": "", "slide_count": 0, "ready_count": 0},
     }
 
     payload = {
@@ -365,8 +365,14 @@ async def render_pptx(
             _pptx_upload_events.pop(pptx_id, None)
 
     slide_count = png_entry["png_result"].get("slide_count", 0) if png_entry else 0
+    ready_count = png_entry["png_result"].get("ready_count", slide_count) if png_entry else 0
+    if ready_count < slide_count:
+        # 開頭幾頁已就緒即返回，其餘頁面在背景繼續產生
+        status = f"PNG 縮圖共 {slide_count} 張，前 {ready_count} 張已就緒，其餘陸續產生中。"
+    else:
+        status = f"PNG 縮圖共 {slide_count} 張已就緒。"
     return (
         f"[RENDER_PPTX_OK] pptx_id={pptx_id} slide_count={slide_count}\n"
-        f"簡報「{safe_title}」已渲染完成，PNG 縮圖共 {slide_count} 張已就緒。\n"
+        f"簡報「{safe_title}」已渲染完成，{status}\n"
         f"可呼叫 read_file(\"artifacts/{pptx_id}_slide_001.png\") 進行視覺確認。"
     )
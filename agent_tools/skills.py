@@ -3,9 +3,9 @@ import json
 from pydantic import Field
 from agent_tools._context import mcp, _session_ctx, _session_skill_catalogs
 from agent_tools._path_utils import _PROJECT_ROOT
-from utils.skills_manager import skills_from_json, get_skill_content
+from utils.skills_manager import get_skill_activation, RESOURCES_MAX
 
-RESOURCES_MAX = 50
+_SKILL_ENV_WHITELIST = ["BASE_URL"]
 
 
 @mcp.tool()
@@ -15,45 +15,23 @@ async def activate_skill(
     """載入指定技能的完整指令。當任務符合某個技能的描述時呼叫此工具。"""
 
     session_id = _session_ctx.get()["session_id"]
-    print('session_id', session_id)
 
-    skills_json = _session_skill_catalogs.get(session_id, "")
-    if not skills_json:
+    skill_map = _session_skill_catalogs.get(session_id)
+    if not skill_map:
         return "錯誤：此 session 無可用技能。"
 
-    skills = skills_from_json(skills_json)
-    body = get_skill_content(skill_name, skills)
+    skill = skill_map.get(skill_name)
+    activation = get_skill_activation(skill) if skill is not None else None
 
-    if body is None:
-        available = ", ".join(s.name for s in skills)
+    if activation is None:
+        available = ", ".join(skill_map)
         return f"錯誤：找不到技能 '{skill_name}'。可用技能：{available}"
 
-    skill_map = {s.name: s for s in skills}
-    skill = skill_map[skill_name]
-
-    resources = []
-    truncated = False
-    for subdir in ("scripts", "references", "assets"):
-        subdir_path = os.path.join(skill.skill_dir, subdir)
-        if os.path.isdir(subdir_path):
-            for dirpath, _dirnames, filenames in os.walk(subdir_path):
-                for fname in filenames:
-                    if len(resources) >= RESOURCES_MAX:
-                        truncated = True
-                        break
-                    abs_file = os.path.join(dirpath, fname)
-                    rel_path = os.path.relpath(abs_file, _PROJECT_ROOT).replace("\\", "/")
-                    resources.append(rel_path)
-                if truncated:
-                    break
-        if truncated:
-            break
-
-    resources_info = {"files": resources}
-    if truncated:
+    resources_info = {"files": list(activation.resources)}
+    if activation.truncated:
         resources_info["note"] = f"listing truncated, {RESOURCES_MAX}+ files in directory"
 
-    _SKILL_ENV_WHITELIST = ["BASE_URL"]
+    body = activation.body
     for _key in _SKILL_ENV_WHITELIST:
         _val = os.getenv(_key, "")
         body = body.replace(f"${{{_key}}}", _val)
@@ -2,11 +2,16 @@ import os
 import re
 import asyncio
 from pydantic import Field
-from yt_dlp import YoutubeDL
 from agent_tools._context import mcp, _session_ctx, get_conversation_folder, _list_files_internal
 from utils.user_profile import get_conversation_artifacts_dir
 
 
+def _youtube_dl(opts: dict):
+    """建立 YoutubeDL（同步，請在 thread 內呼叫）。yt_dlp 載入全部 extractor 很慢，首次使用才 import。"""
+    from yt_dlp import YoutubeDL
+    return YoutubeDL(opts)
+
+
 @mcp.tool()
 async def download_youtube(
     url: str,
@@ -42,7 +47,7 @@ async def download_youtube(
             }],
             'quiet': quiet,
         }
-        ydl = await asyncio.to_thread(YoutubeDL, ydl_opts)
+        ydl = await asyncio.to_thread(_youtube_dl, ydl_opts)
         await asyncio.to_thread(ydl.download, [url])
 
     elif content_type == 'video':
@@ -53,7 +58,7 @@ async def download_youtube(
             'restrictfilenames': True,
             'quiet': quiet,
         }
-        ydl = await asyncio.to_thread(YoutubeDL, ydl_opts)
+        ydl = await asyncio.to_thread(_youtube_dl, ydl_opts)
         await asyncio.to_thread(ydl.download, [url])
 
     elif content_type == 'subtitle':
@@ -74,7 +79,7 @@ async def download_youtube(
             'skip_download': True,
             'quiet': quiet,
         }
-        ydl = YoutubeDL(ydl_opts)
+        ydl = await asyncio.to_thread(_youtube_dl, ydl_opts)
         print("Starting: 取影片資訊")
 
         info = await asyncio.to_thread(ydl.extract_info, url, download=False)
@@ -137,7 +142,7 @@ async def list_youtube_subtitles(
         }
 
         def extract_subtitles_info():
-            with YoutubeDL(ydl_opts) as ydl:
+            with _youtube_dl(ydl_opts) as ydl:
                 info = ydl.extract_info(url, download=False)
                 return info
 
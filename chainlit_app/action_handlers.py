@@ -6,10 +6,12 @@ import aiofiles
 import chainlit as cl
 
 from agent_tools import _pending_forms
+from chainlit_app.shared_view import invalidate_shared_view
 from chainlit_app.agent import _handle_render_html, _handle_render_pptx, _handle_render_markdown, ENABLE_SESSION_HISTORY
 from utils.conversation_storage import append_ui_event
 from utils.user_profile import get_conversation_artifacts_dir
 from utils.artifact_publisher import publish_artifact
+from utils.share_manager import get_share_token_async
 from utils.signed_url import rewrite_relative_paths_in_md
 
 _PROJECT_ROOT = pathlib.Path(__file__).parent.parent
@@ -211,15 +213,7 @@ async def on_publish_artifact(action: cl.Action):
         publish_artifact, artifact_id, title, user_id, html_path,
         html_content=html_content,
         conversation_folder=conversation_folder,
-    )
-    from utils.signed_url import rewrite_html_paths_for_publish
-    rewritten_html = await asyncio.to_thread(
-        rewrite_html_paths_for_publish, html_content, token, base_url
-    )
-    await asyncio.to_thread(
-        publish_artifact, artifact_id, title, user_id, html_path,
-        html_content=rewritten_html,
-        conversation_folder=conversation_folder,
+        base_url=base_url,
     )
     public_url = f"{base_url}/p/{token}"
 
@@ -230,6 +224,11 @@ async def on_publish_artifact(action: cl.Action):
             break
     cl.user_session.set("artifact_history", history)
 
+    # 對話已分享時捨棄快照，訪客下次瀏覽即可看到公開連結（不必等 SNAPSHOT_TTL）
+    share_token = await get_share_token_async(cl.context.session.thread_id)
+    if share_token:
+        invalidate_shared_view(share_token)
+
     return {"published_url": public_url}
 
 
@@ -32,6 +32,7 @@ from utils.tool_formatter import (
 )
 from chainlit_app.file_handler import check_and_process_new_files
 from utils.signed_url import StreamingPathRewriter
+from utils import heartbeat
 from agent_tools import _pending_renders, _pending_md_renders, _pptx_upload_events
 
 logger = logging.getLogger(__name__)
@@ -61,7 +62,9 @@ async def _handle_render_html(payload: dict, send_message: bool = True):
     user = cl.user_session.get("user")
     conversation_id = cl.user_session.get("conversation_id", "")
     if user and conversation_id:
-        html_code_for_display = rewrite_html_img_paths(html_code, user.identifier, conversation_id)
+        html_code_for_display = await asyncio.to_thread(
+            rewrite_html_img_paths, html_code, user.identifier, conversation_id
+        )
     else:
         html_code_for_display = html_code
 
@@ -78,13 +81,16 @@ async def _handle_render_html(payload: dict, send_message: bool = True):
     history_meta = [{"artifact_id": h["artifact_id"], "title": h["title"]} for h in history]
 
     # 對所有 history 項目做路徑替換，以確保切換到任何版本時圖片都能正常顯示
+    # （rewrite_html_img_paths 依內容雜湊快取，未變動的版本不會重算）
     if user and conversation_id:
-        history_for_display = [
-            {**h,
-             "html_code": rewrite_html_img_paths(h["html_code"], user.identifier, conversation_id),
-             "conversation_id": conversation_id}
-            for h in history
-        ]
+        def _rewrite_history() -> list[dict]:
+            return [
+                {**h,
+                 "html_code": rewrite_html_img_paths(h["html_code"], user.identifier, conversation_id),
+                 "conversation_id": conversation_id}
+                for h in history
+            ]
+        history_for_display = await asyncio.to_thread(_rewrite_history)
     else:
         history_for_display = [
             {**h, "conversation_id": conversation_id}
@@ -177,8 +183,8 @@ async def _handle_render_pptx(payload: dict, send_message: bool = True):
     # 若有模板，寫入 registry 供 /api/pptx-preview 套用
     template_abs_path = payload.get("template_abs_path", "")
     if template_abs_path:
-        from routers.pptx_preview import _template_registry
-        _template_registry[pptx_id] = template_abs_path
+        from routers.pptx_preview import register_template
+        await register_template(pptx_id, template_abs_path)
 
     # 腳本持久化到磁碟（send_message 路徑才做，reopen 路徑跳過）
     if send_message:
@@ -568,16 +574,9 @@ async def run(message_history, initial_msg=None):
 
         ts = _ThinkingState()
 
-        async def _ws_keepalive():
-            """每 10 秒送一個空 token 到 WebSocket，防止 tool call arguments 累積期間 idle 斷線。"""
-            while True:
-                await asyncio.sleep(10)
-                try:
-                    await msg_obj.stream_token("")
-                except Exception:
-                    break
-
-        _keepalive_task = asyncio.create_task(_ws_keepalive())
+        # 閒置超過 10 秒時送一個空 token 到 WebSocket，防止 tool call arguments 累積期間 idle 斷線
+        # （由共用的心跳排程處理，有正文輸出時 touch() 延後）
+        _heartbeat = heartbeat.register(lambda: msg_obj.stream_token(""))
         try:
             async for chunk in stream:
                 # 捕獲最終用量 chunk（stream_options.include_usage=True 會在串流末尾附帶）
@@ -615,6 +614,7 @@ async def run(message_history, initial_msg=None):
                         output = rewriter.feed(token) if rewriter else token
                         if output and (output.strip() or has_streamed_content):
                             await msg_obj.stream_token(output)
+                            _heartbeat.touch()
                             has_streamed_content = True
 
                 if delta.tool_calls:
@@ -714,16 +714,14 @@ async def run(message_history, initial_msg=None):
                                             {"elements": [_md_stream_elem.to_dict()], "key": f"md_stream_{_cur_arg_len}"},
                                         )
         except asyncio.CancelledError:
-            _keepalive_task.cancel()
             raise
         except Exception as _stream_err:
-            _keepalive_task.cancel()
             err_text = _fmt_api_error("Provider 串流錯誤", _stream_err)
             logger.exception("LLM stream failed")
             await cl.Message(content=err_text).send()
             break
         finally:
-            _keepalive_task.cancel()
+            _heartbeat.close()
         # 確保 thinking step 不殘留（串流結束時若還 active 則強制關閉）
         if ts.active:
             await _handle_thinking_delta(ts, None, close_=True)
@@ -29,6 +29,7 @@ from utils.conversation_storage import (
 )
 import utils.conversation_manager as conversation_manager
 from utils.user_profile import get_conversation_artifacts_dir
+from utils import search_index
 
 # ── 本專案：Chainlit app 子模組 ──
 from chainlit_app.agent import run as agent, ENABLE_SESSION_HISTORY
@@ -74,9 +75,12 @@ async def _setup_modes():
 
 @cl.on_shared_thread_view
 async def on_shared_thread_view(thread, current_user: cl.User) -> bool:
-    """分享對話視圖 hook：重寫 elements URL 為公開路徑，並為 ArtifactChip 補充 inline 資料。"""
-    import re
-    from utils.share_manager import get_or_create_share_token
+    """分享對話視圖 hook：重寫 elements URL 為公開路徑，並為 ArtifactChip 補充 inline 資料。
+
+    改寫結果以 share token 快取（chainlit_app/shared_view.py），對話內容變動時自動重建。
+    """
+    from utils.share_manager import get_or_create_share_token_async
+    from chainlit_app.shared_view import apply_shared_view
 
     thread_id = thread.get("id", "")
     user_id = thread.get("userIdentifier", "")
@@ -87,97 +91,10 @@ async def on_shared_thread_view(thread, current_user: cl.User) -> bool:
     if not os.path.isdir(conv_folder):
         return True
 
-    share_token = await asyncio.to_thread(
-        get_or_create_share_token, thread_id, user_id, conv_folder
-    )
+    share_token = await get_or_create_share_token_async(thread_id, user_id, conv_folder)
 
     base_url = os.getenv("CHAINLIT_URL", "http://localhost:8000")
-    share_base = f"{base_url}/share/{share_token}/files"
-    # 兩種格式都需支援：
-    #   帶 host：http://localhost:8000/api/user-files/...  （user_file_url() 產生）
-    #   相對路徑：/api/user-files/...                      （rewrite_artifact_paths() 產生）
-    _user_files_abs = f"{base_url}/api/user-files"
-    _user_files_rel = "/api/user-files"
-
-    def _replace_url(url: str) -> str:
-        if not url:
-            return url
-        if url.startswith(_user_files_abs):
-            path_part = url[len(_user_files_abs):].lstrip("/")
-        elif url.startswith(_user_files_rel):
-            path_part = url[len(_user_files_rel):].lstrip("/")
-        else:
-            return url
-        for pfx in ("uploads/", "artifacts/"):
-            idx = path_part.find(pfx)
-            if idx != -1:
-                return f"{share_base}/{path_part[idx:]}"
-        return url
-
-    # 重寫 elements 的 url 欄位
-    for elem in thread.get("elements") or []:
-        if elem.get("url"):
-            elem["url"] = _replace_url(elem["url"])
-
-        # ArtifactChip：補充 inline 資料讓 reopen_artifact 可以跨用戶使用
-        if elem.get("type") == "custom" and elem.get("name") == "ArtifactChip":
-            props = elem.get("props") or {}
-            payload = props.get("payload") or {}
-
-            artifact_id = payload.get("artifact_id")
-            pptx_id = payload.get("pptx_id")
-            md_id = payload.get("md_id")
-
-            if artifact_id:
-                html_path = os.path.join(
-                    get_conversation_artifacts_dir(conv_folder),
-                    f"artifact_{artifact_id}.html",
-                )
-                if os.path.exists(html_path):
-                    try:
-                        with open(html_path, encoding="utf-8") as f:
-                            payload["html_code_inline"] = f.read()
-                        payload["is_shared"] = True
-                        try:
-                            from utils.artifact_publisher import get_published_artifact_record_by_id
-                            pub = get_published_artifact_record_by_id(artifact_id)
-                            if pub:
-                                payload["published_url"] = f"{base_url}/p/{pub.token}"
-                        except Exception:
-                            pass
-                        elem["props"] = {**props, "payload": payload}
-                    except OSError:
-                        pass
-
-            elif pptx_id:
-                if payload.get("initial_pptx_url"):
-                    payload["initial_pptx_url"] = _replace_url(payload["initial_pptx_url"])
-                slide_urls = payload.get("initial_slide_urls")
-                if isinstance(slide_urls, list):
-                    payload["initial_slide_urls"] = [_replace_url(u) for u in slide_urls]
-                if "initial_pptx_url" in payload or "initial_slide_urls" in payload:
-                    elem["props"] = {**props, "payload": payload}
-
-            elif md_id:
-                file_path = payload.get("file_path", "")
-                if file_path and os.path.exists(file_path):
-                    try:
-                        with open(file_path, encoding="utf-8") as f:
-                            payload["markdown_content_inline"] = f.read()
-                        elem["props"] = {**props, "payload": payload}
-                    except OSError:
-                        pass
-
-    # 重寫 steps output 中的 Markdown 內嵌圖片 URL（帶 host 和相對路徑兩種格式）
-    _url_pattern = re.compile(
-        r'(?:' + re.escape(_user_files_abs) + r'|' + re.escape(_user_files_rel) + r')' +
-        r'/[^\s\)"\'>\]]+'
-    )
-    for step in thread.get("steps") or []:
-        output = step.get("output", "")
-        if output and (_user_files_abs in output or _user_files_rel in output):
-            step["output"] = _url_pattern.sub(lambda m: _replace_url(m.group(0)), output)
-
+    await apply_shared_view(thread, conv_folder, share_token, base_url)
     return True
 
 @cl.on_chat_resume
@@ -276,8 +193,7 @@ async def end():
             if _conv_id:
                 _total_prompt = cl.user_session.get("accumulated_prompt_tokens", 0)
                 _total_completion = cl.user_session.get("accumulated_completion_tokens", 0)
-                await asyncio.to_thread(
-                    conversation_manager.finalize_conversation,
+                await conversation_manager.finalize_conversation_async(
                     _conv_id, len(message_history),
                     _total_prompt, _total_completion
                 )
@@ -287,6 +203,11 @@ async def end():
     if os.path.exists(chainlit_tmp):
         await asyncio.to_thread(shutil.rmtree, chainlit_tmp, ignore_errors=True)
 
+    # 釋放此對話的 grep_files 索引
+    file_folder = cl.user_session.get('file_folder')
+    if file_folder:
+        search_index.drop_index(file_folder)
+
 
 _SKILLS_TAG_OPEN  = "<agent_skills>"
 _SKILLS_TAG_CLOSE = "</agent_skills>"
@@ -448,9 +369,7 @@ async def on_message(message: cl.Message):
                 # 並行：寫入 system message（FS）+ 建立 DB 對話記錄（DB）
                 initial_history = cl.user_session.get("message_history", [])
                 system_entries = [e for e in initial_history if e["role"] == "system"]
-                db_task = asyncio.to_thread(
-                    conversation_manager.create_conversation, _pending_uid, _pending_conv
-                )
+                db_task = conversation_manager.create_conversation_async(_pending_uid, _pending_conv)
                 fs_tasks = [
                     asyncio.to_thread(
                         append_entry,
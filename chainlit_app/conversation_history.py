@@ -268,8 +268,6 @@ async def generate_conversation_title(conversation_file: str, conversation_id: s
         title = data.get("title", "").strip()
         if title:
             await asyncio.to_thread(append_title, conversation_file, conversation_id, title)
-            await asyncio.to_thread(
-                conversation_manager.update_conversation_title, conversation_id, title
-            )
+            await conversation_manager.update_conversation_title_async(conversation_id, title)
     except Exception:
         pass
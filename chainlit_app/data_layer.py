@@ -1,15 +1,17 @@
 import asyncio
 import os
 import shutil
-import uuid
 
 import chainlit as cl
 from chainlit.data.chainlit_data_layer import ChainlitDataLayer
 from chainlit.types import PaginatedResponse, PageInfo, ThreadFilter, Pagination, ThreadDict
 
-from utils.db import SessionLocal
-from utils.models import Conversation
-from utils.conversation_manager import list_conversations, update_conversation_title
+from utils.conversation_manager import (
+    delete_conversation_async,
+    get_conversation_async,
+    list_conversations_async,
+    update_conversation_title_async,
+)
 from chainlit_app.conversation_history import build_thread_steps_from_jsonl
 
 _PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -43,15 +45,11 @@ class _JsonlDataLayer(ChainlitDataLayer):
 
     # ── ACL：從 public.conversations 查作者 ──────────────────────
     async def get_thread_author(self, thread_id: str) -> str:
-        def _query():
-            try:
-                with SessionLocal() as session:
-                    conv = session.get(Conversation, uuid.UUID(thread_id))
-                    return conv.user_id if conv else None
-            except Exception:
-                return None
-
-        return (await asyncio.to_thread(_query)) or ""
+        try:
+            conv = await get_conversation_async(thread_id)
+        except Exception:
+            return ""
+        return conv.user_id if conv else ""
 
     # ── 側邊欄列表：從 public.conversations 讀 ───────────────────
     async def list_threads(
@@ -72,9 +70,7 @@ class _JsonlDataLayer(ChainlitDataLayer):
             )
 
         limit = pagination.first or 10
-        result = await asyncio.to_thread(
-            list_conversations, identifier, 0, limit, filters.search
-        )
+        result = await list_conversations_async(identifier, 0, limit, filters.search)
         convs = result["conversations"]
 
         thread_dicts = [
@@ -103,23 +99,17 @@ class _JsonlDataLayer(ChainlitDataLayer):
 
     # ── 重連恢復：從 public.conversations + JSONL 重建完整 ThreadDict ──
     async def get_thread(self, thread_id: str):
-        def _get():
-            try:
-                with SessionLocal() as session:
-                    conv = session.get(Conversation, uuid.UUID(thread_id))
-                    if not conv:
-                        return None
-                    return {
-                        "user_id": conv.user_id,
-                        "title": conv.title,
-                        "created_at": conv.created_at.isoformat() if conv.created_at else "",
-                    }
-            except Exception:
-                return None
-
-        conv_info = await asyncio.to_thread(_get)
-        if not conv_info:
+        try:
+            conv = await get_conversation_async(thread_id)
+        except Exception:
+            conv = None
+        if not conv:
             return None
+        conv_info = {
+            "user_id": conv.user_id,
+            "title": conv.title,
+            "created_at": conv.created_at.isoformat() if conv.created_at else "",
+        }
 
         identifier = conv_info["user_id"]
         rows = await self.execute_query(
@@ -151,27 +141,20 @@ class _JsonlDataLayer(ChainlitDataLayer):
     async def update_thread(self, thread_id, name=None, user_id=None, metadata=None, tags=None):
         if name is not None:
             try:
-                await asyncio.to_thread(update_conversation_title, thread_id, name)
+                await update_conversation_title_async(thread_id, name)
             except Exception:
                 pass
 
     # ── 刪除：同步刪 public.conversations + JSONL 目錄 ──────────
     async def delete_thread(self, thread_id: str):
-        def _delete():
-            with SessionLocal() as session:
-                conv = session.get(Conversation, uuid.UUID(thread_id))
-                if not conv:
-                    return
-                uid = conv.user_id
-                session.delete(conv)
-                session.commit()
-            conv_dir = os.path.join(
-                _PROJECT_ROOT, "user_profiles", uid, "conversations", thread_id
-            )
-            if os.path.isdir(conv_dir):
-                shutil.rmtree(conv_dir)
-
-        await asyncio.to_thread(_delete)
+        uid = await delete_conversation_async(thread_id)
+        if uid is None:
+            return
+        conv_dir = os.path.join(
+            _PROJECT_ROOT, "user_profiles", uid, "conversations", thread_id
+        )
+        if os.path.isdir(conv_dir):
+            await asyncio.to_thread(shutil.rmtree, conv_dir)
 
 
 @cl.data_layer
@@ -4,15 +4,13 @@ import asyncio
 import mimetypes
 import os
 
-import aiofiles
 import chainlit as cl
-from markitdown import MarkItDown
 
 from utils.file_handler import encode_image, get_files_state, _get_text_file_info, TEXT_PREVIEW_SIZE_LIMIT
-from utils.pdf_converter import PyMuPdfConverter
 from utils.permanent_storage import move_to_permanent
 from utils.conversation_storage import append_ui_event, append_ui_message
 from utils.signed_url import user_file_url, rewrite_relative_paths_in_md
+from utils.text_preview import PREVIEW_MAX_BYTES, TextPreview, get_text_preview
 
 ENABLE_SESSION_HISTORY = os.environ.get("ENABLE_SESSION_HISTORY", "true").lower() in ("1", "true", "yes")
 _PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -75,26 +73,31 @@ async def check_and_process_new_files(existing_files, append_to_history=False):
         })
 
     text_preview_files: list[tuple[str, str | None]] = []
+    previews: dict[str, TextPreview] = {}
     download_only_files: list[str] = []
     for file_name in other_files:
         is_text, lang = _get_text_file_info(file_name)
         fp = os.path.join(file_folder, file_name)
         fsize = await asyncio.to_thread(os.path.getsize, fp)
-        if is_text and fsize <= TEXT_PREVIEW_SIZE_LIMIT:
-            text_preview_files.append((file_name, lang))
-        else:
-            download_only_files.append(file_name)
+        # 副檔名判斷為文字者以內容確認不是二進位；副檔名無從判斷（README、LICENSE…）者依內容決定
+        if fsize <= TEXT_PREVIEW_SIZE_LIMIT and (is_text or mimetypes.guess_type(file_name)[0] is None):
+            preview = await get_text_preview(fp)
+            if preview is not None and preview.is_text:
+                previews[file_name] = preview
+                text_preview_files.append((file_name, lang))
+                continue
+        download_only_files.append(file_name)
 
     sidebar_record_elements = []
     if text_preview_files:
         sidebar_elements = []
         for file_name, lang in text_preview_files:
             fp = os.path.join(file_folder, file_name)
-            async with aiofiles.open(fp, 'r', encoding='utf-8', errors='replace') as fh:
-                file_content = await fh.read()
-
-            file_content = rewrite_relative_paths_in_md(file_content, fp)
+            preview = previews[file_name]
+            file_content = rewrite_relative_paths_in_md(preview.text, fp)
             text_content = f"```{lang}\n{file_content}\n```" if lang else file_content
+            if preview.truncated:
+                text_content += f"\n\n…（僅顯示前 {PREVIEW_MAX_BYTES // 1024} KB，完整內容請下載檔案）"
             sidebar_elements.append(cl.Text(name=file_name, content=text_content))
             sidebar_record_elements.append({
                 "kind": "text",
@@ -279,7 +282,9 @@ async def process_uploaded_elements(
 
 @cl.step(name="檔案文本提取")
 async def convert_to_markdown(file_path):
-    md = MarkItDown(enable_plugins=True)
-    md.register_converter(PyMuPdfConverter(), priority=-1.0)
-    result = await asyncio.to_thread(md.convert, file_path, extract_pages=True)
+    from agent_tools._context import get_markitdown
+    # 與 read_file 共用同一個 MarkItDown 單例（含 PyMuPDF converter），首次使用才載入
+    result = await asyncio.to_thread(
+        lambda: get_markitdown().convert(file_path, extract_pages=True)
+    )
     return result.text_content
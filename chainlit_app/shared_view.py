@@ -0,0 +1,315 @@
+"""分享對話視圖的快照快取。
+
+on_shared_thread_view 原本每位訪客都重新改寫全部 elements / steps 的 URL，
+並把 ArtifactChip 參照的 HTML / Markdown 檔案整份讀進來；
+被廣泛分享的對話會對每位匿名訪客重複相同的磁碟讀取與 regex 掃描。
+
+- 以 share token 為 key 快取改寫完成的 elements / steps（快照），建立與驗證都在 thread 內進行
+- 快照記錄來源版本：history.jsonl 的 (mtime_ns, size)，以及每個內嵌檔案的 (mtime_ns, size)；
+  任一項改變即視為過期並重建（對話新增訊息、artifact 被編輯）
+- published_url 來自 DB，快照超過 SNAPSHOT_TTL 秒也會重建，讓之後才發布的 artifact 顯示公開連結；
+  在本行程發布時另以 invalidate_shared_view 立即捨棄快照
+- 同一 token 同時多位訪客 miss 只會建立一次（single-flight）
+- 記憶體以總位元組數為上限（LRU），被淘汰的快照寫到磁碟，下次命中時再載回
+
+環境變數：
+    SHARED_VIEW_CACHE_MAX_BYTES  記憶體中快照總大小上限（預設 64 MB）
+    SHARED_VIEW_CACHE_DIR        溢出到磁碟的目錄（預設系統暫存目錄下的 eaic_shared_view_cache）
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from utils.user_profile import get_conversation_artifacts_dir
+
+logger = logging.getLogger(__name__)
+
+MEMORY_MAX_BYTES = int(os.getenv("SHARED_VIEW_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SPILL_DIR = os.getenv("SHARED_VIEW_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "eaic_shared_view_cache")
+SNAPSHOT_TTL = 300
+
+
+@dataclass
+class _Snapshot:
+    version: list | None          # history.jsonl 的 [mtime_ns, size]
+    deps: dict[str, list | None]  # 內嵌檔案路徑 → [mtime_ns, size]（None 表示當時不存在）
+    elements: list
+    steps: list
+    built_at: float               # time.time()，磁碟載回後仍可判斷是否超過 TTL
+    size: int = 0
+
+
+_memory: OrderedDict[str, _Snapshot] = OrderedDict()
+_memory_bytes = 0
+_lock = threading.Lock()
+_inflight: dict[str, asyncio.Future] = {}
+_hits = 0
+_misses = 0
+
+
+def _stat_key(path: str) -> list | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _is_fresh(snap: _Snapshot, version: list | None) -> bool:
+    if snap.version != version or time.time() - snap.built_at > SNAPSHOT_TTL:
+        return False
+    return all(_stat_key(path) == key for path, key in snap.deps.items())
+
+
+# ── 快照建立 ──
+
+def _build_snapshot(thread: dict, conv_folder: str, share_token: str, base_url: str, version: list | None) -> _Snapshot:
+    """改寫 elements URL 為公開路徑、為 ArtifactChip 補充 inline 資料（同步，於 thread 內執行）。"""
+    from utils.artifact_publisher import get_published_artifact_record_by_id
+
+    share_base = f"{base_url}/share/{share_token}/files"
+    # 兩種格式都需支援：
+    #   帶 host：http://localhost:8000/api/user-files/...  （user_file_url() 產生）
+    #   相對路徑：/api/user-files/...                      （rewrite_artifact_paths() 產生）
+    _user_files_abs = f"{base_url}/api/user-files"
+    _user_files_rel = "/api/user-files"
+    deps: dict[str, list | None] = {}
+
+    def _replace_url(url: str) -> str:
+        if not url:
+            return url
+        if url.startswith(_user_files_abs):
+            path_part = url[len(_user_files_abs):].lstrip("/")
+        elif url.startswith(_user_files_rel):
+            path_part = url[len(_user_files_rel):].lstrip("/")
+        else:
+            return url
+        for pfx in ("uploads/", "artifacts/"):
+            idx = path_part.find(pfx)
+            if idx != -1:
+                return f"{share_base}/{path_part[idx:]}"
+        return url
+
+    def _read_inline(path: str) -> str | None:
+        # 先記錄 stat 再讀取：讀取期間檔案被改寫時，下次驗證會發現版本不符
+        deps[path] = _stat_key(path)
+        if deps[path] is None:
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    elements = thread.get("elements") or []
+    for elem in elements:
+        if elem.get("url"):
+            elem["url"] = _replace_url(elem["url"])
+
+        # ArtifactChip：補充 inline 資料讓 reopen_artifact 可以跨用戶使用
+        if elem.get("type") == "custom" and elem.get("name") == "ArtifactChip":
+            props = elem.get("props") or {}
+            payload = props.get("payload") or {}
+
+            artifact_id = payload.get("artifact_id")
+            pptx_id = payload.get("pptx_id")
+            md_id = payload.get("md_id")
+
+            if artifact_id:
+                html_path = os.path.join(
+                    get_conversation_artifacts_dir(conv_folder),
+                    f"artifact_{artifact_id}.html",
+                )
+                html = _read_inline(html_path)
+                if html is not None:
+                    payload["html_code_inline"] = html
+                    payload["is_shared"] = True
+                    try:
+                        pub = get_published_artifact_record_by_id(artifact_id)
+                        if pub:
+                            payload["published_url"] = f"{base_url}/p/{pub.token}"
+                    except Exception:
+                        pass
+                    elem["props"] = {**props, "payload": payload}
+
+            elif pptx_id:
+                if payload.get("initial_pptx_url"):
+                    payload["initial_pptx_url"] = _replace_url(payload["initial_pptx_url"])
+                slide_urls = payload.get("initial_slide_urls")
+                if isinstance(slide_urls, list):
+                    payload["initial_slide_urls"] = [_replace_url(u) for u in slide_urls]
+                if "initial_pptx_url" in payload or "initial_slide_urls" in payload:
+                    elem["props"] = {**props, "payload": payload}
+
+            elif md_id:
+                file_path = payload.get("file_path", "")
+                if file_path:
+                    content = _read_inline(file_path)
+                    if content is not None:
+                        payload["markdown_content_inline"] = content
+                        elem["props"] = {**props, "payload": payload}
+
+    # 重寫 steps output 中的 Markdown 內嵌圖片 URL（帶 host 和相對路徑兩種格式）
+    _url_pattern = re.compile(
+        r'(?:' + re.escape(_user_files_abs) + r'|' + re.escape(_user_files_rel) + r')' +
+        r'/[^\s\)"\'>\]]+'
+    )
+    steps = thread.get("steps") or []
+    for step in steps:
+        output = step.get("output", "")
+        if output and (_user_files_abs in output or _user_files_rel in output):
+            step["output"] = _url_pattern.sub(lambda m: _replace_url(m.group(0)), output)
+
+    return _Snapshot(version=version, deps=deps, elements=elements, steps=steps, built_at=time.time())
+
+
+# ── 記憶體 / 磁碟 ──
+
+def _spill_path(share_token: str) -> str:
+    return os.path.join(SPILL_DIR, f"{share_token}.json")
+
+
+def _serialize(snap: _Snapshot) -> bytes:
+    return json.dumps({
+        "version": snap.version,
+        "deps": snap.deps,
+        "elements": snap.elements,
+        "steps": snap.steps,
+        "built_at": snap.built_at,
+    }, ensure_ascii=False, default=str).encode("utf-8")
+
+
+def _spill(share_token: str, data: bytes) -> None:
+    try:
+        os.makedirs(SPILL_DIR, exist_ok=True)
+        dst = _spill_path(share_token)
+        tmp = f"{dst}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, dst)
+    except OSError as e:
+        logger.warning("[shared_view] 快照寫入磁碟失敗 %s: %s", share_token, e)
+
+
+def _load_spilled(share_token: str) -> _Snapshot | None:
+    try:
+        with open(_spill_path(share_token), "rb") as f:
+            data = f.read()
+        raw = json.loads(data)
+        return _Snapshot(
+            version=raw["version"],
+            deps=raw["deps"],
+            elements=raw["elements"],
+            steps=raw["steps"],
+            built_at=raw["built_at"],
+            size=len(data),
+        )
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _store(share_token: str, snap: _Snapshot) -> None:
+    """放入記憶體並依總大小淘汰最久未使用的快照（淘汰者寫入磁碟）。"""
+    global _memory_bytes
+    if not snap.size:
+        snap.size = len(_serialize(snap))
+    evicted: list[tuple[str, _Snapshot]] = []
+    with _lock:
+        old = _memory.pop(share_token, None)
+        if old is not None:
+            _memory_bytes -= old.size
+        _memory[share_token] = snap
+        _memory_bytes += snap.size
+        while _memory_bytes > MEMORY_MAX_BYTES and len(_memory) > 1:
+            token, victim = _memory.popitem(last=False)
+            _memory_bytes -= victim.size
+            evicted.append((token, victim))
+    for token, victim in evicted:
+        _spill(token, _serialize(victim))
+
+
+def _get_or_build(thread: dict, conv_folder: str, share_token: str, base_url: str) -> _Snapshot:
+    global _hits, _misses
+    version = _stat_key(os.path.join(conv_folder, "history.jsonl"))
+    with _lock:
+        snap = _memory.get(share_token)
+        if snap is not None:
+            _memory.move_to_end(share_token)
+    if snap is not None and _is_fresh(snap, version):
+        _hits += 1
+        return snap
+
+    if snap is None:
+        snap = _load_spilled(share_token)
+        if snap is not None and _is_fresh(snap, version):
+            _hits += 1
+            _store(share_token, snap)
+            return snap
+
+    _misses += 1
+    snap = _build_snapshot(thread, conv_folder, share_token, base_url, version)
+    _store(share_token, snap)
+    # 磁碟上的舊版本已無用
+    try:
+        os.unlink(_spill_path(share_token))
+    except OSError:
+        pass
+    return snap
+
+
+# ── 對外介面 ──
+
+async def apply_shared_view(thread: dict, conv_folder: str, share_token: str, base_url: str) -> None:
+    """以快照內容取代 thread 的 elements / steps（必要時於 thread 內建立快照）。"""
+    fut = _inflight.get(share_token)
+    if fut is not None:
+        snap = await asyncio.shield(fut)
+    else:
+        fut = asyncio.get_running_loop().create_future()
+        _inflight[share_token] = fut
+        try:
+            snap = await asyncio.to_thread(_get_or_build, thread, conv_folder, share_token, base_url)
+        except BaseException as e:
+            fut.set_exception(e if isinstance(e, Exception) else RuntimeError("snapshot build cancelled"))
+            fut.exception()  # 沒有其他等待者時避免 "exception was never retrieved"
+            raise
+        else:
+            fut.set_result(snap)
+        finally:
+            _inflight.pop(share_token, None)
+
+    # 快照在多個請求間共用，只替換 list 本身；Chainlit 序列化時不會修改內容
+    thread["elements"] = list(snap.elements)
+    thread["steps"] = list(snap.steps)
+
+
+def invalidate_shared_view(share_token: str) -> None:
+    """移除快照（記憶體與磁碟），下次瀏覽時重建。"""
+    global _memory_bytes
+    with _lock:
+        snap = _memory.pop(share_token, None)
+        if snap is not None:
+            _memory_bytes -= snap.size
+    try:
+        os.unlink(_spill_path(share_token))
+    except OSError:
+        pass
+
+
+def get_cache_stats() -> dict:
+    with _lock:
+        return {
+            "entries": len(_memory),
+            "bytes": _memory_bytes,
+            "max_bytes": MEMORY_MAX_BYTES,
+            "hits": _hits,
+            "misses": _misses,
+        }
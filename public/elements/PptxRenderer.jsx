@@ -11,11 +11,12 @@ export default function PptxRenderer() {
   // 若已有預先存好的 URL（重開路徑），直接跳到 ready
   const initialStatus = initPptxUrl ? "ready" : (script ? "loading" : "streaming");
   const [status,     setStatus]     = React.useState(initialStatus);
-  const [pptxB64,    setPptxB64]    = React.useState(null);
+  const [pptxBlob,   setPptxBlob]   = React.useState(null);
   const [pptxUrl,    setPptxUrl]    = React.useState(initPptxUrl);
   const [slideUrls,  setSlideUrls]  = React.useState(initSlideUrls || []);
   const [errMsg,     setErrMsg]     = React.useState("");
   const [downloaded, setDownloaded] = React.useState(false);
+  const jobStopRef = React.useRef(null);
 
   // 從 partial JSON 前綴抽取 pptx_script 值的已知部分
   function extractPartialScript(raw) {
@@ -30,17 +31,41 @@ export default function PptxRenderer() {
     return extracted;
   }
 
-  // 上傳 base64 pptx 到後端取縮圖
-  async function fetchPreview(b64, layoutHints) {
+  // Blob 轉 base64（僅 JSON fallback 使用）
+  function blobToBase64(blob) {
+    return new Promise((resolve, reject) => {
+      const reader = new FileReader();
+      reader.onload = () => resolve(String(reader.result).split(",", 2)[1] || "");
+      reader.onerror = () => reject(reader.error);
+      reader.readAsDataURL(blob);
+    });
+  }
+
+  // 上傳 pptx 到後端取縮圖：優先以原始 bytes 串流上傳，端點不存在時改用 JSON + base64
+  async function fetchPreview(blob, layoutHints) {
     if (!convId) return;
     setStatus("rendering");
     try {
-      const res = await fetch("/api/pptx-preview", {
+      const qs = new URLSearchParams({
+        pptx_id: pptxId,
+        conversation_id: convId,
+        layout_hints: JSON.stringify(layoutHints || []),
+      });
+      let res = await fetch(`/api/pptx-preview/upload?${qs}`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ pptx_b64: b64, pptx_id: pptxId, conversation_id: convId, layout_hints: layoutHints || [] }),
+        headers: { "Content-Type": "application/vnd.openxmlformats-officedocument.presentationml.presentation" },
+        body: blob,
         credentials: "include",
       });
+      if (res.status === 404 || res.status === 405) {
+        const b64 = await blobToBase64(blob);
+        res = await fetch("/api/pptx-preview", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ pptx_b64: b64, pptx_id: pptxId, conversation_id: convId, layout_hints: layoutHints || [] }),
+          credentials: "include",
+        });
+      }
       if (!res.ok) {
         const err = await res.text();
         setErrMsg(`縮圖生成失敗：${err}`);
@@ -48,8 +73,12 @@ export default function PptxRenderer() {
         return;
       }
       const data = await res.json();
-      setSlideUrls(data.slide_urls || []);
       if (data.pptx_url) setPptxUrl(data.pptx_url);
+      if (data.job_id) {
+        followJob(data.job_id);
+        return;
+      }
+      setSlideUrls(data.slide_urls || []);
       setStatus("ready");
     } catch (e) {
       setErrMsg(`縮圖生成失敗：${String(e)}`);
@@ -57,6 +86,57 @@ export default function PptxRenderer() {
     }
   }
 
+  // 逐頁接收縮圖：優先 server-sent events，連線失敗時改為輪詢
+  function followJob(jobId) {
+    const base = `/api/pptx-preview/jobs/${encodeURIComponent(jobId)}`;
+    const urls = [];
+    const show = () => setSlideUrls(urls.slice());
+    const fail = (msg) => {
+      setErrMsg(`縮圖生成失敗：${msg}`);
+      setStatus("ready");
+    };
+
+    function poll() {
+      const timer = setInterval(async () => {
+        try {
+          const res = await fetch(base, { credentials: "include" });
+          if (!res.ok) { clearInterval(timer); fail(await res.text()); return; }
+          const snap = await res.json();
+          setSlideUrls(snap.slide_urls || []);
+          if ((snap.slide_urls || []).some(Boolean)) setStatus("ready");
+          if (snap.error) { clearInterval(timer); fail(snap.error); }
+          else if (snap.finished) { clearInterval(timer); setStatus("ready"); }
+        } catch (_) {}
+      }, 1000);
+      jobStopRef.current = () => clearInterval(timer);
+    }
+
+    if (!window.EventSource) { poll(); return; }
+    const es = new EventSource(`${base}/events`);
+    jobStopRef.current = () => es.close();
+    es.addEventListener("valid", (ev) => {
+      const { slide_count } = JSON.parse(ev.data);
+      for (let i = 0; i < slide_count; i++) if (urls[i] === undefined) urls[i] = null;
+      show();
+    });
+    es.addEventListener("slide", (ev) => {
+      const { index, url } = JSON.parse(ev.data);
+      urls[index] = url;
+      show();
+      setStatus("ready");
+    });
+    es.addEventListener("done", (ev) => {
+      es.close();
+      setSlideUrls(JSON.parse(ev.data).slide_urls || urls.slice());
+      setStatus("ready");
+    });
+    es.addEventListener("error", (ev) => {
+      es.close();
+      if (ev.data) fail(JSON.parse(ev.data).error);  // 伺服器送出的 error 事件
+      else poll();                                    // 連線中斷：改為輪詢
+    });
+  }
+
   // 通知後端放棄等待（sendBeacon 在 unmount 後仍可靠送出）
   function abortUpload(reason) {
     if (!pptxId) return;
@@ -96,10 +176,10 @@ export default function PptxRenderer() {
               ? window.__pptxLayoutHints
               : (prs.slides || []).map(s => s.__layoutHint || null);
             window.__pptxLayoutHints = null;
-            const b64 = await prs.write({ outputType: "base64" });
+            const blob = await prs.write({ outputType: "blob" });
             if (!cancelled) {
-              setPptxB64(b64);
-              await fetchPreview(b64, layoutHints);
+              setPptxBlob(blob);
+              await fetchPreview(blob, layoutHints);
               uploadDone = true;
             }
           } catch (e) {
@@ -135,6 +215,7 @@ export default function PptxRenderer() {
     return () => {
       cancelled = true;
       window.removeEventListener("unhandledrejection", onUnhandledRejection);
+      if (jobStopRef.current) jobStopRef.current();
       if (!uploadDone) abortUpload("元件卸載");
     };
   }, [pptxId, script]);
@@ -158,13 +239,9 @@ export default function PptxRenderer() {
       // 套用模板後由後端存檔，直接下載後端的 pptx
       a.href = pptxUrl;
       a.click();
-    } else if (pptxB64) {
-      // 無模板，用前端原始 base64
-      const bytes = atob(pptxB64);
-      const arr = new Uint8Array(bytes.length);
-      for (let i = 0; i < bytes.length; i++) arr[i] = bytes.charCodeAt(i);
-      const blob = new Blob([arr], { type: "application/vnd.openxmlformats-officedocument.presentationml.presentation" });
-      const url = URL.createObjectURL(blob);
+    } else if (pptxBlob) {
+      // 上傳失敗時，用前端原始 blob
+      const url = URL.createObjectURL(pptxBlob);
       a.href = url;
       a.click();
       setTimeout(() => URL.revokeObjectURL(url), 60000);
@@ -185,7 +262,7 @@ export default function PptxRenderer() {
     style:{ display:"flex", alignItems:"center", justifyContent:"space-between", padding:"6px 10px", borderBottom:"1px solid var(--border,#e5e7eb)", background:"var(--card,#fff)", flexShrink:0, gap:"8px" },
   },
     React.createElement("span", { style:{ fontSize:"12px", fontWeight:600, color:"var(--foreground,#111)", overflow:"hidden", textOverflow:"ellipsis", whiteSpace:"nowrap", maxWidth:"220px" } }, title),
-    (status==="ready"||status==="rendering") && (pptxUrl || pptxB64) &&
+    (status==="ready"||status==="rendering") && (pptxUrl || pptxBlob) &&
       React.createElement("button", { onClick:handleDownload, style:dlBtn }, downloaded?"✓ 已下載":"⬇ 下載 .pptx"),
   );
 
@@ -269,13 +346,16 @@ export default function PptxRenderer() {
       // 縮圖：縱向列出所有投影片
       slideUrls.length > 0
         ? slideUrls.map((url, i) =>
-            React.createElement("div", { key: url, style:{ display:"flex", flexDirection:"column", gap:"4px" } },
+            React.createElement("div", { key: url || `pending-${i}`, style:{ display:"flex", flexDirection:"column", gap:"4px" } },
               React.createElement("div", { style:{ fontSize:"10px", color:"var(--muted-foreground,#9ca3af)" } }, `第 ${i+1} 張`),
-              React.createElement("img", {
-                src: url,
-                alt: `第 ${i+1} 張投影片`,
-                style:{ width:"100%", height:"auto", display:"block", borderRadius:"4px", border:"1px solid var(--border,#e5e7eb)", boxShadow:"0 1px 4px rgba(0,0,0,0.08)" },
-              }),
+              url
+                ? React.createElement("img", {
+                    src: url,
+                    alt: `第 ${i+1} 張投影片`,
+                    style:{ width:"100%", height:"auto", display:"block", borderRadius:"4px", border:"1px solid var(--border,#e5e7eb)", boxShadow:"0 1px 4px rgba(0,0,0,0.08)" },
+                  })
+                // 尚未產生的頁面：佔位（縮圖逐頁推送中）
+                : React.createElement("div", { style:{ width:"100%", aspectRatio:"16 / 9", borderRadius:"4px", border:"1px solid var(--border,#e5e7eb)", background:"var(--muted,#f3f4f6)", animation:"pptx-pulse 1.4s ease-in-out infinite" } }),
             )
           )
         : React.createElement("div", null,
@@ -1,3 +1,4 @@
+import asyncio
 import pathlib
 
 from fastapi import APIRouter, HTTPException, Request
@@ -43,7 +44,10 @@ async def serve_artifact_preview(artifact_id: str, conversation_id: str, request
         raise HTTPException(status_code=404)
 
     from utils.signed_url import rewrite_html_img_paths
-    html = html_path.read_text(encoding="utf-8")
-    html = rewrite_html_img_paths(html, user.identifier, conversation_id)
+
+    def _load() -> str:
+        return rewrite_html_img_paths(html_path.read_text(encoding="utf-8"), user.identifier, conversation_id)
+
+    html = await asyncio.to_thread(_load)
 
     return HTMLResponse(content=html)
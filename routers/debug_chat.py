@@ -206,3 +206,26 @@ async def edit_message(thread_id: str, req: EditMessageRequest):
         result["message_edit_records_in_jsonl"] = []
 
     return result
+
+
+# ── 7. 背景服務統計（佇列深度等）──────────────────────────────────────────
+
+@router.get("/metrics")
+async def get_metrics():
+    """回傳常駐服務的執行統計。"""
+    from utils import artifact_publisher, db, heartbeat, office_converter, share_manager, text_preview, ttl_registry
+    from utils.render_cache import render_cache
+    from chainlit_app import shared_view
+    return {
+        "office_converter": office_converter.get_metrics(),
+        "render_cache": render_cache.get_metrics(),
+        "db_pool": db.get_pool_metrics(),
+        "token_cache": {
+            "published": artifact_publisher.get_token_cache_stats(),
+            "shared": share_manager.get_token_cache_stats(),
+        },
+        "shared_view_cache": shared_view.get_cache_stats(),
+        "text_preview_cache": text_preview.get_cache_stats(),
+        "registries": ttl_registry.get_all_stats(),
+        "heartbeat": heartbeat.get_stats(),
+    }
@@ -11,12 +11,12 @@ from utils.memory_manager import (
     list_memory_files,
     load_memory_file,
     write_memory_file,
-    write_memory_index,
     validate_memory_path,
     load_memory_index,
     get_user_memory_dir,
     MEMORY_FILE_MAX_BYTES,
 )
+from utils import memory_index
 
 router = APIRouter()
 
@@ -75,23 +75,12 @@ def _parse_frontmatter_from_content(content: str) -> dict:
     return result
 
 
-def _rebuild_index(user_id: str) -> None:
-    """重建 MEMORY.md 索引（根據現有記憶檔案）。"""
-    files = list_memory_files(user_id)
-    if not files:
-        write_memory_index(user_id, "# Memory Index\n")
-        return
-    # 先讀取現有索引，嘗試保留既有條目順序（按名稱字母排序）
-    lines = ["# Memory Index\n"]
-    for f in sorted(files, key=lambda x: x["name"].lower()):
-        filename = f["filename"]
-        name = f["name"] or filename
-        description = f["description"] or ""
-        hook = f"- [{name}]({filename})"
-        if description:
-            hook += f" — {description}"
-        lines.append(hook)
-    write_memory_index(user_id, "\n".join(lines) + "\n")
+def _with_index_update(user_id: str, filename: str, body: WriteMemoryRequest, response: dict) -> dict:
+    """更新 MEMORY.md 中對應的單一條目；索引已達上限時記憶檔仍保存，回應附上警告。"""
+    error = memory_index.upsert_entry(user_id, filename, body.name, body.description)
+    if error:
+        response["index_warning"] = error
+    return response
 
 
 @router.get("/list")
@@ -108,6 +97,7 @@ async def list_memories(request: Request):
 async def get_memory_index(request: Request):
     """讀取 MEMORY.md 索引內容。"""
     user_id = _get_user_id(request)
+    memory_index.flush(user_id)
     content = load_memory_index(user_id)
     return {"content": content}
 
@@ -158,8 +148,9 @@ async def create_memory(request: Request, body: WriteMemoryRequest):
     if result.startswith("錯誤"):
         raise HTTPException(status_code=400, detail=result)
 
-    _rebuild_index(user_id)
-    return {"message": "已新增記憶檔案", "filename": filename}
+    return _with_index_update(
+        user_id, filename, body, {"message": "已新增記憶檔案", "filename": filename}
+    )
 
 
 @router.put("/file/{filename}")
@@ -175,8 +166,9 @@ async def update_memory(request: Request, filename: str, body: WriteMemoryReques
     if result.startswith("錯誤"):
         raise HTTPException(status_code=400, detail=result)
 
-    _rebuild_index(user_id)
-    return {"message": "已更新記憶檔案", "filename": filename}
+    return _with_index_update(
+        user_id, filename, body, {"message": "已更新記憶檔案", "filename": filename}
+    )
 
 
 @router.delete("/file/{filename}")
@@ -194,5 +186,5 @@ async def delete_memory(request: Request, filename: str):
     except OSError as e:
         raise HTTPException(status_code=500, detail=f"刪除失敗：{e}")
 
-    _rebuild_index(user_id)
+    memory_index.remove_entry(user_id, filename)
     return {"message": "已刪除記憶檔案", "filename": filename}
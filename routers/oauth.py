@@ -21,6 +21,8 @@ from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.backends import default_backend
 import uuid
 
+from utils.token_store import ExpiringTokenStore
+
 router = APIRouter()
 
 # JWT 密鑰生成（實際應用中應從環境變數或安全存儲中獲取）
@@ -59,11 +61,18 @@ oauth2_scheme = OAuth2PasswordBearer(
     }
 )
 
+ACCESS_TOKEN_LIFETIME = 3600                # 1小時
+AUTH_CODE_LIFETIME = 600                    # 10分鐘
+REFRESH_TOKEN_LIFETIME = 30 * 24 * 3600     # 30天
+
+# 令牌與授權碼依到期時間自動清除；設定 OAUTH_TOKEN_DB 時令牌另存 SQLite，重新啟動後仍有效
+_TOKEN_DB = os.getenv("OAUTH_TOKEN_DB") or None
+token_store = ExpiringTokenStore("oauth_access_tokens", _TOKEN_DB)
+auth_code_store = ExpiringTokenStore("oauth_auth_codes")
+refresh_token_store = ExpiringTokenStore("oauth_refresh_tokens", _TOKEN_DB)
+
 # 儲存資料的簡單記憶體存儲（實際應用中應使用資料庫）
-token_store: Dict[str, Dict] = {}
-auth_code_store: Dict[str, Dict] = {}
 client_store: Dict[str, Dict] = {}
-refresh_token_store: Dict[str, Dict] = {}
 user_store: Dict[str, Dict] = {}
 
 # 預設的測試 Client
@@ -216,15 +225,15 @@ def generate_authorization_code(client_id: str, user_id: str, redirect_uri: str,
     """生成授權代碼"""
     code = secrets.token_urlsafe(32)
     
-    auth_code_store[code] = {
+    auth_code_store.put(code, {
         "client_id": client_id,
         "user_id": user_id,
         "redirect_uri": redirect_uri,
         "scopes": scopes,
         "nonce": nonce,
-        "expires_at": datetime.now() + timedelta(minutes=10),
+        "expires_at": datetime.now() + timedelta(seconds=AUTH_CODE_LIFETIME),
         "used": False
-    }
+    }, time.time() + AUTH_CODE_LIFETIME)
     
     return code
 
@@ -234,7 +243,7 @@ def generate_tokens(client_id: str, user_id: str, scopes: List[str],
     # 生成訪問令牌
     access_token = secrets.token_urlsafe(32)
     refresh_token = secrets.token_urlsafe(32)
-    expires_in = 3600  # 1小時
+    expires_in = ACCESS_TOKEN_LIFETIME
     
     # 儲存訪問令牌
     token_info = {
@@ -245,8 +254,9 @@ def generate_tokens(client_id: str, user_id: str, scopes: List[str],
         "user_id": user_id,
         "scopes": scopes
     }
-    token_store[access_token] = token_info
-    refresh_token_store[refresh_token] = token_info
+    now = time.time()
+    token_store.put(access_token, token_info, now + expires_in)
+    refresh_token_store.put(refresh_token, token_info, now + REFRESH_TOKEN_LIFETIME)
     
     result = {
         "access_token": access_token,
@@ -308,7 +318,7 @@ def generate_id_token(user_id: str, client_id: str, nonce: Optional[str] = None,
     return jwt.encode(claims, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict:
-    """驗證訪問令牌並返回用戶資訊"""
+    """驗證訪問令牌並返回用戶資訊（過期的令牌已由 token_store 移除）"""
     token_info = token_store.get(token)
     if not token_info:
         raise HTTPException(
@@ -317,15 +327,6 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # 檢查令牌是否過期
-    if datetime.now() > token_info["expires_at"]:
-        del token_store[token]
-        raise HTTPException(
-            status_code=401,
-            detail="訪問令牌已過期",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
     return token_info
 
 # OpenID Connect Discovery 端點
@@ -483,13 +484,6 @@ async def token_endpoint(
                 detail="授權代碼已被使用"
             )
         
-        if datetime.now() > auth_code_info["expires_at"]:
-            del auth_code_store[code]
-            raise HTTPException(
-                status_code=400,
-                detail="授權代碼已過期"
-            )
-        
         if auth_code_info["client_id"] != client_id:
             raise HTTPException(
                 status_code=400,
@@ -504,6 +498,7 @@ async def token_endpoint(
         
         # 標記授權代碼為已使用
         auth_code_info["used"] = True
+        auth_code_store.save(code)
         
         # 生成令牌
         tokens = generate_tokens(
@@ -546,7 +541,7 @@ async def token_endpoint(
         )
         
         # 撤銷舊的刷新令牌
-        del refresh_token_store[refresh_token]
+        refresh_token_store.pop(refresh_token)
         
         return TokenResponse(**tokens)
     
@@ -609,13 +604,6 @@ async def validate_token(request: Request):
             detail="無效的訪問令牌"
         )
     
-    if datetime.now() > token_info["expires_at"]:
-        del token_store[access_token]
-        raise HTTPException(
-            status_code=401,
-            detail="訪問令牌已過期"
-        )
-    
     return {
         "valid": True,
         "expires_at": token_info["expires_at"].isoformat(),
@@ -638,19 +626,21 @@ async def revoke_token(
     if client_id:
         validate_client(client_id, client_secret)
     
-    # 嘗試撤銷訪問令牌
-    if token in token_store:
-        del token_store[token]
-        return {"message": "令牌已成功撤銷"}
-    
-    # 嘗試撤銷刷新令牌
-    if token in refresh_token_store:
-        del refresh_token_store[token]
-        return {"message": "令牌已成功撤銷"}
+    # 嘗試撤銷訪問令牌，再嘗試撤銷刷新令牌
+    if token_store.pop(token) is None:
+        refresh_token_store.pop(token)
     
     # RFC 7009 規定，即使令牌不存在也應該返回成功
     return {"message": "令牌已成功撤銷"}
 
+# 撤銷目前用戶的全部令牌
+@router.post("/token/revoke_all")
+async def revoke_all_tokens(current_user: Dict = Depends(get_current_user)):
+    """撤銷目前用戶在所有客戶端的訪問令牌與刷新令牌（例如登出所有裝置）"""
+    user_id = current_user["user_id"]
+    revoked = token_store.revoke_user(user_id) + refresh_token_store.revoke_user(user_id)
+    return {"message": "令牌已成功撤銷", "revoked": revoked}
+
 # 客戶端管理端點
 @router.get("/clients", response_model=List[ClientInfo])
 async def list_clients():
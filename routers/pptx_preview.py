@@ -1,32 +1,54 @@
 """
+POST /api/pptx-preview/upload
+接收前端瀏覽器產生的 .pptx（request body 為原始 bytes，串流寫入），存檔後立即回傳 job_id，
+LibreOffice 轉 PNG 縮圖在背景進行。
+
+GET /api/pptx-preview/jobs/{job_id}/events   每頁縮圖完成即以 server-sent events 推送
+GET /api/pptx-preview/jobs/{job_id}          輪詢目前已完成的縮圖
+
 POST /api/pptx-preview
-接收前端瀏覽器產生的 .pptx base64，存檔後用 LibreOffice 轉 PNG 縮圖，回傳縮圖 URL 清單。
+以 JSON 內的 base64 上傳（fallback），等全部縮圖完成後回傳 URL 清單。
 """
 import asyncio
 import base64
+import hashlib
+import json
 import os
 import pathlib
-import shutil
-import subprocess
+import re
 import uuid
 
-import fitz  # pymupdf
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from chainlit.auth.jwt import decode_jwt
 from chainlit.auth.cookie import get_token_from_cookies
 from utils.user_profile import get_conversation_artifacts_dir
+from utils.office_converter import convert_to_pdf, find_soffice, OfficeConversionError, OfficeConversionTimeout
+from utils.render_cache import hash_bytes, make_key
+from utils.page_rasterizer import get_page_count, rasterize_pdf
+from utils.preview_jobs import PreviewJob, create_job, get_job, start_preview_job
+from utils import coordination
 
 router = APIRouter()
 _PROJECT_ROOT = pathlib.Path(__file__).parent.parent
 
 MAX_PPTX_BYTES = 20 * 1024 * 1024  # 20 MB
+_PREVIEW_SCALE = 1.5
+_PREVIEW_PNG_LEVEL = 1  # 縮圖重視速度，低壓縮等級
+
+_TEMPLATE_NS = "pptx_template"
+_TEMPLATE_TTL = 600
+_PPTX_ID_RE = re.compile(r"pptx_[0-9a-f]{8}")
 
-# key: pptx_id, value: template 絕對路徑
-# 由 agent.py 的 _handle_render_pptx 在推送 sidebar 前寫入，pptx_preview 取用後刪除
-_template_registry: dict[str, str] = {}
+
+async def register_template(pptx_id: str, template_abs_path: str) -> None:
+    """由 agent.py 的 _handle_render_pptx 在推送 sidebar 前登記企業模板，上傳時取用後刪除。
+
+    經 coordination 登記，上傳請求落在其他 worker 也能取得；前端沒有上傳（腳本失敗、頁面關閉）時於期限後清除。
+    """
+    await coordination.put_async(_TEMPLATE_NS, pptx_id, template_abs_path, ttl=_TEMPLATE_TTL)
 
 
 class PptxPreviewRequest(BaseModel):
@@ -36,9 +58,7 @@ class PptxPreviewRequest(BaseModel):
     layout_hints: list[str | None] = []
 
 
-@router.post("/api/pptx-preview")
-async def pptx_preview(req: PptxPreviewRequest, request: Request):
-    # ── 驗證 JWT ──
+def _authenticate(request: Request) -> str:
     token = get_token_from_cookies(request.cookies)
     if not token:
         raise HTTPException(status_code=401, detail="Unauthorized")
@@ -46,11 +66,38 @@ async def pptx_preview(req: PptxPreviewRequest, request: Request):
         user = decode_jwt(token)
     except Exception:
         raise HTTPException(status_code=401, detail="Unauthorized")
+    return user.identifier
+
+
+def _safe_name(value: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in value)
+
+
+async def _take_template(pptx_id: str) -> str:
+    """取出 agent 登記的企業模板路徑（只取一次：多個 worker 同時上傳時只有一方拿到）；未登記回傳空字串。"""
+    return await coordination.pop_async(_TEMPLATE_NS, pptx_id) or ""
 
-    user_id = user.identifier
-    safe_uid = "".join(c if c.isalnum() or c in "-_" else "_" for c in user_id)
-    safe_conv = "".join(c if c.isalnum() or c in "-_" else "_" for c in req.conversation_id)
-    safe_pptx_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in req.pptx_id)
+
+async def _apply_template(template_abs_path: str, pptx_bytes: bytes, layout_hints: list) -> bytes | None:
+    """套用企業模板，回傳套用後的 bytes；套用失敗回傳 None。"""
+    from utils.pptx_template import apply_pptx_template
+    print(f"[pptx_preview] layout_hints received: {layout_hints}")
+    try:
+        return await asyncio.to_thread(
+            apply_pptx_template, pptx_bytes, template_abs_path, layout_hints
+        )
+    except Exception as e:
+        print(f"[pptx_preview] apply_template failed: {e}, using original")
+        return None
+
+
+@router.post("/api/pptx-preview")
+async def pptx_preview(req: PptxPreviewRequest, request: Request):
+    """JSON + base64 上傳（舊版前端 / 串流端點無法使用時的 fallback）。"""
+    user_id = _authenticate(request)
+    safe_uid = _safe_name(user_id)
+    safe_conv = _safe_name(req.conversation_id)
+    safe_pptx_id = _safe_name(req.pptx_id)
 
     # ── 解碼 base64 ──
     try:
@@ -62,100 +109,183 @@ async def pptx_preview(req: PptxPreviewRequest, request: Request):
         raise HTTPException(status_code=413, detail="File too large (max 20MB)")
 
     # ── 套用企業模板（若有）──
-    template_abs_path = _template_registry.pop(req.pptx_id, "")
+    template_abs_path = await _take_template(req.pptx_id)
     if template_abs_path:
-        from utils.pptx_template import apply_pptx_template
-        print(f"[pptx_preview] layout_hints received: {req.layout_hints}")
-        try:
-            pptx_bytes = await asyncio.to_thread(
-                apply_pptx_template, pptx_bytes, template_abs_path, req.layout_hints
-            )
-        except Exception as e:
-            print(f"[pptx_preview] apply_template failed: {e}, using original")
+        pptx_bytes = await _apply_template(template_abs_path, pptx_bytes, req.layout_hints) or pptx_bytes
 
     # ── 存放路徑：user_profiles/{uid}/conversations/{conv_id}/artifacts/ ──
     artifacts_dir = _PROJECT_ROOT / "user_profiles" / safe_uid / "conversations" / safe_conv / "artifacts"
     artifacts_dir.mkdir(parents=True, exist_ok=True)
 
     pptx_path = artifacts_dir / f"{safe_pptx_id}.pptx"
-    pptx_path.write_bytes(pptx_bytes)
+    await asyncio.to_thread(pptx_path.write_bytes, pptx_bytes)
 
-    # ── 通知後端等待方：.pptx 已存檔，agent 可繼續（不等 LibreOffice）──
-    from agent_tools import _pptx_upload_events
-    _upload_entry = _pptx_upload_events.get(req.pptx_id)
-    if _upload_entry:
-        _upload_entry["result"]["success"] = True
-        _upload_entry["event"].set()
-
-    # ── LibreOffice 轉 PDF（暫存子目錄）──
-    soffice = shutil.which("soffice") or shutil.which("soffice.bin")
-    if not soffice:
-        raise HTTPException(status_code=500, detail="LibreOffice not found on server")
+    job = _start_preview(
+        user_id, req.pptx_id, safe_uid, safe_conv, safe_pptx_id, pptx_path, hash_bytes(pptx_bytes)
+    )
+    await job.wait_done()
+    if job.error:
+        raise HTTPException(status_code=500, detail=job.error)
+    slide_urls = [job.slide_urls[i] for i in range(job.slide_count or 0)]
+    return JSONResponse({"slide_urls": slide_urls, "pptx_url": _pptx_url(safe_uid, safe_conv, safe_pptx_id)})
 
-    tmp_dir = artifacts_dir / f"_pptx_tmp_{safe_pptx_id}"
-    tmp_dir.mkdir(exist_ok=True)
 
-    def _run_soffice():
-        cmd = [soffice, "--headless", "--convert-to", "pdf", "--outdir", str(tmp_dir), str(pptx_path)]
-        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-        return proc.returncode, proc.stderr
+@router.post("/api/pptx-preview/upload")
+async def pptx_preview_upload(
+    request: Request,
+    pptx_id: str,
+    conversation_id: str,
+    layout_hints: str = "[]",
+):
+    """串流上傳：request body 為 .pptx 原始 bytes，邊收邊寫入 artifacts 目錄。
+
+    不經 JSON / base64，記憶體只保留單一 chunk；大小上限在接收過程中檢查，
+    內容 hash 同時累加，供縮圖快取使用。layout_hints 以 JSON 陣列字串放在 query。
+    存檔後立即回傳 job_id，縮圖由 /api/pptx-preview/jobs/{job_id}/events 逐頁推送。
+    """
+    user_id = _authenticate(request)
+    safe_uid = _safe_name(user_id)
+    safe_conv = _safe_name(conversation_id)
+    safe_pptx_id = _safe_name(pptx_id)
 
     try:
-        returncode, stderr = await asyncio.to_thread(_run_soffice)
-    except subprocess.TimeoutExpired:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
-        raise HTTPException(status_code=500, detail="LibreOffice conversion timeout")
-
-    if returncode != 0:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
-        raise HTTPException(status_code=500, detail=f"LibreOffice failed: {stderr[-200:]}")
-
-    pdf_path = tmp_dir / f"{safe_pptx_id}.pdf"
-    if not pdf_path.exists():
-        shutil.rmtree(tmp_dir, ignore_errors=True)
-        raise HTTPException(status_code=500, detail="PDF not generated")
-
-    # ── pymupdf 逐頁轉 PNG ──
-    def _render_pages():
-        doc = fitz.open(str(pdf_path))
-        paths = []
-        mat = fitz.Matrix(1.5, 1.5)  # 1.5x ≈ 144dpi，縮圖夠清楚且不過大
-        for i in range(doc.page_count):
-            dst = artifacts_dir / f"{safe_pptx_id}_slide_{i+1:03d}.png"
-            pix = doc[i].get_pixmap(matrix=mat, alpha=False)
-            pix.save(str(dst))
-            paths.append(dst)
-        doc.close()
-        return paths
+        hints = json.loads(layout_hints)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid layout_hints")
+    if not isinstance(hints, list):
+        raise HTTPException(status_code=400, detail="Invalid layout_hints")
 
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_PPTX_BYTES:
+        raise HTTPException(status_code=413, detail="File too large (max 20MB)")
+
+    artifacts_dir = _PROJECT_ROOT / "user_profiles" / safe_uid / "conversations" / safe_conv / "artifacts"
+    artifacts_dir.mkdir(parents=True, exist_ok=True)
+    pptx_path = artifacts_dir / f"{safe_pptx_id}.pptx"
+    tmp_path = artifacts_dir / f".{safe_pptx_id}.{uuid.uuid4().hex}.upload"
+
+    digest = hashlib.sha256()
+    size = 0
     try:
-        png_paths = await asyncio.to_thread(_render_pages)
-    except Exception as e:
-        _upload_entry2 = _pptx_upload_events.get(req.pptx_id)
-        if _upload_entry2 and "png_event" in _upload_entry2 and not _upload_entry2["png_event"].is_set():
-            _upload_entry2["png_result"]["success"] = False
-            _upload_entry2["png_result"]["error"] = str(e)
-            _upload_entry2["png_event"].set()
-        shutil.rmtree(tmp_dir, ignore_errors=True)
-        raise HTTPException(status_code=500, detail=f"PNG render failed: {e}")
+        with open(tmp_path, "wb") as f:
+            async for chunk in request.stream():
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > MAX_PPTX_BYTES:
+                    raise HTTPException(status_code=413, detail="File too large (max 20MB)")
+                digest.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty body")
+
+        # ── 套用企業模板（若有）：合併需要完整內容，只有此情況才讀回記憶體 ──
+        template_abs_path = await _take_template(pptx_id)
+        if template_abs_path:
+            merged = await _apply_template(template_abs_path, await asyncio.to_thread(tmp_path.read_bytes), hints)
+            if merged is not None:
+                await asyncio.to_thread(tmp_path.write_bytes, merged)
+                content_hash = hash_bytes(merged)
+            else:
+                content_hash = digest.hexdigest()
+        else:
+            content_hash = digest.hexdigest()
+        await asyncio.to_thread(os.replace, tmp_path, pptx_path)
     finally:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_path.unlink(missing_ok=True)
+
+    job = _start_preview(user_id, pptx_id, safe_uid, safe_conv, safe_pptx_id, pptx_path, content_hash)
+    return JSONResponse({"job_id": job.job_id, "pptx_url": _pptx_url(safe_uid, safe_conv, safe_pptx_id)})
+
+
+async def _convert(src: str, outdir: str) -> str:
+    try:
+        return await convert_to_pdf(src, outdir, timeout=120)
+    except OfficeConversionTimeout:
+        raise RuntimeError("LibreOffice conversion timeout")
+    except OfficeConversionError as e:
+        raise RuntimeError(f"LibreOffice failed: {str(e)[-200:]}")
+
+
+def _start_preview(
+    user_id: str,
+    pptx_id: str,
+    safe_uid: str,
+    safe_conv: str,
+    safe_pptx_id: str,
+    pptx_path: pathlib.Path,
+    content_hash: str,
+) -> PreviewJob:
+    """.pptx 已存檔：通知 agent，並在背景轉出縮圖（逐頁發布到 artifacts 目錄）。"""
+    # ── 通知後端等待方：.pptx 已存檔，agent 可繼續（不等 LibreOffice）──
+    coordination.signal("pptx_upload", pptx_id, {"stage": "saved"})
+
+    if not find_soffice():
+        raise HTTPException(status_code=500, detail="LibreOffice not found on server")
+
+    def _notify_agent(job: PreviewJob) -> None:
+        # 開頭幾頁就緒（或失敗）即讓 render_pptx 繼續，其餘頁面背景產生
+        ready = job.ready_prefix()
+        if job.error and not ready:
+            payload = {"stage": "png", "success": False, "error": job.error}
+        else:
+            payload = {"stage": "png", "success": True, "slide_count": job.slide_count or ready, "ready_count": ready}
+        coordination.signal("pptx_upload", pptx_id, payload)
+
+    # ── LibreOffice 轉 PDF + pymupdf 逐頁轉 PNG（以內容 hash 快取，重複上傳相同簡報直接取用）──
+    job = create_job(user_id)
+    return start_preview_job(
+        job,
+        pptx_path=str(pptx_path),
+        artifacts_dir=str(pptx_path.parent),
+        name_prefix=safe_pptx_id,
+        url_base=f"/api/user-files/user_profiles/{safe_uid}/conversations/{safe_conv}/artifacts",
+        cache_key=make_key(content_hash, _PREVIEW_SCALE, variant="preview.pptx"),
+        convert=_convert,
+        rasterize=rasterize_pdf,
+        get_page_count=get_page_count,
+        # 1.5x ≈ 144dpi，縮圖夠清楚且不過大
+        scale=_PREVIEW_SCALE,
+        png_compress_level=_PREVIEW_PNG_LEVEL,
+        on_ready=_notify_agent,
+    )
+
+
+def _pptx_url(safe_uid: str, safe_conv: str, safe_pptx_id: str) -> str:
+    # 走現有 /api/user-files/ 路由，已有 JWT 驗證
+    return f"/api/user-files/user_profiles/{safe_uid}/conversations/{safe_conv}/artifacts/{safe_pptx_id}.pptx"
+
+
+@router.get("/api/pptx-preview/jobs/{job_id}")
+async def pptx_preview_job(job_id: str, request: Request):
+    """輪詢：回傳目前已完成的縮圖（未完成的頁為 null）。"""
+    job = get_job(job_id, _authenticate(request))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(job.snapshot())
+
 
-    # ── 通知後端 PNG 已就緒 ──
-    _upload_entry2 = _pptx_upload_events.get(req.pptx_id)
-    if _upload_entry2 and "png_event" in _upload_entry2:
-        _upload_entry2["png_result"]["success"] = True
-        _upload_entry2["png_result"]["slide_count"] = len(png_paths)
-        _upload_entry2["png_event"].set()
+@router.get("/api/pptx-preview/jobs/{job_id}/events")
+async def pptx_preview_job_events(job_id: str, request: Request):
+    """Server-sent events：重播已發生的事件，之後每頁縮圖完成即推送。"""
+    job = get_job(job_id, _authenticate(request))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
 
-    # ── 回傳縮圖 URL（走現有 /api/user-files/ 路由，已有 JWT 驗證）──
-    slide_urls = [
-        f"/api/user-files/user_profiles/{safe_uid}/conversations/{safe_conv}/artifacts/{p.name}"
-        for p in png_paths
-    ]
-    pptx_url = f"/api/user-files/user_profiles/{safe_uid}/conversations/{safe_conv}/artifacts/{safe_pptx_id}.pptx"
+    async def _stream():
+        async for kind, data in job.follow():
+            if await request.is_disconnected():
+                return
+            if kind == "ping":
+                yield ": ping\n\n"
+            else:
+                yield f"event: {kind}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-    return JSONResponse({"slide_urls": slide_urls, "pptx_url": pptx_url})
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 class PptxAbortRequest(BaseModel):
@@ -167,17 +297,9 @@ class PptxAbortRequest(BaseModel):
 async def pptx_upload_abort(req: PptxAbortRequest):
     """前端 pptxgenjs 執行失敗或元件 unmount 時，快速通知後端解除等待。
     sendBeacon 無法帶 cookie，故此端點不驗證 JWT；
-    只觸發 in-memory event，不寫入任何檔案，無安全風險。
+    只觸發等待中的 event（多 worker 時經 coordination 轉送），不寫入任何檔案；
+    pptx_id 格式不符者直接忽略，避免任意字串寫入協調後端。
     """
-    from agent_tools import _pptx_upload_events
-    entry = _pptx_upload_events.get(req.pptx_id)
-    if entry:
-        entry["result"]["success"] = False
-        entry["result"]["error"] = req.error or "前端中止"
-        if "event" in entry:
-            entry["event"].set()
-        if "png_event" in entry and not entry["png_event"].is_set():
-            entry["png_result"]["success"] = False
-            entry["png_result"]["error"] = req.error or "前端中止"
-            entry["png_event"].set()
+    if _PPTX_ID_RE.fullmatch(req.pptx_id):
+        coordination.signal("pptx_upload", req.pptx_id, {"stage": "abort", "error": req.error or "前端中止"})
     return JSONResponse({"ok": True})
@@ -1,29 +1,34 @@
 import pathlib
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request
 
-from utils.artifact_publisher import get_published_html_path, get_published_artifact_record
-from utils.share_manager import get_shared_thread_record
+from utils.artifact_publisher import get_published_html_path, get_published_artifact_record_async
+from utils.share_manager import get_shared_thread_record_async
+from utils.static_delivery import file_response
 
 router = APIRouter()
 
 
 @router.get("/p/{token}")
-async def serve_published(token: str):
-    """公開存取已發布的 HTML artifact（無需登入）。"""
+async def serve_published(request: Request, token: str):
+    """公開存取已發布的 HTML artifact（無需登入）。
+
+    重新發布會覆寫同一 token 的內容，因此不使用 immutable；以 ETag 讓瀏覽器每次便宜地驗證（304）。
+    """
     html_path = get_published_html_path(token)
     if html_path is None:
         raise HTTPException(status_code=404)
-    return FileResponse(
+    return await file_response(
+        request,
         html_path,
         media_type="text/html",
-        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+        cache_control="public, no-cache",
+        compressible=True,
     )
 
 
 @router.get("/p/{token}/files/{rel_path:path}")
-async def serve_published_resource(token: str, rel_path: str):
+async def serve_published_resource(request: Request, token: str, rel_path: str):
     """公開存取已發布 artifact 的附屬資源（影片、音訊、圖片、下載檔等）。
 
     安全保護：
@@ -35,7 +40,7 @@ async def serve_published_resource(token: str, rel_path: str):
     if not token or len(token) != 32 or not all(c in "0123456789abcdef" for c in token):
         raise HTTPException(status_code=404)
 
-    record = get_published_artifact_record(token)
+    record = await get_published_artifact_record_async(token)
     if record is None or not record.conversation_folder:
         raise HTTPException(status_code=404)
 
@@ -55,14 +60,11 @@ async def serve_published_resource(token: str, rel_path: str):
     if not file_path.is_file():
         raise HTTPException(status_code=404)
 
-    return FileResponse(
-        file_path,
-        headers={"Cache-Control": "public, max-age=86400"},
-    )
+    return await file_response(request, file_path)
 
 
 @router.get("/share/{token}/files/{rel_path:path}")
-async def serve_shared_thread_file(token: str, rel_path: str):
+async def serve_shared_thread_file(request: Request, token: str, rel_path: str):
     """公開存取分享對話的附屬資源（圖片、上傳檔案等）。
 
     安全保護（與 /p/{token}/files/ 相同機制）：
@@ -75,7 +77,7 @@ async def serve_shared_thread_file(token: str, rel_path: str):
     if not token or len(token) != 32 or not all(c in "0123456789abcdef" for c in token):
         raise HTTPException(status_code=404)
 
-    record = get_shared_thread_record(token)
+    record = await get_shared_thread_record_async(token)
     if record is None or not record.conversation_folder:
         raise HTTPException(status_code=404)
 
@@ -95,7 +97,4 @@ async def serve_shared_thread_file(token: str, rel_path: str):
     if not file_path.is_file():
         raise HTTPException(status_code=404)
 
-    return FileResponse(
-        file_path,
-        headers={"Cache-Control": "public, max-age=86400"},
-    )
+    return await file_response(request, file_path)
@@ -9,7 +9,7 @@ from typing import Optional
 from chainlit.auth.cookie import get_token_from_cookies
 from chainlit.auth.jwt import decode_jwt
 
-from utils.skills_manager import discover_skills, _parse_frontmatter, _find_skill_md
+from utils.skills_manager import discover_skills, invalidate_skill, _parse_frontmatter, _find_skill_md
 from utils.user_profile import get_user_skills_dir
 
 router = APIRouter()
@@ -218,6 +218,7 @@ async def delete_skill(request: Request, skill_name: str):
         raise HTTPException(status_code=404, detail="Skill 不存在")
 
     shutil.rmtree(skill_dir)
+    invalidate_skill(skill_dir)
     return {"message": f"已刪除 Skill「{skill_name}」"}
 
 
@@ -283,6 +284,7 @@ async def write_skill_file(request: Request, skill_name: str, body: FileWriteReq
             f.write(body.content)
     except OSError as e:
         raise HTTPException(status_code=500, detail=f"寫入失敗：{e}")
+    invalidate_skill(skill_dir)
     return {"message": "已儲存", "path": body.path}
 
 
@@ -300,6 +302,7 @@ async def delete_skill_file(request: Request, skill_name: str, body: FileDeleteR
         os.remove(abs_path)
     except OSError as e:
         raise HTTPException(status_code=500, detail=f"刪除失敗：{e}")
+    invalidate_skill(skill_dir)
     return {"message": "已刪除", "path": body.path}
 
 
@@ -0,0 +1,107 @@
+"""heartbeat：2,000 個模擬 session 的 task 數與 event loop 開銷。
+
+每個 session 以一個 task 模擬 agent.run() 的數次 LLM 迭代；一半的 session 持續串流輸出，
+另一半在迭代期間完全靜默（例如 tool call arguments 累積中）。比較三種模式：
+    none       不送心跳（扣除 session 本身開銷用的基準）
+    per-task   原本的 _ws_keepalive：每次迭代建立一個 sleep 迴圈 task，不論是否有輸出都送
+    wheel      utils.heartbeat：共用一個排程 task，只送給閒置超過門檻的串流
+列出 session 以外的最大 task 數、送出的心跳數與 CPU 時間。
+為了縮短執行時間，IDLE_THRESHOLD / TICK 依 --idle 等比例縮小（預設 10 s → 1 s）。
+
+用法（於專案根目錄）：
+    python -m scripts.bench_heartbeat [--sessions 2000] [--iterations 3] [--idle 1.0]
+"""
+import argparse
+import asyncio
+import time
+
+from utils import heartbeat
+
+
+class _Stream:
+    """模擬 Chainlit Message.stream_token 的計數器。"""
+
+    def __init__(self):
+        self.keepalives = 0
+
+    async def stream_token(self, token: str) -> None:
+        if token == "":
+            self.keepalives += 1
+
+
+async def _session(mode: str, streaming: bool, iterations: int, idle: float, counter: _Stream) -> None:
+    for _ in range(iterations):
+        if mode == "per-task":
+            async def _ws_keepalive():
+                while True:
+                    await asyncio.sleep(idle)
+                    try:
+                        await counter.stream_token("")
+                    except Exception:
+                        break
+            handle = asyncio.create_task(_ws_keepalive())
+        elif mode == "wheel":
+            handle = heartbeat.register(lambda: counter.stream_token(""))
+        else:
+            handle = None
+
+        loop = asyncio.get_running_loop()
+        end = loop.time() + idle * 1.5
+        try:
+            while loop.time() < end:
+                await asyncio.sleep(idle / 4)
+                if streaming and mode == "wheel":
+                    handle.touch()
+        finally:
+            if mode == "per-task":
+                handle.cancel()
+            elif mode == "wheel":
+                handle.close()
+
+
+async def _run(mode: str, sessions: int, iterations: int, idle: float) -> None:
+    streams = [_Stream() for _ in range(sessions)]
+    peak_extra = 0
+    done = False
+
+    async def _monitor():
+        nonlocal peak_extra
+        while not done:
+            # 扣掉 session 本身、_run 與 _monitor
+            peak_extra = max(peak_extra, len(asyncio.all_tasks()) - sessions - 2)
+            await asyncio.sleep(idle / 10)
+
+    monitor = asyncio.create_task(_monitor())
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    await asyncio.gather(*(
+        _session(mode, i % 2 == 0, iterations, idle, streams[i]) for i in range(sessions)
+    ))
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    done = True
+    await monitor
+
+    to_streaming = sum(s.keepalives for i, s in enumerate(streams) if i % 2 == 0)
+    to_silent = sum(s.keepalives for i, s in enumerate(streams) if i % 2 == 1)
+    print(
+        f"{mode:9s} 額外 task 最多 {peak_extra:5d}  心跳 {to_streaming + to_silent:5d}"
+        f"（串流中 {to_streaming}、靜默 {to_silent}）  CPU {cpu * 1000:7.0f} ms / {wall:.1f} s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--idle", type=float, default=1.0, help="縮放後的閒置門檻（秒）")
+    args = parser.parse_args()
+
+    heartbeat.TICK = heartbeat.TICK * args.idle / heartbeat.IDLE_THRESHOLD
+    heartbeat.IDLE_THRESHOLD = args.idle
+    for mode in ("none", "per-task", "wheel"):
+        asyncio.run(_run(mode, args.sessions, args.iterations, args.idle))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""memory_index：1,000 次連續記憶編輯的索引維護成本。
+
+在暫存的 user_profiles 目錄建立一位使用者（預設 150 個記憶檔），連續 1,000 次更新記憶檔的
+description（記憶檔本身的寫入兩邊相同，不計時），比較：
+    rebuild      原本 routers/memory.py 的 _rebuild_index：每次列出全部記憶檔、解析 frontmatter、整份覆寫
+    incremental  memory_index.upsert_entry：只改單一行，延遲合併寫出（最後 flush 一次）
+列出索引維護的總耗時與 MEMORY.md 實際寫入次數。
+
+用法（於專案根目錄）：
+    python -m scripts.bench_memory_index [--files 150] [--edits 1000]
+"""
+import argparse
+import random
+import tempfile
+import time
+
+from utils import memory_index, memory_manager
+
+_USER = "bench-user"
+
+
+def _content(i: int, description: str) -> str:
+    return f"---\nname: 記憶 {i}\ndescription: {description}\ntype: project\n---\n\n內容 {i}\n"
+
+
+def _rebuild_index(user_id: str) -> None:
+    """原本 routers/memory.py 的實作（照抄作為對照）。"""
+    files = memory_manager.list_memory_files(user_id)
+    if not files:
+        memory_manager.write_memory_index(user_id, "# Memory Index\n")
+        return
+    lines = ["# Memory Index\n"]
+    for f in sorted(files, key=lambda x: x["name"].lower()):
+        filename = f["filename"]
+        name = f["name"] or filename
+        description = f["description"] or ""
+        hook = f"- [{name}]({filename})"
+        if description:
+            hook += f" — {description}"
+        lines.append(hook)
+    memory_manager.write_memory_index(user_id, "\n".join(lines) + "\n")
+
+
+def _run(label: str, files: int, edits: int, update_index, finish, rng: random.Random) -> None:
+    writes = 0
+    original = memory_manager.write_memory_index
+
+    def counting_write(user_id: str, content: str) -> str:
+        nonlocal writes
+        writes += 1
+        return original(user_id, content)
+
+    memory_manager.write_memory_index = counting_write
+    memory_index.write_memory_index = counting_write
+    try:
+        spent = 0.0
+        for n in range(edits):
+            i = rng.randrange(files)
+            description = f"第 {n} 次更新"
+            memory_manager.write_memory_file(_USER, f"m{i:03d}.md", _content(i, description))
+            start = time.perf_counter()
+            update_index(i, description)
+            spent += time.perf_counter() - start
+        start = time.perf_counter()
+        finish()
+        spent += time.perf_counter() - start
+    finally:
+        memory_manager.write_memory_index = original
+        memory_index.write_memory_index = original
+    print(f"{label:12s} 索引維護 {spent * 1000:9.1f} ms  每次 {spent / edits * 1e6:8.1f} µs  MEMORY.md 寫入 {writes} 次")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=150)
+    parser.add_argument("--edits", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        memory_manager._USER_PROFILES_ROOT = tmp
+        for i in range(args.files):
+            memory_manager.write_memory_file(_USER, f"m{i:03d}.md", _content(i, "初始"))
+        _rebuild_index(_USER)
+
+        _run(
+            "rebuild", args.files, args.edits,
+            lambda i, description: _rebuild_index(_USER), lambda: None, random.Random(args.seed),
+        )
+        _run(
+            "incremental", args.files, args.edits,
+            lambda i, description: memory_index.upsert_entry(_USER, f"m{i:03d}.md", f"記憶 {i}", description),
+            lambda: memory_index.flush(_USER), random.Random(args.seed),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""pptx_template：媒體量大的模板合併延遲與暫存磁碟 I/O。
+
+產生一份含大量圖片的企業模板（預設 20 MB media）與一份 pptxgenjs 風格的來源簡報，量測：
+    extract+rezip  舊實作的 I/O 骨架：兩份 ZIP 解壓到暫存目錄、整包重新壓縮
+                   （不含 XML 改寫，是舊實作成本的下限）
+    cold           apply_pptx_template 第一次呼叫（含解析模板、放入快取）
+    warm           模板已在快取中的合併
+每項列出平均延遲與期間寫入的 bytes（Linux 的 /proc/self/io wchar；其他平台顯示 n/a）。
+
+用法（於專案根目錄）：
+    python -m scripts.bench_pptx_template [--media-mb 20] [--slides 30] [--runs 5]
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from utils import pptx_template
+
+_P = 'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"'
+_R = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+_RELS = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>' \
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{}</Relationships>'
+_REL = '<Relationship Id="{}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/{}" Target="{}"/>'
+
+
+def _content_types(slides: int) -> str:
+    overrides = "".join(
+        f'<Override PartName="/ppt/slides/slide{i}.xml" '
+        f'ContentType="{pptx_template.SLIDE_CONTENT_TYPE}"/>' for i in range(1, slides + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Default Extension="png" ContentType="image/png"/>'
+        f"{overrides}</Types>"
+    )
+
+
+def _presentation(slides: int) -> tuple[str, str]:
+    ids = "".join(f'<p:sldId id="{255 + i}" r:id="rId{i + 1}"/>' for i in range(1, slides + 1))
+    pres = f'<p:presentation {_P} {_R}><p:sldIdLst>{ids}</p:sldIdLst></p:presentation>'
+    rels = _REL.format("rId1", "slideMaster", "slideMasters/slideMaster1.xml") + "".join(
+        _REL.format(f"rId{i + 1}", "slide", f"slides/slide{i}.xml") for i in range(1, slides + 1)
+    )
+    return pres, _RELS.format(rels)
+
+
+def _slide(i: int, media: str | None) -> tuple[str, str]:
+    shapes = "".join(f"<p:sp><p:txBody><a:p><a:r><a:t>第 {i} 頁 項目 {k}</a:t></a:r></a:p></p:txBody></p:sp>"
+                     for k in range(20))
+    xml = f'<p:sld {_P} {_R} xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main">' \
+          f"<p:cSld><p:spTree>{shapes}</p:spTree></p:cSld></p:sld>"
+    rels = _REL.format("rId1", "slideLayout", "../slideLayouts/slideLayout1.xml")
+    if media:
+        rels += _REL.format("rId2", "image", f"../media/{media}")
+    return xml, _RELS.format(rels)
+
+
+def _write_zip(path: Path, parts: dict[str, bytes | str]) -> None:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        for name, data in parts.items():
+            z.writestr(name, data)
+
+
+def _make_template(path: Path, media_mb: int) -> None:
+    parts: dict[str, bytes | str] = {"[Content_Types].xml": _content_types(3)}
+    parts["ppt/presentation.xml"], parts["ppt/_rels/presentation.xml.rels"] = _presentation(3)
+    parts["ppt/slideMasters/slideMaster1.xml"] = f"<p:sldMaster {_P}/>"
+    parts["ppt/theme/theme1.xml"] = "<a:theme xmlns:a='http://schemas.openxmlformats.org/drawingml/2006/main'/>"
+    for n, (name, kind) in enumerate([("Title Slide", "title"), ("Blank", "blank"), ("Ending Page", "obj")], 1):
+        parts[f"ppt/slideLayouts/slideLayout{n}.xml"] = \
+            f'<p:sldLayout {_P} type="{kind}"><p:cSld name="{name}"/></p:sldLayout>'
+    for n in range(1, 4):
+        parts[f"ppt/slides/slide{n}.xml"], parts[f"ppt/slides/_rels/slide{n}.xml.rels"] = _slide(n, None)
+    # 背景圖、logo 等已壓縮過的圖片：每張 1 MB 隨機資料
+    for n in range(media_mb):
+        parts[f"ppt/media/template_bg{n + 1}.png"] = os.urandom(1024 * 1024)
+    _write_zip(path, parts)
+
+
+def _make_source(slides: int) -> bytes:
+    parts: dict[str, bytes | str] = {"[Content_Types].xml": _content_types(slides)}
+    parts["ppt/presentation.xml"], parts["ppt/_rels/presentation.xml.rels"] = _presentation(slides)
+    for n in range(1, slides + 1):
+        media = f"image{n}.png" if n % 3 == 0 else None
+        parts[f"ppt/slides/slide{n}.xml"], parts[f"ppt/slides/_rels/slide{n}.xml.rels"] = _slide(n, media)
+        if media:
+            parts[f"ppt/media/{media}"] = os.urandom(64 * 1024)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        for name, data in parts.items():
+            z.writestr(name, data)
+    return buf.getvalue()
+
+
+def _extract_rezip(source_bytes: bytes, template_path: Path) -> bytes:
+    with tempfile.TemporaryDirectory() as tmp:
+        src_dir, tpl_dir = Path(tmp) / "source", Path(tmp) / "template"
+        with zipfile.ZipFile(io.BytesIO(source_bytes)) as z:
+            z.extractall(src_dir)
+        with zipfile.ZipFile(template_path) as z:
+            z.extractall(tpl_dir)
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zout:
+            for f in sorted(tpl_dir.rglob("*")):
+                if f.is_file():
+                    zout.write(f, f.relative_to(tpl_dir))
+        return buf.getvalue()
+
+
+def _written_bytes() -> int | None:
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _measure(label: str, fn, runs: int) -> None:
+    before = _written_bytes()
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    elapsed = (time.perf_counter() - start) / runs
+    after = _written_bytes()
+    written = "n/a" if before is None or after is None else f"{(after - before) / runs / 1024 / 1024:7.1f} MB"
+    print(f"{label:14s} {elapsed * 1000:8.1f} ms  寫入 {written}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--media-mb", type=int, default=20)
+    parser.add_argument("--slides", type=int, default=30)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = Path(tmp) / "template.pptx"
+        _make_template(template, args.media_mb)
+        source = _make_source(args.slides)
+        print(f"模板 {template.stat().st_size / 1024 / 1024:.1f} MB，來源 {len(source) / 1024:.0f} KB / {args.slides} 頁")
+
+        _measure("extract+rezip", lambda: _extract_rezip(source, template), args.runs)
+        _measure("cold", lambda: pptx_template.apply_pptx_template(source, str(template)), 1)
+        _measure("warm", lambda: pptx_template.apply_pptx_template(source, str(template)), args.runs)
+
+        merged = pptx_template.apply_pptx_template(source, str(template))
+        with zipfile.ZipFile(io.BytesIO(merged)) as z:
+            assert z.testzip() is None
+            slides = [n for n in z.namelist() if n.startswith("ppt/slides/slide")]
+        print(f"輸出 {len(merged) / 1024 / 1024:.1f} MB，{len(slides)} 頁")
+
+
+if __name__ == "__main__":
+    main()
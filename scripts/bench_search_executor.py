@@ -0,0 +1,89 @@
+"""search_executor：大型資料夾的第一頁延遲與病態 regex 的時間預算。
+
+在暫存目錄產生合成資料夾（預設 200 個約 1 MB 的文字檔，外加幾個二進位檔），量測：
+    spawn       新 worker 的啟動時間（不計入時間預算）
+    first page  只取第一頁（head_limit=50）時的延遲
+    full        掃完全部檔案的延遲
+    binary      二進位檔是否被略過
+    (a+)+$      病態 regex 在時間預算內被終止，仍回傳已找到的部分結果
+
+用法（於專案根目錄）：
+    python -m scripts.bench_search_executor [--files 200] [--size-kb 1024] [--budget 2]
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+from pathlib import Path
+
+from utils import search_executor
+
+
+def _make_folder(root: Path, files: int, size_kb: int, rng: random.Random) -> list[search_executor.FileTask]:
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(2000)]
+    tasks = []
+    for i in range(files):
+        path = root / f"log_{i:04d}.txt"
+        with open(path, "w", encoding="utf-8") as f:
+            written = 0
+            n = 0
+            while written < size_kb * 1024:
+                line = " ".join(rng.choices(words, k=12))
+                if n % 500 == 0:
+                    line += " ERROR timeout"
+                line += "\n"
+                f.write(line)
+                written += len(line)
+                n += 1
+        tasks.append(search_executor.FileTask(str(path), path.name))
+    for i in range(3):
+        path = root / f"blob_{i}.bin"
+        path.write_bytes(os.urandom(1024) + b"\x00" + os.urandom(size_kb * 1024))
+        tasks.append(search_executor.FileTask(str(path), path.name))
+    return tasks
+
+
+def _timed(label: str, *args, **kwargs) -> search_executor.SearchOutcome:
+    start = time.perf_counter()
+    outcome = search_executor.search(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    flags = ", ".join(
+        name for name, on in (("stopped_early", outcome.stopped_early), ("timed_out", outcome.timed_out)) if on
+    )
+    print(
+        f"{label:11s} {elapsed * 1000:9.1f} ms  匹配 {outcome.total_matches:6d}  輸出 {len(outcome.lines):6d} 行"
+        f"  略過二進位 {outcome.skipped_binary}" + (f"  [{flags}]" if flags else "")
+    )
+    return outcome
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=1024)
+    parser.add_argument("--budget", type=float, default=2.0, help="病態 regex 的時間預算（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        tasks = _make_folder(root, args.files, args.size_kb, random.Random(args.seed))
+        total_mb = sum(os.path.getsize(t.path) for t in tasks) / 1024 / 1024
+        print(f"{len(tasks)} 個檔案，共 {total_mb:.0f} MB")
+
+        _timed("spawn", "x", 0, [], 0, None)
+        _timed("first page", "ERROR", 0, tasks, 2, 50 + 1, budget=600)
+        _timed("full", "ERROR", 0, tasks, 2, None, budget=600)
+
+        # 最後一個文字檔之後接一行會觸發災難性回溯的內容
+        evil = root / "zz_evil.txt"
+        evil.write_text("a" * 40 + "b\n", encoding="utf-8")
+        evil_tasks = tasks[:2] + [search_executor.FileTask(str(evil), evil.name)]
+        outcome = _timed("(a+)+$", r"(a+)+$|ERROR", 0, evil_tasks, 0, None, budget=args.budget)
+        print(f"{'':11s} 逾時時停在 {outcome.current_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""grep_files：全掃描 vs trigram 索引的基準測試。
+
+在暫存目錄產生合成資料夾（預設 5,000 個文字檔），分別量測：
+    scan   不使用索引，所有檔案交給 search_executor 逐行比對
+    cold   第一次查詢：建索引 + 只比對候選檔案 / 行區段
+    warm   索引已建好後再次查詢
+並列出候選檔案數與索引佔用的記憶體。
+
+用法（於專案根目錄）：
+    python -m scripts.bench_search_index [--files 5000] [--lines 200]
+"""
+import argparse
+import random
+import re
+import string
+import tempfile
+import time
+from pathlib import Path
+
+from utils import search_executor, search_index
+
+
+def _make_folder(root: Path, files: int, lines: int, needle: str, hits: int, rng: random.Random) -> None:
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(5000)]
+    hit_files = set(rng.sample(range(files), hits))
+    for i in range(files):
+        sub = root / f"d{i % 50:02d}"
+        sub.mkdir(exist_ok=True)
+        body = [" ".join(rng.choices(words, k=10)) for _ in range(lines)]
+        if i in hit_files:
+            body[rng.randrange(lines)] += f" {needle}"
+        (sub / f"f{i:05d}.txt").write_text("\n".join(body) + "\n", encoding="utf-8")
+
+
+def _tasks(root: Path, index: search_index.TrigramIndex | None, trigrams: set[str]) -> list[search_executor.FileTask]:
+    tasks = []
+    for path in sorted(root.rglob("*.txt")):
+        ranges = index.candidate_ranges(str(path), trigrams) if index is not None else None
+        if ranges == []:
+            continue
+        tasks.append(search_executor.FileTask(str(path), str(path.relative_to(root)), ranges))
+    return tasks
+
+
+def _run(label: str, root: Path, pattern: str, index: search_index.TrigramIndex | None) -> None:
+    regex = re.compile(pattern)
+    start = time.perf_counter()
+    tasks = _tasks(root, index, search_index.required_trigrams(pattern, False))
+    select = time.perf_counter() - start
+    outcome = search_executor.search(regex.pattern, regex.flags, tasks, 0, None, budget=600)
+    total = time.perf_counter() - start
+    print(
+        f"{label:5s} 總計 {total * 1000:8.1f} ms（選檔 {select * 1000:7.1f} ms）"
+        f"  候選檔案 {len(tasks):5d}  匹配 {outcome.total_matches}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--hits", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    needle = "quarterly_revenue_forecast"
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        t0 = time.perf_counter()
+        _make_folder(root, args.files, args.lines, needle, args.hits, random.Random(args.seed))
+        print(f"產生 {args.files} 個檔案 × {args.lines} 行：{time.perf_counter() - t0:.1f} s")
+
+        # 先跑一次空搜尋，讓 worker 行程啟動的時間不算進後面的量測
+        search_executor.search("x", 0, [], 0, None)
+
+        _run("scan", root, needle, None)
+        index = search_index.get_index(str(root))
+        _run("cold", root, needle, index)
+        _run("warm", root, needle, index)
+        print(f"索引記憶體 {search_index.memory_usage() / 1024 / 1024:.1f} MB")
+        search_index.drop_index(str(root))
+
+
+if __name__ == "__main__":
+    main()
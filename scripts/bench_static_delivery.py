@@ -0,0 +1,94 @@
+"""static_delivery：公開頁面傳送的位元組數與吞吐量基準測試。
+
+產生一份典型的自包含 HTML 報告（表格 + 內嵌 base64 圖片 + 內嵌 CSS/JS），
+以 TestClient 比較：
+    plain        原本的 FileResponse（無壓縮、無 ETag 重新驗證）
+    gzip         file_response 傳送預先壓縮的 .gz
+    revalidate   帶 If-None-Match 的重複造訪（304）
+    range        Range 請求（206，傳送原檔片段）
+各自列出單次回應實際傳輸的 bytes 與每秒請求數。
+
+用法（於專案根目錄）：
+    python -m scripts.bench_static_delivery [--rows 3000] [--requests 300]
+"""
+import argparse
+import base64
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse
+from fastapi.testclient import TestClient
+
+from utils.static_delivery import file_response, precompress
+
+
+def _make_report(path: Path, rows: int, rng: random.Random) -> None:
+    image = base64.b64encode(os.urandom(32 * 1024)).decode()  # 已壓縮過的圖片幾乎無法再壓縮
+    body = [
+        "<!doctype html><html><head><meta charset='utf-8'><title>季度報告</title>",
+        "<style>" + "table{border-collapse:collapse}td,th{border:1px solid #ccc;padding:4px}" * 20 + "</style>",
+        "</head><body><h1>季度營收報告</h1>",
+        f"<img src='data:image/png;base64,{image}'>",
+        "<table><tr><th>地區</th><th>產品</th><th>月份</th><th>營收</th><th>成長率</th></tr>",
+    ]
+    regions = ["北區", "中區", "南區", "東區", "海外"]
+    products = ["標準方案", "進階方案", "企業方案", "顧問服務"]
+    for _ in range(rows):
+        body.append(
+            f"<tr><td>{rng.choice(regions)}</td><td>{rng.choice(products)}</td>"
+            f"<td>2026-{rng.randint(1, 12):02d}</td><td>{rng.randint(1000, 999999):,}</td>"
+            f"<td>{rng.uniform(-20, 40):.1f}%</td></tr>"
+        )
+    body.append("</table><script>" + "document.querySelectorAll('td').forEach(function(td){});" * 50)
+    body.append("</script></body></html>")
+    path.write_text("\n".join(body), encoding="utf-8")
+
+
+def _bench(client: TestClient, label: str, url: str, headers: dict, requests: int) -> None:
+    resp = client.get(url, headers=headers)
+    wire = resp.num_bytes_downloaded
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(url, headers=headers)
+    elapsed = time.perf_counter() - start
+    print(f"{label:10s} HTTP {resp.status_code}  傳輸 {wire:9,d} bytes  {requests / elapsed:8.0f} req/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=3000)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = Path(tmp) / "report.html"
+        _make_report(report, args.rows, random.Random(args.seed))
+        start = time.perf_counter()
+        precompress(report)
+        print(f"報告 {report.stat().st_size:,} bytes，precompress {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        app = FastAPI()
+
+        @app.get("/plain")
+        async def plain():
+            return FileResponse(report, media_type="text/html")
+
+        @app.get("/p")
+        async def published(request: Request):
+            return await file_response(request, report, media_type="text/html", compressible=True)
+
+        with TestClient(app) as client:
+            etag = client.get("/p", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+            _bench(client, "plain", "/plain", {"Accept-Encoding": "identity"}, args.requests)
+            _bench(client, "gzip", "/p", {"Accept-Encoding": "gzip"}, args.requests)
+            _bench(client, "revalidate", "/p", {"Accept-Encoding": "gzip", "If-None-Match": etag}, args.requests)
+            _bench(client, "range", "/p", {"Range": "bytes=0-65535"}, args.requests)
+
+
+if __name__ == "__main__":
+    main()
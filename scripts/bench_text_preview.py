@@ -0,0 +1,117 @@
+"""text_preview：新增檔案預覽在大型混合資料夾上的成本。
+
+產生一個混合資料夾（大型 log、程式碼、改了文字副檔名的二進位檔、無副檔名檔案），
+模擬 check_and_process_new_files 每次工具呼叫後對所有檔案做一次預覽，比較：
+    full      原本的作法：每次以 pygments 解析 lexer，文字檔（500 KB 以內）整份讀入
+    cold      get_text_preview + 已快取 lexer 解析的 _get_text_file_info，快取清空後第一次
+    cached    檔案都沒變時再跑一次
+列出每次耗時與讀取的 bytes（Linux 的 /proc/self/io rchar；其他平台顯示 n/a），
+以及 lexer 解析的單次耗時。
+
+用法（於專案根目錄）：
+    python -m scripts.bench_text_preview [--logs 20] [--log-kb 500] [--passes 5]
+"""
+import argparse
+import asyncio
+import os
+import random
+import string
+import tempfile
+import time
+from pathlib import Path
+
+from utils import text_preview
+from utils.file_handler import TEXT_PREVIEW_SIZE_LIMIT, _get_text_file_info, _text_info_for
+
+
+def _make_folder(root: Path, logs: int, log_kb: int, rng: random.Random) -> list[str]:
+    for i in range(logs):
+        lines = []
+        size = 0
+        while size < log_kb * 1024 - 200:
+            line = f"2026-10-19 12:00:{i:02d} INFO worker-{rng.randint(1, 9)} " + \
+                "".join(rng.choices(string.ascii_letters, k=60))
+            lines.append(line)
+            size += len(line) + 1
+        (root / f"run_{i:02d}.log").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    for i, ext in enumerate([".py", ".js", ".md", ".json", ".csv", ".html", ".yaml", ".sql"] * 3):
+        (root / f"code_{i:02d}{ext}").write_text(f"# file {i}\n" + "x = 1\n" * 2000, encoding="utf-8")
+    for i in range(10):
+        (root / f"blob_{i}.txt").write_bytes(os.urandom(200 * 1024))  # 副檔名是 .txt 的二進位檔
+    for name in ("README", "LICENSE", "Makefile", "Dockerfile", "CMakeLists.txt"):
+        (root / name).write_text("build instructions\n" * 200, encoding="utf-8")
+    return sorted(str(p) for p in root.iterdir())
+
+
+def _full_pass(paths: list[str]) -> None:
+    for path in paths:
+        is_text, _lang = _text_info_for.__wrapped__(os.path.basename(path))
+        if is_text and os.path.getsize(path) <= TEXT_PREVIEW_SIZE_LIMIT:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                f.read()
+
+
+def _preview_pass(paths: list[str]) -> None:
+    async def _run():
+        for path in paths:
+            _get_text_file_info(path)
+            await text_preview.get_text_preview(path)
+    asyncio.run(_run())
+
+
+def _read_bytes() -> int | None:
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _measure(label: str, fn, paths: list[str], passes: int) -> None:
+    before = _read_bytes()
+    start = time.perf_counter()
+    for _ in range(passes):
+        fn(paths)
+    elapsed = (time.perf_counter() - start) / passes
+    after = _read_bytes()
+    read = "n/a" if before is None or after is None else f"{(after - before) / passes / 1024:9.0f} KB"
+    print(f"{label:7s} 每次 {elapsed * 1000:8.1f} ms  讀取 {read}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logs", type=int, default=20)
+    parser.add_argument("--log-kb", type=int, default=500)
+    parser.add_argument("--passes", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = _make_folder(Path(tmp), args.logs, args.log_kb, random.Random(args.seed))
+        total = sum(os.path.getsize(p) for p in paths)
+        print(f"{len(paths)} 個檔案，共 {total / 1024 / 1024:.1f} MB")
+
+        _text_info_for.__wrapped__("warmup.py")  # pygments 首次 import 不計入
+        _measure("full", _full_pass, paths, args.passes)
+        _text_info_for.cache_clear()
+        text_preview._cache.clear()
+        _measure("cold", _preview_pass, paths, 1)
+        _measure("cached", _preview_pass, paths, args.passes)
+
+        name = "report_final.py"
+        start = time.perf_counter()
+        for _ in range(200):
+            _text_info_for.__wrapped__(name)
+        uncached = (time.perf_counter() - start) / 200
+        start = time.perf_counter()
+        for _ in range(200):
+            _get_text_file_info(name)
+        cached = (time.perf_counter() - start) / 200
+        print(f"lexer   未快取 {uncached * 1e6:8.1f} µs  快取 {cached * 1e6:6.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""token_store：發行並驗證一百萬個令牌的負載測試。
+
+以與 routers/oauth.py 相同格式的 token_info 對 ExpiringTokenStore 量測：
+    issue     發行 N 個令牌（每次 put 都會 sweep）的吞吐量與記憶體增量
+    validate  隨機抽樣驗證（get）的延遲分佈
+    sweep     讓 10% 的令牌到期後，一次 sweep 的耗時
+    revoke    撤銷擁有 1,000 個令牌的使用者
+--db 時改用 SQLite write-through（每筆一次寫入，預設數量較小）。
+
+用法（於專案根目錄）：
+    python -m scripts.bench_token_store [--tokens 1000000] [--samples 100000] [--db]
+"""
+import argparse
+import os
+import random
+import secrets
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from utils.token_store import ExpiringTokenStore
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_SHORT, _LONG = 10 ** 6, 10 ** 7  # 到期秒數：都遠大於測試時間，put() 內的 sweep 不會提前移除
+
+
+def _rss_mb() -> float | None:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux 單位為 KB
+
+
+def _info(token: str, user_id: str, client_id: str, expires_in: int) -> dict:
+    return {
+        "access_token": token,
+        "refresh_token": secrets.token_urlsafe(32),
+        "expires_at": datetime.now() + timedelta(seconds=expires_in),
+        "client_id": client_id,
+        "user_id": user_id,
+        "scopes": ["read", "write"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=None, help="預設 1,000,000（--db 時 100,000）")
+    parser.add_argument("--samples", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--db", action="store_true", help="使用 SQLite write-through")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    count = args.tokens or (100_000 if args.db else 1_000_000)
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ExpiringTokenStore("bench_tokens", os.path.join(tmp, "tokens.db") if args.db else None)
+        tokens: list[str] = []
+        now = time.time()
+
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        for i in range(count):
+            token = secrets.token_urlsafe(32)
+            # 10% 的令牌較早到期，供後面的 sweep 量測
+            expires_in = _SHORT if i % 10 == 0 else _LONG
+            store.put(token, _info(token, f"user{i % args.users}", f"client{i % 50}", expires_in), now + expires_in)
+            tokens.append(token)
+        elapsed = time.perf_counter() - start
+        rss_after = _rss_mb()
+        memory = "n/a" if rss_before is None else (
+            f"{rss_after - rss_before:.0f} MB（含 token 字串清單，約 {(rss_after - rss_before) * 1024 * 1024 / count:.0f} bytes/個）"
+        )
+        print(f"issue     {count:,} 個，{elapsed:.1f} s（{count / elapsed:,.0f}/s），RSS 增加 {memory}")
+
+        latencies = []
+        for token in rng.sample(tokens, min(args.samples, count)):
+            t0 = time.perf_counter_ns()
+            store.get(token)
+            latencies.append(time.perf_counter_ns() - t0)
+        latencies.sort()
+        print(f"validate  {len(latencies):,} 次，平均 {statistics.fmean(latencies) / 1000:.1f} µs，"
+              f"p50 {latencies[len(latencies) // 2] / 1000:.1f} µs，p99 {latencies[int(len(latencies) * 0.99)] / 1000:.1f} µs")
+
+        start = time.perf_counter()
+        removed = store.sweep(now + _SHORT + 1)
+        print(f"sweep     移除 {removed:,} 個已到期令牌，{(time.perf_counter() - start) * 1000:.0f} ms")
+
+        start = time.perf_counter()
+        revoked = store.revoke_user("user7")
+        print(f"revoke    撤銷 {revoked:,} 個令牌，{(time.perf_counter() - start) * 1000:.1f} ms")
+        print(f"stats     {store.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+import os
+
+# utils.db 於匯入時建立 engine；測試不連線正式資料庫，改用各測試自行建立的 SQLite
+os.environ.setdefault("DATABASE_URL", "sqlite://")
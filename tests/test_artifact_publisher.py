@@ -0,0 +1,60 @@
+"""同一 artifact 被兩個執行緒同時發布：只留下先 commit 的記錄與檔案。"""
+import threading
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from utils import artifact_publisher
+from utils.db import Base
+from utils.models import PublishedArtifact
+
+
+@pytest.fixture
+def publish_env(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}", connect_args={"timeout": 10})
+    Base.metadata.create_all(engine)
+    barrier = threading.Barrier(2, timeout=10)
+
+    class RacingSession(Session):
+        def commit(self):
+            # 兩個執行緒都已查過「尚未發布」並寫好檔案後才一起 commit
+            if self.new:
+                barrier.wait()
+            super().commit()
+
+    monkeypatch.setattr(artifact_publisher, "SessionLocal", sessionmaker(bind=engine, class_=RacingSession))
+    monkeypatch.setattr(artifact_publisher, "_PUBLISHED_DIR", tmp_path / "published")
+    yield engine
+    engine.dispose()
+
+
+def test_concurrent_publish_keeps_single_winner(tmp_path, publish_env):
+    html = tmp_path / "artifact_a1.html"
+    html.write_text("<html>" + "x" * 4096 + "</html>", encoding="utf-8")
+    tokens: list[str] = []
+    errors: list[BaseException] = []
+
+    def _publish():
+        try:
+            tokens.append(artifact_publisher.publish_artifact("a1", "T", "u1", str(html)))
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=_publish) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(30)
+
+    assert not errors
+    # 兩邊各自產生 token；回傳相同 token 代表輸家走了 IntegrityError 分支並改用贏家的記錄
+    assert len(tokens) == 2 and tokens[0] == tokens[1]
+    with Session(publish_env) as session:
+        records = session.scalars(select(PublishedArtifact)).all()
+    assert [r.token for r in records] == [tokens[0]]
+    # 輸家移除自己寫入的檔案（含壓縮檔），只剩贏家的
+    published = sorted(p.name for p in (tmp_path / "published").iterdir())
+    assert published and all(name.startswith(tokens[0]) for name in published)
+    assert f"{tokens[0]}.html" in published
+
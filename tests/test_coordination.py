@@ -0,0 +1,68 @@
+"""SQLite 協調後端的多行程整合測試（同一台主機上的數個獨立 Python 行程）。"""
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import time
+
+from utils.coordination import SQLiteBackend
+
+_ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+
+def _spawn(code: str, db_path: str, **kwargs) -> subprocess.Popen:
+    env = {**os.environ, "COORDINATION_BACKEND": "sqlite", "COORDINATION_DB": db_path, "PYTHONPATH": str(_ROOT)}
+    return subprocess.Popen(
+        [sys.executable, "-c", code], cwd=_ROOT, env=env, text=True,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs,
+    )
+
+
+def test_pop_has_single_winner_across_processes(tmp_path):
+    db_path = str(tmp_path / "coord.db")
+    SQLiteBackend(db_path).put("ns", "k", {"v": 1}, ttl=60)
+    start_at = time.time() + 1.0
+    code = (
+        "import json, time\n"
+        "from utils import coordination\n"
+        f"time.sleep(max(0, {start_at} - time.time()))\n"
+        "print(json.dumps(coordination.pop('ns', 'k')))\n"
+    )
+    procs = [_spawn(code, db_path) for _ in range(6)]
+    results = []
+    for proc in procs:
+        out, err = proc.communicate(timeout=30)
+        assert proc.returncode == 0, err
+        results.append(json.loads(out))
+    assert results.count({"v": 1}) == 1
+    assert results.count(None) == len(procs) - 1
+
+
+def test_signal_reaches_handler_in_other_process(tmp_path):
+    db_path = str(tmp_path / "coord.db")
+    SQLiteBackend(db_path)  # 建立資料表
+    receiver = _spawn(
+        "import asyncio, json\n"
+        "from utils import coordination\n"
+        "async def main():\n"
+        "    got = asyncio.Queue()\n"
+        "    coordination.subscribe('ch', lambda key, payload: got.put_nowait((key, payload)) or True)\n"
+        "    await coordination.start()\n"
+        "    print('ready', flush=True)\n"
+        "    print(json.dumps(await asyncio.wait_for(got.get(), 20)), flush=True)\n"
+        "    await coordination.stop()\n"
+        "asyncio.run(main())\n",
+        db_path,
+    )
+    try:
+        assert receiver.stdout.readline().strip() == "ready"
+        sender = _spawn("from utils import coordination\ncoordination.signal('ch', 'k1', {'stage': 'saved'})\n", db_path)
+        _, err = sender.communicate(timeout=30)
+        assert sender.returncode == 0, err
+        out, err = receiver.communicate(timeout=30)
+        assert receiver.returncode == 0, err
+        assert json.loads(out) == ["k1", {"stage": "saved"}]
+    finally:
+        if receiver.poll() is None:
+            receiver.kill()
@@ -0,0 +1,47 @@
+"""啟動時不載入重量級套件（markitdown、PyMuPDF、pygments、Pillow 於第一次使用或背景預熱時才 import）。"""
+import json
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+_ROOT = pathlib.Path(__file__).resolve().parent.parent
+_HEAVY = ("markitdown", "fitz", "pymupdf", "pygments", "PIL")
+
+_PROBE = """
+import json, sys
+try:
+    for name in sys.argv[1:]:
+        __import__(name)
+except ModuleNotFoundError as e:
+    print(json.dumps({"missing": e.name}))
+else:
+    print(json.dumps({"loaded": sorted({m.split(".")[0] for m in sys.modules} & set(%r))}))
+""" % (_HEAVY,)
+
+
+def _loaded_after_import(*modules: str) -> list[str]:
+    env = {**os.environ, "PYTHONPATH": str(_ROOT), "DATABASE_URL": os.environ.get("DATABASE_URL", "sqlite://")}
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE, *modules],
+        cwd=_ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    if "missing" in result:
+        pytest.skip(f"未安裝 {result['missing']}，無法匯入 {' '.join(modules)}")
+    return result["loaded"]
+
+
+def test_server_import_does_not_load_heavy_packages():
+    assert _loaded_after_import("server") == []
+
+
+def test_tool_helpers_import_does_not_load_heavy_packages():
+    # 不需要 Chainlit / MCP 也能匯入的工具輔助模組
+    assert _loaded_after_import(
+        "utils.file_handler", "utils.page_rasterizer", "utils.search_executor",
+        "utils.text_preview", "utils.preview_jobs", "utils.render_cache",
+    ) == []
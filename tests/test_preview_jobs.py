@@ -0,0 +1,131 @@
+"""preview_jobs 以假的轉換器 / 點陣化函式控制頁面完成順序。"""
+import asyncio
+import os
+
+import pytest
+
+from utils import preview_jobs, render_cache
+from utils.page_rasterizer import RasterResult
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(render_cache, "render_cache", render_cache.RenderCache(str(tmp_path / "cache")))
+
+
+async def _fake_convert(src: str, outdir: str) -> str:
+    pdf = os.path.join(outdir, "deck.pdf")
+    with open(pdf, "w") as f:
+        f.write("%PDF")
+    return pdf
+
+
+def _fake_rasterizer(order: list[int], errors: dict[int, str] | None = None):
+    async def rasterize(pdf_path, out_dir, scale, pages=None, png_compress_level=None):
+        for i in order:
+            await asyncio.sleep(0)
+            if errors and i in errors:
+                yield RasterResult(i, "", errors[i])
+                continue
+            path = os.path.join(out_dir, f"page_{i + 1:03d}.png")
+            with open(path, "w") as f:
+                f.write(f"png {i}")
+            yield RasterResult(i, path)
+    return rasterize
+
+
+def _run(tmp_path, name: str, order: list[int], count: int, on_ready=None, errors=None, **overrides):
+    artifacts = tmp_path / name
+    artifacts.mkdir()
+    job = preview_jobs.create_job("u1")
+    kwargs = dict(
+        pptx_path=str(tmp_path / "deck.pptx"),
+        artifacts_dir=str(artifacts),
+        name_prefix="pptx_x",
+        url_base="/files",
+        cache_key="key1",
+        convert=_fake_convert,
+        rasterize=_fake_rasterizer(order, errors),
+        get_page_count=lambda pdf: count,
+        scale=1.0,
+        on_ready=on_ready,
+    )
+    kwargs.update(overrides)
+    asyncio.run(preview_jobs.run_preview_job(job, **kwargs))
+    return job
+
+
+def _slides(job) -> list[int]:
+    return [data["index"] for kind, data in job.events if kind == "slide"]
+
+
+def test_out_of_order_pages_publish_as_they_finish(tmp_path, monkeypatch):
+    monkeypatch.setattr(preview_jobs, "READY_SLIDES", 2)
+    ready_at = []
+    job = _run(tmp_path, "a", [2, 0, 3, 1, 4], 5, on_ready=lambda j: ready_at.append(len(_slides(j))))
+
+    assert [kind for kind, _ in job.events][0] == "valid"
+    assert _slides(job) == [2, 0, 3, 1, 4]
+    # 第 1、2 頁都完成（第 4 個 slide 事件）時才通知，且只通知一次
+    assert ready_at == [4]
+    kind, data = job.events[-1]
+    assert kind == "done"
+    assert data["slide_urls"] == [f"/files/pptx_x_slide_{i:03d}.png" for i in range(1, 6)]
+    assert job.finished and not job.error
+    assert (tmp_path / "a" / "pptx_x_slide_005.png").read_text() == "png 4"
+
+
+def test_on_ready_fires_on_prefix_smaller_than_deck(tmp_path, monkeypatch):
+    monkeypatch.setattr(preview_jobs, "READY_SLIDES", 3)
+    ready = []
+    job = _run(tmp_path, "a", [0, 1], 2, on_ready=lambda j: ready.append((j.ready_prefix(), j.finished)))
+    # 總頁數少於 READY_SLIDES：全部完成即通知，不等工作結束
+    assert ready == [(2, False)]
+    assert job.events[-1][0] == "done"
+
+
+def test_page_error_emits_error_event(tmp_path, monkeypatch):
+    monkeypatch.setattr(preview_jobs, "READY_SLIDES", 3)
+    ready = []
+    job = _run(tmp_path, "a", [0, 1, 2], 3, on_ready=lambda j: ready.append(j.ready_prefix()), errors={1: "boom"})
+
+    assert job.error == "page 2: boom"
+    assert job.events[-1] == ("error", {"error": "page 2: boom"})
+    assert _slides(job) == [0]
+    assert ready == [1]  # 失敗時仍通知一次，讓 agent 不再等待
+    assert job.finished
+    # 失敗的建置不留在快取
+    assert render_cache.render_cache.get_metrics()["entries"] == 0
+
+
+def test_convert_failure_emits_error_event(tmp_path):
+    async def failing_convert(src, outdir):
+        raise RuntimeError("LibreOffice failed")
+
+    job = _run(tmp_path, "a", [0], 1, convert=failing_convert)
+    assert job.events == [("error", {"error": "LibreOffice failed"})]
+    assert job.snapshot()["slide_urls"] == []
+
+
+def test_cache_hit_replays_pages_in_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(preview_jobs, "READY_SLIDES", 3)
+    first = _run(tmp_path, "a", [1, 0, 2], 3)
+    assert first.events[-1][0] == "done"
+
+    async def must_not_convert(src, outdir):
+        raise AssertionError("cache hit should not convert")
+
+    ready = []
+    second = _run(
+        tmp_path, "b", [], 3, convert=must_not_convert, on_ready=lambda j: ready.append(j.ready_prefix()),
+    )
+    assert second.events[0] == ("valid", {"slide_count": 3})
+    assert _slides(second) == [0, 1, 2]
+    assert second.events[-1][1]["slide_urls"] == first.events[-1][1]["slide_urls"]
+    assert ready == [3]
+    assert (tmp_path / "b" / "pptx_x_slide_001.png").read_text() == "png 0"
+
+    async def replay():
+        return [event async for event in second.follow()]
+
+    assert asyncio.run(replay()) == second.events
@@ -0,0 +1,69 @@
+"""RenderCache 的淘汰與跨 worker 刪除：目錄先改名為 _trash_* 再刪，讀者遇到目錄消失時可重建。"""
+import asyncio
+import os
+import shutil
+
+from utils.render_cache import RenderCache
+
+
+def _builder(calls: list[str], size: int = 100):
+    async def build(entry_dir: str) -> dict:
+        calls.append(entry_dir)
+        with open(os.path.join(entry_dir, "data.bin"), "wb") as f:
+            f.write(b"x" * size)
+        return {"file": "data.bin"}
+    return build
+
+
+def test_eviction_moves_victims_to_trash_and_deletes(tmp_path):
+    cache = RenderCache(str(tmp_path), max_bytes=250)
+    calls: list[str] = []
+
+    async def main():
+        for key in ("a", "b", "c"):
+            async with cache.acquire(key, _builder(calls)) as entry:
+                assert os.path.isfile(entry.file("data.bin"))
+
+    asyncio.run(main())
+    assert sorted(os.listdir(tmp_path)) == ["b", "c"]
+    assert cache.get_metrics()["evictions"] == 1
+
+
+def test_entry_removed_by_other_worker_is_rebuilt(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    calls: list[str] = []
+
+    async def main():
+        async with cache.acquire("k", _builder(calls)) as entry:
+            pass
+        # 其他 worker 淘汰了此項目：讀取時拿到 FileNotFoundError
+        shutil.rmtree(entry.path)
+        async with cache.acquire("k", _builder(calls)) as entry:
+            try:
+                open(entry.file("data.bin"), "rb").close()
+            except FileNotFoundError:
+                assert cache.discard_missing("k")
+        async with cache.acquire("k", _builder(calls)) as entry:
+            assert os.path.isfile(entry.file("data.bin"))
+
+    asyncio.run(main())
+    assert len(calls) == 2
+    assert not cache.discard_missing("k")
+
+
+def test_finalize_replaces_leftover_directory_without_trash(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    (tmp_path / "_trash_x_1234").mkdir()
+
+    async def main():
+        async with cache.acquire("other", _builder([])):
+            pass
+        # 索引載入之後才出現、沒有 manifest 的同名目錄（例如其他 worker 留下的殘留）
+        leftover = tmp_path / "k"
+        leftover.mkdir()
+        (leftover / "partial.bin").write_bytes(b"old")
+        async with cache.acquire("k", _builder([])) as entry:
+            return sorted(os.listdir(entry.path))
+
+    assert asyncio.run(main()) == ["data.bin", "manifest.json"]
+    assert sorted(os.listdir(tmp_path)) == ["k", "other"]
@@ -0,0 +1,37 @@
+from utils import search_executor
+
+
+def test_iter_lines_matches_splitlines_across_chunk_boundaries(tmp_path, monkeypatch):
+    data = b"abcdef\r\nxyz\r\nfoo\r\n" + b"a\rb\r\nc\n\r\n\rd" + "x\fy\x0bz\x1c\x85w\u2028v\u2029\r".encode()
+    path = tmp_path / "crlf.txt"
+    path.write_bytes(data)
+    expected = data.decode().splitlines()  # 與 search_index 的行號一致
+    for chunk_size in range(1, 10):
+        monkeypatch.setattr(search_executor, "_CHUNK_SIZE", chunk_size)
+        assert list(search_executor.iter_lines(str(path))) == expected
+
+
+def test_pathological_regex_times_out_with_partial_results(tmp_path):
+    (tmp_path / "a.txt").write_text("aaaa\n", encoding="utf-8")
+    (tmp_path / "b.txt").write_text("a" * 40 + "b\n", encoding="utf-8")
+    tasks = [
+        search_executor.FileTask(str(tmp_path / "a.txt"), "a.txt"),
+        search_executor.FileTask(str(tmp_path / "b.txt"), "b.txt"),
+    ]
+    outcome = search_executor.search(r"(a+)+$", 0, tasks, 0, None, budget=1.0)
+    assert outcome.timed_out
+    assert outcome.current_file == "b.txt"
+    assert outcome.total_matches == 1
+    assert outcome.lines[:2] == ["a.txt", "  >   1: aaaa"]
+
+
+def test_search_stops_once_page_is_filled(tmp_path):
+    tasks = []
+    for i in range(3):
+        path = tmp_path / f"{i}.txt"
+        path.write_text("hit\n" * 5, encoding="utf-8")
+        tasks.append(search_executor.FileTask(str(path), f"{i}.txt"))
+    outcome = search_executor.search("hit", 0, tasks, 0, 4)
+    assert outcome.stopped_early and not outcome.timed_out
+    assert outcome.lines[:2] == ["0.txt", "  >   1: hit"]
+    assert "2.txt" not in outcome.lines
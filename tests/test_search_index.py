@@ -0,0 +1,91 @@
+import re
+
+import pytest
+
+from utils import search_index
+from utils.search_index import TrigramIndex, required_trigrams
+
+
+@pytest.mark.parametrize("pattern, line", [
+    ("(?i)sat", "ſatellite"),
+    ("(?i)kelvin", "Kelvin"),
+    ("(?i)tin", "satİn"),
+    ("(?i)bit", "bıt"),
+    ("ſat", "ſatellite"),
+    ("SAT", "SATELLITE"),
+])
+def test_candidate_ranges_keep_case_folded_matches(tmp_path, pattern, line):
+    path = tmp_path / "a.txt"
+    path.write_text(f"first\n{line}\n", encoding="utf-8")
+    assert re.search(pattern, line)
+    ranges = TrigramIndex(str(tmp_path)).candidate_ranges(str(path), required_trigrams(pattern, False))
+    assert ranges is None or any(start <= 1 < end for start, end in ranges)
+
+
+def test_empty_trigrams_do_not_build_index(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("hello world\n", encoding="utf-8")
+    index = TrigramIndex(str(tmp_path))
+    assert index.candidate_ranges(str(path), set()) is None
+    assert not index._files
+
+
+def test_binary_file_is_not_indexed(tmp_path):
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"\x00\x01hello world\n" * 10)
+    index = TrigramIndex(str(tmp_path))
+    assert index.candidate_ranges(str(path), required_trigrams("hello", False)) is None
+    assert index._files[str(path)].blocks is None
+
+
+def test_expired_deadline_skips_building(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("hello world\n", encoding="utf-8")
+    index = TrigramIndex(str(tmp_path))
+    assert index.candidate_ranges(str(path), required_trigrams("hello", False), deadline=0.0) is None
+    assert not index._files
+
+
+def _budget_files(tmp_path, monkeypatch) -> list[str]:
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"{i}.txt"
+        path.write_text("".join(f"line {n} abcdefghij\n" for n in range(200)), encoding="utf-8")
+        paths.append(str(path))
+    one = TrigramIndex(str(tmp_path))
+    entry_bytes = one._entry(paths[0]).nbytes
+    one.clear()
+    monkeypatch.setattr(search_index, "INDEX_BUDGET_BYTES", entry_bytes * 2 + entry_bytes // 2)
+    return paths
+
+
+def test_budget_evicts_least_recently_used_across_roots(tmp_path, monkeypatch):
+    paths = _budget_files(tmp_path, monkeypatch)
+    a, b, c = (TrigramIndex(str(tmp_path)) for _ in range(3))
+    grams = required_trigrams("abcdefghij", False)
+    a.candidate_ranges(paths[0], grams)
+    b.candidate_ranges(paths[1], grams)
+    a.candidate_ranges(paths[0], grams)  # 讓 paths[0] 成為最近使用
+    c.candidate_ranges(paths[2], grams)
+    try:
+        assert paths[0] in a._files
+        assert paths[1] not in b._files
+        assert paths[2] in c._files
+        assert search_index.memory_usage() <= search_index.INDEX_BUDGET_BYTES
+    finally:
+        for index in (a, b, c):
+            index.clear()
+
+
+def test_full_index_skips_new_files_instead_of_evicting_its_own(tmp_path, monkeypatch):
+    paths = _budget_files(tmp_path, monkeypatch)
+    index = TrigramIndex(str(tmp_path))
+    grams = required_trigrams("abcdefghij", False)
+    try:
+        for path in paths:
+            assert index.candidate_ranges(path, grams) == [(0, 256)]
+        assert sorted(index._files) == paths[:2]
+        # 用滿上限後不再建索引，未索引的檔案一律是候選
+        assert index.candidate_ranges(paths[2], grams) is None
+    finally:
+        index.clear()
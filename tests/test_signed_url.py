@@ -0,0 +1,74 @@
+"""單次掃描的 HTML 路徑改寫需與原本三次 re.sub 的實作輸出完全一致。"""
+import random
+import re
+
+from utils import signed_url
+
+_ATTR = r'(src|href|data-src)=(["\'])((?:\.\.\/)?(?:uploads|artifacts)/[^"\'> \t\n]+)\2'
+_URL = r'url\((["\']?)((?:\.\.\/)?(?:uploads|artifacts)/[^"\')\s]+)\1\)'
+_JS = r'(["\'\`])((?:\.\.\/)?(?:uploads|artifacts)/)'
+_SKIP = ("/", "http://", "https://", "data:", "#")
+
+
+def _reference_rewrite(html: str, base: str) -> str:
+    """原本的三段式實作（屬性 → CSS url() → JS 字串），作為對照。"""
+    def _normalize(path: str) -> str:
+        return path[3:] if path.startswith("../") else path
+
+    def _replace_attr(m: re.Match) -> str:
+        attr, quote, path = m.group(1), m.group(2), m.group(3)
+        if path.startswith(_SKIP):
+            return m.group(0)
+        return f"{attr}={quote}{base}/{_normalize(path)}{quote}"
+
+    def _replace_url(m: re.Match) -> str:
+        quote, path = m.group(1), m.group(2)
+        if path.startswith(_SKIP):
+            return m.group(0)
+        return f"url({quote}{base}/{_normalize(path)}{quote})"
+
+    def _replace_js(m: re.Match) -> str:
+        return f"{m.group(1)}{base}/{_normalize(m.group(2))}"
+
+    html = re.sub(_ATTR, _replace_attr, html, flags=re.IGNORECASE)
+    html = re.sub(_URL, _replace_url, html, flags=re.IGNORECASE)
+    return re.sub(_JS, _replace_js, html, flags=re.IGNORECASE)
+
+
+_PIECES = [
+    "uploads/", "artifacts/", "../", "UPLOADS/", "Artifacts/", "url(", "URL(", ")", '"', "'", "`",
+    "src=", "SRC=", "href=", "data-src=", "a.png", "b c", "x", " ", "\n", "\t", ">", "<img ", "/",
+    "http://h/", "data:", "#", "fetch(", ";", "=",
+]
+
+_CASES = [
+    '<img src="uploads/a.png">',
+    "<img SRC='../uploads/a b.png'>",
+    '<a href="artifacts/r.html">r</a>',
+    '<div style="background:url(uploads/bg.png)">',
+    "<div style=\"background:URL('../artifacts/x.png')\">",
+    "url(uploads/a`uploads/b)",
+    "fetch(`artifacts/data.json`)",
+    '<img src="/uploads/abs.png"><img src="http://h/uploads/x.png">',
+    '<img data-src="uploads/lazy.png">',
+    "",
+]
+
+
+def _random_fragments(n: int) -> list[str]:
+    rng = random.Random(39)
+    return ["".join(rng.choice(_PIECES) for _ in range(rng.randint(1, 12))) for _ in range(n)]
+
+
+def test_publish_rewrite_matches_reference():
+    for html in _CASES + _random_fragments(20000):
+        expected = _reference_rewrite(html, "https://ex.com/p/tok/files")
+        assert signed_url.rewrite_html_paths_for_publish(html, "tok", "https://ex.com") == expected, html
+
+
+def test_preview_rewrite_matches_reference():
+    for html in _CASES + _random_fragments(5000):
+        expected = _reference_rewrite(html, "/api/user-files/user_profiles/u_1/conversations/c1")
+        assert signed_url.rewrite_html_img_paths(html, "u@1", "c1") == expected, html
+        # 第二次呼叫走快取，結果不變
+        assert signed_url.rewrite_html_img_paths(html, "u@1", "c1") == expected, html
@@ -0,0 +1,71 @@
+"""被放棄的等待項目：超過 maxsize 被淘汰、逾期後被清除時，on_expire 都要喚醒等待者。"""
+import asyncio
+import types
+
+from utils import ttl_registry
+from utils.ttl_registry import TTLRegistry
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _wake(key, entry) -> None:
+    entry["expired"] = True
+    entry["event"].set()
+
+
+def test_abandoned_entries_expire_and_wake_waiters(monkeypatch):
+    clock = _Clock()
+    # 只替換 ttl_registry 看到的時鐘，事件迴圈仍用真正的 time.monotonic
+    monkeypatch.setattr(ttl_registry, "time", types.SimpleNamespace(monotonic=clock))
+
+    async def main():
+        registry = TTLRegistry("test_pending", ttl=60, maxsize=100, on_expire=_wake)
+        entries = [{"event": asyncio.Event(), "expired": False} for _ in range(250)]
+        waiters = [asyncio.create_task(e["event"].wait()) for e in entries]
+        for i, entry in enumerate(entries):
+            registry[f"k{i}"] = entry
+            clock.now += 0.01
+
+        # 超過 maxsize：最早的 150 筆被淘汰並立即喚醒
+        await asyncio.sleep(0)
+        assert len(registry) == 100
+        assert all(w.done() for w in waiters[:150])
+        assert not any(w.done() for w in waiters[150:])
+
+        # 沒有人再讀取：時間超過 ttl 後由背景清除喚醒其餘等待者
+        clock.now += 61
+        ttl_registry.start_sweeper(interval=0.01)
+        try:
+            await asyncio.wait_for(asyncio.gather(*waiters), timeout=5)
+        finally:
+            await ttl_registry.stop_sweeper()
+            ttl_registry._registries.remove(registry)
+
+        assert len(registry) == 0
+        assert all(e["expired"] for e in entries)
+        stats = registry.stats()
+        assert (stats["evicted"], stats["expired"], stats["entries"]) == (150, 100, 0)
+
+    asyncio.run(main())
+
+
+def test_sliding_entry_survives_while_read(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(ttl_registry, "time", types.SimpleNamespace(monotonic=clock))
+    registry = TTLRegistry("test_sliding", ttl=10, maxsize=10, sliding=True)
+    try:
+        registry["a"] = 1
+        for _ in range(5):
+            clock.now += 8
+            assert registry.get("a") == 1
+        clock.now += 11
+        assert registry.get("a") is None
+        assert registry.stats()["expired"] == 1
+    finally:
+        ttl_registry._registries.remove(registry)
@@ -1,16 +1,45 @@
+import logging
+import os
 import pathlib
-import shutil
 import uuid
 from datetime import datetime, timezone
 
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 
-from utils.db import SessionLocal
+from utils.db import SessionLocal, async_session
 from utils.models import PublishedArtifact
+from utils.signed_url import rewrite_html_paths_for_publish
+from utils.static_delivery import precompress, remove_variants
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
 
 _PROJECT_ROOT = pathlib.Path(__file__).parent.parent
 _PUBLISHED_DIR = _PROJECT_ROOT / "published"
 
+# token → PublishedArtifact（None 表示不存在）；公開頁面的每個附屬資源都會查一次 token
+_record_cache = TTLCache(maxsize=1024, ttl=300, negative_ttl=30)
+
+
+def _write_published(dest: pathlib.Path, data: bytes) -> None:
+    """寫入暫存檔後 rename 到位，公開路徑上不會出現寫到一半的內容；接著產生壓縮檔（失敗不影響發布）。"""
+    tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, dest)
+    finally:
+        tmp.unlink(missing_ok=True)
+    try:
+        precompress(dest, data)
+    except Exception:
+        # 壓縮檔只是加速傳送，失敗時公開頁面仍以原檔回應，不影響發布
+        logger.warning("[artifact_publisher] 預先壓縮失敗 %s", dest, exc_info=True)
+        try:
+            remove_variants(dest)  # 不留下與新內容不符的舊壓縮檔
+        except OSError:
+            pass
+
 
 def publish_artifact(
     artifact_id: str,
@@ -19,10 +48,13 @@ def publish_artifact(
     html_path: str,
     html_content: str | None = None,
     conversation_folder: str | None = None,
+    base_url: str | None = None,
 ) -> str:
-    """將 artifact HTML 複製到公開目錄，回傳 token（重複發布回傳舊 token）。
+    """將 artifact HTML 發布到公開目錄，回傳 token（重複發布回傳舊 token）。
 
-    html_content 若提供，直接寫入；否則複製原始檔案。
+    html_content 若提供，直接寫入；否則讀取原始檔案。
+    base_url 若提供，先決定 token（沿用既有或新產生），再以 rewrite_html_paths_for_publish
+    將相對路徑改寫為公開 URL，整個流程只寫一次檔案、一次 DB commit。
     conversation_folder 儲存於 DB，供資源路由 serve 附屬檔案使用。
     """
     with SessionLocal() as session:
@@ -31,22 +63,25 @@ def publish_artifact(
             .filter(PublishedArtifact.artifact_id == artifact_id)
             .first()
         )
+        token = existing.token if existing else uuid.uuid4().hex
+        html_file = existing.html_file if existing else f"{token}.html"
+
+        # 既有記錄且未提供內容：沿用原行為，不覆寫已發布的檔案
+        if not existing or html_content is not None:
+            if html_content is None:
+                html_content = pathlib.Path(html_path).read_text(encoding="utf-8")
+            if base_url:
+                html_content = rewrite_html_paths_for_publish(html_content, token, base_url)
+            _PUBLISHED_DIR.mkdir(parents=True, exist_ok=True)
+            dest = _PUBLISHED_DIR / html_file
+            _write_published(dest, html_content.encode("utf-8"))
+
         if existing:
-            if html_content is not None:
-                dest = _PUBLISHED_DIR / existing.html_file
-                dest.write_text(html_content, encoding="utf-8")
             if conversation_folder and not existing.conversation_folder:
                 existing.conversation_folder = conversation_folder
                 session.commit()
-            return existing.token
-
-        token = uuid.uuid4().hex
-        _PUBLISHED_DIR.mkdir(parents=True, exist_ok=True)
-        dest = _PUBLISHED_DIR / f"{token}.html"
-        if html_content is not None:
-            dest.write_text(html_content, encoding="utf-8")
-        else:
-            shutil.copy2(html_path, dest)
+            invalidate_published_token(token)
+            return token
 
         record = PublishedArtifact(
             token=token,
@@ -54,15 +89,17 @@ def publish_artifact(
             title=title,
             user_id=user_id,
             published_at=datetime.now(timezone.utc),
-            html_file=f"{token}.html",
+            html_file=html_file,
             conversation_folder=conversation_folder,
         )
         session.add(record)
         try:
             session.commit()
         except IntegrityError:
+            # 同一 artifact 被並行發布：以先 commit 的記錄為準，移除本次寫入的檔案
             session.rollback()
             dest.unlink(missing_ok=True)
+            remove_variants(dest)
             existing = (
                 session.query(PublishedArtifact)
                 .filter(PublishedArtifact.artifact_id == artifact_id)
@@ -70,6 +107,7 @@ def publish_artifact(
             )
             return existing.token
 
+        invalidate_published_token(token)
         return token
 
 
@@ -112,3 +150,36 @@ def get_published_artifact_record_by_id(artifact_id: str) -> "PublishedArtifact
         if record is not None:
             session.expunge(record)
         return record
+
+
+def invalidate_published_token(token: str) -> None:
+    """發布 / 更新 / 取消發布後呼叫，讓下次查詢重新讀取 DB。"""
+    _record_cache.pop(token)
+
+
+def get_token_cache_stats() -> dict:
+    return _record_cache.stats()
+
+
+# ── async 版本 ──
+
+async def get_published_artifact_record_async(token: str) -> "PublishedArtifact | None":
+    """get_published_artifact_record 的 async 版本（經 token 快取，含 negative cache）。"""
+    if not token or len(token) != 32 or not all(c in "0123456789abcdef" for c in token):
+        return None
+
+    async def _load():
+        async with async_session() as session:
+            return await session.get(PublishedArtifact, token)
+
+    return await _record_cache.get_or_load(token, _load)
+
+
+async def get_published_artifact_record_by_id_async(artifact_id: str) -> "PublishedArtifact | None":
+    """get_published_artifact_record_by_id 的 async 版本。"""
+    if not artifact_id:
+        return None
+    async with async_session() as session:
+        return (await session.execute(
+            select(PublishedArtifact).where(PublishedArtifact.artifact_id == artifact_id)
+        )).scalar_one_or_none()
@@ -1,4 +1,7 @@
-"""Conversation DB CRUD（同步，搭配 asyncio.to_thread 使用）。"""
+"""Conversation DB CRUD。
+
+同步版本搭配 asyncio.to_thread 使用；*_async 版本走 async engine，可在 async handler 內直接 await。
+"""
 import uuid
 from datetime import datetime, timezone
 from typing import Optional
@@ -6,7 +9,7 @@ from typing import Optional
 from sqlalchemy import select, func
 from sqlalchemy.exc import IntegrityError
 
-from utils.db import SessionLocal
+from utils.db import SessionLocal, async_session
 from utils.models import Conversation
 
 
@@ -57,26 +60,17 @@ def update_conversation_title(conversation_id: str, title: str) -> None:
             session.commit()
 
 
-def list_conversations(user_id: str, offset: int = 0, limit: int = 10,
-                       search: Optional[str] = None) -> dict:
-    """列出使用者的對話摘要（依 updated_at 降序）。"""
-    with SessionLocal() as session:
-        base_q = select(Conversation).where(Conversation.user_id == user_id)
-        count_q = select(func.count()).where(Conversation.user_id == user_id)
-        if search:
-            pattern = f"%{search}%"
-            base_q = base_q.where(Conversation.title.ilike(pattern))
-            count_q = count_q.where(Conversation.title.ilike(pattern))
+def _list_queries(user_id: str, search: Optional[str]):
+    base_q = select(Conversation).where(Conversation.user_id == user_id)
+    count_q = select(func.count()).where(Conversation.user_id == user_id)
+    if search:
+        pattern = f"%{search}%"
+        base_q = base_q.where(Conversation.title.ilike(pattern))
+        count_q = count_q.where(Conversation.title.ilike(pattern))
+    return base_q, count_q
 
-        total = session.execute(count_q).scalar() or 0
-
-        rows = session.execute(
-            base_q
-            .order_by(Conversation.updated_at.desc())
-            .offset(offset)
-            .limit(limit)
-        ).scalars().all()
 
+def _list_result(rows, total: int, offset: int, limit: int) -> dict:
     results = [
         {
             "conversation_id": str(r.id),
@@ -96,3 +90,109 @@ def list_conversations(user_id: str, offset: int = 0, limit: int = 10,
         "limit": limit,
         "has_more": (offset + limit) < total,
     }
+
+
+def list_conversations(user_id: str, offset: int = 0, limit: int = 10,
+                       search: Optional[str] = None) -> dict:
+    """列出使用者的對話摘要（依 updated_at 降序）。"""
+    base_q, count_q = _list_queries(user_id, search)
+    with SessionLocal() as session:
+        total = session.execute(count_q).scalar() or 0
+
+        rows = session.execute(
+            base_q
+            .order_by(Conversation.updated_at.desc())
+            .offset(offset)
+            .limit(limit)
+        ).scalars().all()
+
+    return _list_result(rows, total, offset, limit)
+
+
+# ── async 版本 ──
+
+async def create_conversation_async(user_id: str, conversation_id: str) -> None:
+    """create_conversation 的 async 版本。"""
+    conv_uuid = uuid.UUID(conversation_id)
+    async with async_session() as session:
+        existing = await session.get(Conversation, conv_uuid)
+        if existing:
+            return
+        conv = Conversation(
+            id=conv_uuid,
+            user_id=user_id,
+            created_at=datetime.now(timezone.utc),
+            updated_at=datetime.now(timezone.utc),
+        )
+        session.add(conv)
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+
+
+async def finalize_conversation_async(conversation_id: str, message_count: int,
+                                      total_prompt_tokens: int = 0,
+                                      total_completion_tokens: int = 0) -> None:
+    """finalize_conversation 的 async 版本。"""
+    conv_uuid = uuid.UUID(conversation_id)
+    async with async_session() as session:
+        conv = await session.get(Conversation, conv_uuid)
+        if conv:
+            conv.ended_at = datetime.now(timezone.utc)
+            conv.updated_at = datetime.now(timezone.utc)
+            conv.message_count = message_count
+            conv.total_prompt_tokens = total_prompt_tokens
+            conv.total_completion_tokens = total_completion_tokens
+            await session.commit()
+
+
+async def update_conversation_title_async(conversation_id: str, title: str) -> None:
+    """update_conversation_title 的 async 版本。"""
+    conv_uuid = uuid.UUID(conversation_id)
+    async with async_session() as session:
+        conv = await session.get(Conversation, conv_uuid)
+        if conv:
+            conv.title = title
+            conv.updated_at = datetime.now(timezone.utc)
+            await session.commit()
+
+
+async def get_conversation_async(conversation_id: str) -> Optional[Conversation]:
+    """取得單一對話記錄（已脫離 session），不存在或 id 格式錯誤回傳 None。"""
+    try:
+        conv_uuid = uuid.UUID(conversation_id)
+    except ValueError:
+        return None
+    async with async_session() as session:
+        return await session.get(Conversation, conv_uuid)
+
+
+async def delete_conversation_async(conversation_id: str) -> Optional[str]:
+    """刪除對話記錄，回傳原擁有者 user_id；不存在回傳 None。"""
+    conv_uuid = uuid.UUID(conversation_id)
+    async with async_session() as session:
+        conv = await session.get(Conversation, conv_uuid)
+        if not conv:
+            return None
+        uid = conv.user_id
+        await session.delete(conv)
+        await session.commit()
+        return uid
+
+
+async def list_conversations_async(user_id: str, offset: int = 0, limit: int = 10,
+                                   search: Optional[str] = None) -> dict:
+    """list_conversations 的 async 版本。"""
+    base_q, count_q = _list_queries(user_id, search)
+    async with async_session() as session:
+        total = (await session.execute(count_q)).scalar() or 0
+
+        rows = (await session.execute(
+            base_q
+            .order_by(Conversation.updated_at.desc())
+            .offset(offset)
+            .limit(limit)
+        )).scalars().all()
+
+    return _list_result(rows, total, offset, limit)
@@ -0,0 +1,288 @@
+"""跨請求交接的協調層（可替換後端，讓多個 uvicorn worker 共同服務）。
+
+原本 PPTX 上傳通知、模板登記等跨請求交接都透過行程內物件完成（agent_tools._context 的 dict、
+routers.pptx_preview 的 _template_registry），上傳請求必須落在持有 agent 等待者的同一個行程，
+整個部署因此只能跑單一 worker。
+
+- signal(channel, key, payload)：通知持有 key 的等待者。先交給本行程的 handler，
+  handler 回傳 True 表示已處理；否則交給後端轉送到其他 worker
+- subscribe(channel, handler)：handler(key, payload) -> bool，在 event loop 上執行
+- put / get / pop(namespace, key)：有期限的共用登記表（值需可 JSON 序列化）；
+  async 程式碼請用 put_async / get_async / pop_async，SQLite 後端的讀寫（含 busy timeout）改在 thread 內執行
+- signal 轉交後端的寫入在背景執行緒依序進行，不阻塞 event loop
+
+後端（環境變數 COORDINATION_BACKEND）：
+    local   行程內（預設），單一 worker 使用，行為與原本相同
+    sqlite  以同一台主機上的 SQLite 檔案（COORDINATION_DB）交換資料：
+            登記表存於 kv 資料表；signal 寫入 signals 資料表，各 worker 的背景 task
+            每 POLL_INTERVAL 秒讀取新列並交給自己的 handler
+WebSocket 回呼（表單提交等）在 sticky session 下會回到持有 session 的 worker，仍在行程內處理。
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from utils.ttl_registry import TTLRegistry
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.1
+SIGNAL_RETENTION = 300  # signals 資料表保留多久（秒）
+
+Handler = Callable[[str, dict], bool]
+_handlers: dict[str, list[Handler]] = {}
+
+
+def _dispatch(channel: str, key: str, payload: dict) -> bool:
+    handled = False
+    for handler in _handlers.get(channel, ()):
+        try:
+            handled = handler(key, payload) or handled
+        except Exception:
+            logger.exception("[coordination] handler 失敗 channel=%s key=%s", channel, key)
+    return handled
+
+
+class LocalBackend:
+    """行程內後端：登記表為 TTLRegistry，signal 只在本行程內分派。"""
+
+    blocking = False  # 操作不會阻塞，直接在 event loop 上執行（on_expire 也需在 loop 上）
+
+    def __init__(self):
+        self._namespaces: dict[str, TTLRegistry] = {}
+
+    def _ns(self, namespace: str, ttl: float = 600) -> TTLRegistry:
+        registry = self._namespaces.get(namespace)
+        if registry is None:
+            registry = self._namespaces[namespace] = TTLRegistry(f"coord_{namespace}", ttl=ttl, maxsize=10000)
+        return registry
+
+    def put(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        self._ns(namespace, ttl).set(key, value, ttl)
+
+    def get(self, namespace: str, key: str) -> Any:
+        return self._ns(namespace).get(key)
+
+    def pop(self, namespace: str, key: str) -> Any:
+        return self._ns(namespace).pop(key)
+
+    def publish(self, channel: str, key: str, payload: dict) -> None:
+        pass  # 沒有其他行程
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class SQLiteBackend:
+    """同主機多 worker：以 SQLite 檔案共用登記表，並以輪詢 signals 資料表轉送通知。"""
+
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self.origin = f"{os.getpid()}-{id(self):x}"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS kv (
+                namespace TEXT NOT NULL,
+                key       TEXT NOT NULL,
+                value     TEXT NOT NULL,
+                deadline  REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            );
+            CREATE TABLE IF NOT EXISTS signals (
+                id       INTEGER PRIMARY KEY AUTOINCREMENT,
+                origin   TEXT NOT NULL,
+                channel  TEXT NOT NULL,
+                key      TEXT NOT NULL,
+                payload  TEXT NOT NULL,
+                created  REAL NOT NULL
+            );
+        """)
+        self._last_id = self._execute("SELECT COALESCE(MAX(id), 0) FROM signals")[0][0]
+        self._poller: asyncio.Task | None = None
+
+    def _execute(self, sql: str, params: tuple = ()) -> list[tuple]:
+        # 連線由多個 thread 共用：連同讀取結果都在 lock 內完成
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    # ── 登記表 ──
+
+    def put(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        self._execute(
+            "INSERT OR REPLACE INTO kv (namespace, key, value, deadline) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value, ensure_ascii=False), time.time() + ttl),
+        )
+
+    def get(self, namespace: str, key: str) -> Any:
+        rows = self._execute(
+            "SELECT value FROM kv WHERE namespace = ? AND key = ? AND deadline > ?",
+            (namespace, key, time.time()),
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    def _take(self, namespace: str, key: str) -> tuple | None:
+        """刪除並回傳 (value, deadline)；多個 worker 同時取出同一 key 時只有一方拿到。"""
+        params = (namespace, key)
+        if sqlite3.sqlite_version_info >= (3, 35):
+            rows = self._execute("DELETE FROM kv WHERE namespace = ? AND key = ? RETURNING value, deadline", params)
+            return rows[0] if rows else None
+        # 不支援 RETURNING：以 BEGIN IMMEDIATE 取得寫入鎖後再讀取、刪除
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT value, deadline FROM kv WHERE namespace = ? AND key = ?", params
+                ).fetchone()
+                if row is not None:
+                    self._db.execute("DELETE FROM kv WHERE namespace = ? AND key = ?", params)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return row
+
+    def pop(self, namespace: str, key: str) -> Any:
+        row = self._take(namespace, key)
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0])
+
+    # ── 通知 ──
+
+    def publish(self, channel: str, key: str, payload: dict) -> None:
+        self._execute(
+            "INSERT INTO signals (origin, channel, key, payload, created) VALUES (?, ?, ?, ?, ?)",
+            (self.origin, channel, key, json.dumps(payload, ensure_ascii=False), time.time()),
+        )
+
+    def _fetch(self) -> list[tuple]:
+        rows = self._execute(
+            "SELECT id, origin, channel, key, payload FROM signals WHERE id > ? ORDER BY id",
+            (self._last_id,),
+        )
+        if rows:
+            self._last_id = rows[-1][0]
+        return rows
+
+    def _cleanup(self) -> None:
+        now = time.time()
+        self._execute("DELETE FROM signals WHERE created < ?", (now - SIGNAL_RETENTION,))
+        self._execute("DELETE FROM kv WHERE deadline <= ?", (now,))
+
+    async def _poll(self) -> None:
+        last_cleanup = time.monotonic()
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            try:
+                rows = await asyncio.to_thread(self._fetch)
+                for _, origin, channel, key, payload in rows:
+                    if origin != self.origin:
+                        _dispatch(channel, key, json.loads(payload))
+                if time.monotonic() - last_cleanup > 60:
+                    last_cleanup = time.monotonic()
+                    await asyncio.to_thread(self._cleanup)
+            except Exception:
+                logger.exception("[coordination] 輪詢 signals 失敗")
+
+    async def start(self) -> None:
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.get_running_loop().create_task(self._poll())
+
+    async def stop(self) -> None:
+        task, self._poller = self._poller, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+def _create_backend() -> LocalBackend | SQLiteBackend:
+    kind = os.getenv("COORDINATION_BACKEND", "local").lower()
+    if kind == "sqlite":
+        path = os.getenv("COORDINATION_DB") or os.path.join(tempfile.gettempdir(), "eaic_coordination.db")
+        return SQLiteBackend(path)
+    if kind != "local":
+        logger.warning("[coordination] 未知的 COORDINATION_BACKEND=%s，改用 local", kind)
+    return LocalBackend()
+
+
+backend = _create_backend()
+
+# signal 轉送給其他 worker 的寫入：單一執行緒依序處理，同一 key 的通知順序不變
+_publisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="coordination-publish")
+
+
+def _publish_done(future: Future) -> None:
+    if future.exception() is not None:
+        logger.error("[coordination] 轉送 signal 失敗", exc_info=future.exception())
+
+
+async def _call(fn: Callable, *args) -> Any:
+    if not backend.blocking:
+        return fn(*args)
+    return await asyncio.to_thread(fn, *args)
+
+
+# ── 對外介面 ──
+
+def subscribe(channel: str, handler: Handler) -> None:
+    _handlers.setdefault(channel, []).append(handler)
+
+
+def signal(channel: str, key: str, payload: dict) -> None:
+    """通知持有 key 的等待者；本行程沒有對應的等待者時交給後端轉送（不等待寫入完成）。"""
+    if _dispatch(channel, key, payload):
+        return
+    if backend.blocking:
+        _publisher.submit(backend.publish, channel, key, payload).add_done_callback(_publish_done)
+    else:
+        backend.publish(channel, key, payload)
+
+
+def put(namespace: str, key: str, value: Any, ttl: float = 600) -> None:
+    backend.put(namespace, key, value, ttl)
+
+
+def get(namespace: str, key: str) -> Any:
+    return backend.get(namespace, key)
+
+
+def pop(namespace: str, key: str) -> Any:
+    return backend.pop(namespace, key)
+
+
+async def put_async(namespace: str, key: str, value: Any, ttl: float = 600) -> None:
+    await _call(backend.put, namespace, key, value, ttl)
+
+
+async def get_async(namespace: str, key: str) -> Any:
+    return await _call(backend.get, namespace, key)
+
+
+async def pop_async(namespace: str, key: str) -> Any:
+    return await _call(backend.pop, namespace, key)
+
+
+async def start() -> None:
+    await backend.start()
+
+
+async def stop() -> None:
+    await backend.stop()
@@ -1,4 +1,19 @@
-"""PostgreSQL 連線管理（SQLAlchemy sync engine，搭配 asyncio.to_thread 使用）。"""
+"""PostgreSQL 連線管理。
+
+- engine / SessionLocal：SQLAlchemy sync engine（alembic 與搭配 asyncio.to_thread 的同步函式使用）
+- async_session()：async engine（asyncpg），供 async handler 直接 await，
+  不佔用預設 thread pool，也不會因同步查詢卡住 event loop
+
+兩者共用 utils/models.py 的 ORM 模型；async engine 於第一次使用時才建立。
+
+環境變數：
+    SYNC_DATABASE_URL / DATABASE_URL  同步連線字串
+    ASYNC_DATABASE_URL                async 連線字串（未設定時由同步字串推導：
+                                      postgresql+psycopg2 → postgresql+asyncpg、sqlite → sqlite+aiosqlite）
+    DB_POOL_SIZE / DB_MAX_OVERFLOW              同步 pool 大小（預設 5 / 10）
+    DB_ASYNC_POOL_SIZE / DB_ASYNC_MAX_OVERFLOW  async pool 大小（預設 10 / 20）
+    DB_POOL_TIMEOUT                             等待可用連線的逾時秒數（預設 30）
+"""
 import os
 from pathlib import Path
 
@@ -10,9 +25,103 @@ load_dotenv(override=False)
 
 DATABASE_URL = os.getenv("SYNC_DATABASE_URL") or os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, pool_size=5, max_overflow=10, pool_pre_ping=True)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", "10"))
+ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+
+def _pool_kwargs(url: str, pool_size: int, max_overflow: int) -> dict:
+    # SQLite（本機測試用）記憶體資料庫使用 SingletonThreadPool / StaticPool，不接受 pool 大小參數
+    if url.startswith("sqlite"):
+        database = url.split("://", 1)[-1].lstrip("/")
+        if not database or database.startswith(":memory:"):
+            return {}
+    return {"pool_size": pool_size, "max_overflow": max_overflow, "pool_timeout": POOL_TIMEOUT}
+
+
+engine = create_engine(
+    DATABASE_URL, pool_pre_ping=True, **_pool_kwargs(DATABASE_URL, POOL_SIZE, MAX_OVERFLOW)
+)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 
 class Base(DeclarativeBase):
     pass
+
+
+# ── async engine ──
+
+def _derive_async_url(url: str) -> str:
+    for sync_prefix, async_prefix in (
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("postgres://", "postgresql+asyncpg://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _derive_async_url(DATABASE_URL)
+
+_async_engine = None
+_async_sessionmaker = None
+
+
+def get_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            pool_pre_ping=True,
+            **_pool_kwargs(ASYNC_DATABASE_URL, ASYNC_POOL_SIZE, ASYNC_MAX_OVERFLOW),
+        )
+        # expire_on_commit=False：commit 後仍可讀取物件屬性，不會觸發隱式 lazy load（async 下不允許）
+        _async_sessionmaker = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+def async_session():
+    """建立 AsyncSession，請以 `async with async_session() as session:` 使用。"""
+    get_async_engine()
+    return _async_sessionmaker()
+
+
+def _pool_status(pool) -> dict:
+    status = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            status[name] = fn()
+    return status
+
+
+def get_pool_metrics() -> dict:
+    """回傳 sync / async 連線池目前狀態，供 /api/debug/metrics 調整 pool 大小參考。"""
+    metrics = {
+        "sync": {**_pool_status(engine.pool), "pool_size": POOL_SIZE, "max_overflow": MAX_OVERFLOW},
+    }
+    if _async_engine is not None:
+        metrics["async"] = {
+            **_pool_status(_async_engine.pool),
+            "pool_size": ASYNC_POOL_SIZE,
+            "max_overflow": ASYNC_MAX_OVERFLOW,
+        }
+    return metrics
+
+
+async def dispose_engines() -> None:
+    """關閉所有連線（lifespan shutdown 時呼叫）。"""
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_sessionmaker = None
+    engine.dispose()
@@ -2,14 +2,14 @@
 
 import asyncio
 import base64
+import fnmatch
+import functools
 import io
 import mimetypes
 import os
+import re
 
 import aiofiles
-from PIL import Image
-from pygments.lexers import get_lexer_for_filename
-from pygments.util import ClassNotFound
 
 _MAX_IMAGE_SIDE = 1280
 TEXT_PREVIEW_SIZE_LIMIT = 500_000  # 500 KB 以內才側邊欄預覽，超過仍走下載
@@ -18,6 +18,34 @@ _NO_FENCE_ALIASES = frozenset({'text', 'markdown', 'md'})  # 這些別名不加
 
 def _get_text_file_info(filename: str) -> tuple[bool, str | None]:
     """偵測檔案是否為文字/代碼，並回傳 code fence 語言別名（None 表示無需包裹）。"""
+    # 多數檔名的結果只取決於副檔名，依副檔名快取；pygments 以完整檔名或非 *.ext 樣式
+    # （CMakeLists.txt、Makefile.in、*.html.j2…）對應的檔案及無副檔名的檔案以檔名快取
+    name = os.path.basename(filename)
+    ext = os.path.splitext(name)[1]
+    key = f"file{ext}"
+    special = _special_name_pattern()
+    if not ext or special.match(name) or special.match(key):
+        return _text_info_for(name)
+    return _text_info_for(key)
+
+
+@functools.lru_cache(maxsize=1)
+def _special_name_pattern() -> re.Pattern:
+    from pygments.lexers import LEXERS, find_plugin_lexers
+
+    patterns = [pattern for _, _, _, filenames, _ in LEXERS.values() for pattern in filenames]
+    patterns += [pattern for cls in find_plugin_lexers() for pattern in cls.filenames]
+    # 只有單一副檔名的 *.ext 可依副檔名判斷；多段副檔名（*.html.j2）需看完整檔名
+    special = {p for p in patterns if not re.fullmatch(r"\*\.[^*?\[\].]+", p)}
+    return re.compile("|".join(fnmatch.translate(p) for p in sorted(special)) or "(?!)")
+
+
+@functools.lru_cache(maxsize=1024)
+def _text_info_for(filename: str) -> tuple[bool, str | None]:
+    # pygments 載入 lexer 對應表較慢，首次呼叫才 import
+    from pygments.lexers import get_lexer_for_filename
+    from pygments.util import ClassNotFound
+
     try:
         lexer = get_lexer_for_filename(filename)
         alias = lexer.aliases[0] if lexer.aliases else None
@@ -31,6 +59,8 @@ def _get_text_file_info(filename: str) -> tuple[bool, str | None]:
 
 def _resize_image_bytes(data: bytes, mime: str | None = None) -> bytes:
     """若圖片最長邊 > _MAX_IMAGE_SIDE，以等比縮放壓縮後回傳新 bytes；否則原樣回傳。"""
+    from PIL import Image
+
     img = Image.open(io.BytesIO(data))
     w, h = img.size
     if max(w, h) <= _MAX_IMAGE_SIDE:
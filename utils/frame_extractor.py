@@ -0,0 +1,185 @@
+"""影片多時間點截圖引擎（ffmpeg）。
+
+原本 capture_video_frames 對每個時間點各起一個 ffmpeg，逐一執行；每次都要重新開檔、
+探測串流、從頭 seek，取 30 張就要好幾分鐘。此模組先把所有時間點一起規劃：
+
+- 排序後依間距分群：相鄰時間點間隔 ≤ DENSE_GAP 秒且群內至少 DENSE_MIN_FRAMES 張，
+  以「一次 ffmpeg + select filter」連續解碼整段，一次輸出多張
+- 其餘稀疏的時間點各以 input seek（-ss 置於 -i 前）單獨擷取
+- 所有工作以 semaphore 限制並行數（MAX_PARALLEL）同時執行
+- 縮放在 filter graph 內完成（select 之後），不會寫出原解析度畫面
+
+select 模式以 showinfo 回報的 pts_time 對應回各時間點，不依賴輸出張數與請求張數一致。
+"""
+import asyncio
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+DENSE_GAP = 10.0        # 秒；相鄰時間點間隔不超過此值視為同一密集群
+DENSE_MIN_FRAMES = 3    # 密集群至少幾張才值得連續解碼
+MAX_PARALLEL = max(1, min(4, os.cpu_count() or 1))
+SEEK_TIMEOUT = 30       # 單張 seek 擷取逾時（秒），與原本相同
+_JPEG_QSCALE = "2"
+
+_PTS_TIME_RE = re.compile(r"pts_time:\s*([0-9.]+)")
+
+
+@dataclass
+class FrameRequest:
+    label: str          # 呼叫端的時間點字串（原樣回傳）
+    seconds: float
+    output_path: str
+
+
+@dataclass
+class FrameResult:
+    label: str
+    output_path: str
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+def parse_timestamp(ts: str) -> float:
+    """'75.5' / '1:30' / '00:01:30' → 秒數；格式錯誤拋 ValueError。"""
+    parts = ts.strip().split(":")
+    if not 1 <= len(parts) <= 3 or any(p == "" for p in parts):
+        raise ValueError(f"無法解析的時間格式：{ts}")
+    seconds = 0.0
+    for p in parts:
+        seconds = seconds * 60 + float(p)
+    if seconds < 0:
+        raise ValueError(f"時間點不可為負：{ts}")
+    return seconds
+
+
+def _scale_filter(max_side: int | None) -> str:
+    if not max_side:
+        return ""
+    # 只縮不放，維持比例並確保偶數尺寸
+    return (
+        f"scale='min(iw,{max_side})':'min(ih,{max_side})'"
+        ":force_original_aspect_ratio=decrease:force_divisible_by=2"
+    )
+
+
+def plan_jobs(requests: list[FrameRequest]) -> list[list[FrameRequest]]:
+    """依時間密度分群；回傳的每個 list 為一個 ffmpeg 工作（長度 1 表示 seek 擷取）。"""
+    ordered = sorted(requests, key=lambda r: r.seconds)
+    groups: list[list[FrameRequest]] = []
+    for req in ordered:
+        if groups and req.seconds - groups[-1][-1].seconds <= DENSE_GAP:
+            groups[-1].append(req)
+        else:
+            groups.append([req])
+    jobs: list[list[FrameRequest]] = []
+    for group in groups:
+        if len(group) >= DENSE_MIN_FRAMES:
+            jobs.append(group)
+        else:
+            jobs.extend([req] for req in group)
+    return jobs
+
+
+def _run_seek(video_path: str, req: FrameRequest, max_side: int | None) -> FrameResult:
+    cmd = ["ffmpeg", "-y", "-v", "error", "-ss", f"{req.seconds:.3f}", "-i", video_path, "-frames:v", "1"]
+    vf = _scale_filter(max_side)
+    if vf:
+        cmd += ["-vf", vf]
+    cmd += ["-q:v", _JPEG_QSCALE, req.output_path]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=SEEK_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return FrameResult(req.label, "", "截圖逾時")
+    if proc.returncode == 0 and os.path.isfile(req.output_path):
+        return FrameResult(req.label, req.output_path)
+    return FrameResult(req.label, "", f"ffmpeg 失敗 — {proc.stderr.strip()[-200:]}")
+
+
+def _run_select(video_path: str, group: list[FrameRequest], max_side: int | None) -> list[FrameResult]:
+    """一次解碼 [第一個時間點, 最後一個時間點] 區間，以 select 挑出每個時間點之後的第一張畫面。"""
+    start = group[0].seconds
+    span = group[-1].seconds - start
+    # 每個時間點 T 選「t ≥ T 且前一張 t < T」的畫面；第一張的 prev_t 為 NAN
+    terms = "+".join(
+        f"gte(t,{r.seconds:.3f})*(lt(prev_t,{r.seconds:.3f})+isnan(prev_t))" for r in group
+    )
+    filters = [f"select='{terms}'"]
+    vf = _scale_filter(max_side)
+    if vf:
+        filters.append(vf)
+    filters.append("showinfo")
+
+    tmp_dir = tempfile.mkdtemp(prefix="frames_", dir=os.path.dirname(group[0].output_path))
+    try:
+        cmd = [
+            "ffmpeg", "-y", "-v", "info",
+            # -copyts + -start_at_zero：select 的 t 與 showinfo 的 pts_time 皆為影片原始時間
+            "-ss", f"{start:.3f}", "-t", f"{span + 1:.3f}", "-copyts", "-start_at_zero", "-i", video_path,
+            "-vf", ",".join(filters),
+            "-frames:v", str(len(group)),
+            "-fps_mode", "vfr", "-q:v", _JPEG_QSCALE,
+            os.path.join(tmp_dir, "%05d.jpg"),
+        ]
+        try:
+            proc = subprocess.run(cmd, capture_output=True, text=True, timeout=SEEK_TIMEOUT + span)
+        except subprocess.TimeoutExpired:
+            return [FrameResult(r.label, "", "截圖逾時") for r in group]
+        if proc.returncode != 0:
+            err = f"ffmpeg 失敗 — {proc.stderr.strip()[-200:]}"
+            return [FrameResult(r.label, "", err) for r in group]
+
+        # showinfo 依輸出順序記錄每張畫面的 pts_time
+        frame_times = [float(m.group(1)) for m in _PTS_TIME_RE.finditer(proc.stderr)]
+        results = []
+        cursor = 0
+        for req in group:
+            while cursor < len(frame_times) and frame_times[cursor] < req.seconds - 1e-3:
+                cursor += 1
+            src = os.path.join(tmp_dir, f"{cursor + 1:05d}.jpg")
+            if cursor < len(frame_times) and os.path.isfile(src):
+                shutil.copyfile(src, req.output_path)
+                results.append(FrameResult(req.label, req.output_path))
+            else:
+                results.append(FrameResult(req.label, "", "找不到對應畫面（可能超出影片長度）"))
+        return results
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+async def extract_frames(
+    video_path: str,
+    requests: list[FrameRequest],
+    max_side: int | None = None,
+) -> list[FrameResult]:
+    """擷取多個時間點的畫面，回傳順序與 requests 相同。"""
+    semaphore = asyncio.Semaphore(MAX_PARALLEL)
+
+    async def _run(job: list[FrameRequest]) -> list[FrameResult]:
+        async with semaphore:
+            try:
+                if len(job) == 1:
+                    return [await asyncio.to_thread(_run_seek, video_path, job[0], max_side)]
+                return await asyncio.to_thread(_run_select, video_path, job, max_side)
+            except Exception as e:
+                return [FrameResult(r.label, "", str(e)) for r in job]
+
+    jobs = plan_jobs(requests)
+    logger.debug(
+        "[frame_extractor] %d 個時間點 → %d 個 ffmpeg 工作（select 群 %d）",
+        len(requests), len(jobs), sum(1 for j in jobs if len(j) > 1),
+    )
+    by_label: dict[str, FrameResult] = {}
+    for results in await asyncio.gather(*(_run(job) for job in jobs)):
+        for res in results:
+            by_label[res.label] = res
+    return [by_label[r.label] for r in requests]
@@ -0,0 +1,128 @@
+"""WebSocket 心跳排程（整個行程共用一個 timing wheel）。
+
+agent.run() 原本每次 LLM 迭代都建立一個 _ws_keepalive task，每 10 秒送一個空 token，
+防止 tool call arguments 累積期間 WebSocket 閒置斷線；每個 session 每回合最多建立 / 取消 MAX_ITERATIONS 次，
+即使串流正在持續輸出也照樣送。
+
+- register(send) 登記一個需要心跳的串流，回傳 Heartbeat；close() 取消登記
+- 有實際輸出時呼叫 touch()（只更新時間戳記），只有閒置超過 IDLE_THRESHOLD 秒的串流才會收到心跳
+- 全部串流共用一個背景 task：每 TICK 秒處理 wheel 上對應格子內到期的項目，沒有登記時 task 結束
+- send 在登記時的 contextvars（Chainlit context）中執行；送出失敗即停止該串流的心跳
+"""
+import asyncio
+import contextvars
+import logging
+import math
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+IDLE_THRESHOLD = 10.0
+TICK = 1.0
+_SLOTS = 64  # 需大於 IDLE_THRESHOLD / TICK
+
+
+class Heartbeat:
+    __slots__ = ("send", "context", "last_active", "slot", "closed")
+
+    def __init__(self, send: Callable[[], Awaitable], context: contextvars.Context, now: float):
+        self.send = send
+        self.context = context
+        self.last_active = now
+        self.slot: int | None = None
+        self.closed = False
+
+    def touch(self) -> None:
+        """串流有實際輸出時呼叫，延後下一次心跳。"""
+        self.last_active = _scheduler.now()
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            _scheduler.remove(self)
+
+
+class _Scheduler:
+    def __init__(self):
+        self._wheel: list[set[Heartbeat]] = [set() for _ in range(_SLOTS)]
+        self._count = 0
+        self._tick = 0          # 下一個要處理的 tick
+        self._origin = 0.0      # tick 0 對應的 loop.time()
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.sent = 0
+        self.failed = 0
+
+    def now(self) -> float:
+        return self._loop.time() if self._loop is not None else 0.0
+
+    def _schedule(self, hb: Heartbeat, delay: float) -> None:
+        ticks = min(_SLOTS - 1, max(1, math.ceil(delay / TICK)))
+        hb.slot = (self._tick + ticks - 1) % _SLOTS
+        self._wheel[hb.slot].add(hb)
+
+    def add(self, hb: Heartbeat) -> None:
+        self._count += 1
+        if self._task is None or self._task.done():
+            self._tick = 0
+            self._origin = self._loop.time()
+            self._task = self._loop.create_task(self._run())
+        self._schedule(hb, IDLE_THRESHOLD)
+
+    def remove(self, hb: Heartbeat) -> None:
+        if hb.slot is not None:
+            self._wheel[hb.slot].discard(hb)
+            hb.slot = None
+            self._count -= 1
+
+    def _fire(self, hb: Heartbeat) -> None:
+        async def _send() -> None:
+            try:
+                await hb.send()
+                self.sent += 1
+            except Exception:
+                self.failed += 1
+                hb.close()
+        self._loop.create_task(_send(), context=hb.context)
+
+    async def _run(self) -> None:
+        while self._count > 0:
+            await asyncio.sleep(max(0.0, self._origin + (self._tick + 1) * TICK - self._loop.time()))
+            slot = self._wheel[self._tick % _SLOTS]
+            self._tick += 1
+            if not slot:
+                continue
+            now = self._loop.time()
+            due = list(slot)
+            slot.clear()
+            for hb in due:
+                hb.slot = None
+                idle = now - hb.last_active
+                if idle >= IDLE_THRESHOLD - TICK / 2:
+                    self._fire(hb)
+                    hb.last_active = now
+                    idle = 0.0
+                self._schedule(hb, IDLE_THRESHOLD - idle)
+
+    def stats(self) -> dict:
+        return {
+            "streams": self._count,
+            "running": self._task is not None and not self._task.done(),
+            "sent": self.sent,
+            "failed": self.failed,
+        }
+
+
+_scheduler = _Scheduler()
+
+
+def register(send: Callable[[], Awaitable]) -> Heartbeat:
+    """登記需要心跳的串流（需在 event loop 內呼叫）；send 閒置超過 IDLE_THRESHOLD 秒時執行。"""
+    _scheduler._loop = asyncio.get_running_loop()
+    hb = Heartbeat(send, contextvars.copy_context(), _scheduler.now())
+    _scheduler.add(hb)
+    return hb
+
+
+def get_stats() -> dict:
+    return _scheduler.stats()
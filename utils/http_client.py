@@ -0,0 +1,65 @@
+"""行程共用的 aiohttp ClientSession。
+
+http_request 原本每次呼叫都建立新的 ClientSession，連線與 DNS 查詢都無法重用。
+此處維護單一 session（綁定建立時的 event loop），以 TCPConnector 限制總連線數與每個 host 的連線數，
+並快取 DNS 結果。event loop 變更或 session 已關閉時自動重建。
+
+共用 session 不保存 cookie（DummyCookieJar），避免某位使用者請求收到的 Set-Cookie 被帶到其他使用者的請求；
+需要在單次請求內（例如跟隨重新導向）保留 cookie 時，以 request_session() 取得共用連線池、
+cookie 只在該次請求有效的 session。
+
+環境變數：
+    TOOL_HTTP_LIMIT           總連線數上限（預設 100）
+    TOOL_HTTP_LIMIT_PER_HOST  每個 host 連線數上限（預設 8）
+"""
+import asyncio
+import os
+
+import aiohttp
+
+LIMIT = int(os.getenv("TOOL_HTTP_LIMIT", "100"))
+LIMIT_PER_HOST = int(os.getenv("TOOL_HTTP_LIMIT_PER_HOST", "8"))
+DNS_CACHE_TTL = 300  # 秒
+
+_session: aiohttp.ClientSession | None = None
+_connector: aiohttp.TCPConnector | None = None
+_session_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """取得共用 session。請勿以 async with 關閉它；逾時請在個別 request 指定。"""
+    global _session, _session_loop, _connector
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        _connector = aiohttp.TCPConnector(
+            limit=LIMIT,
+            limit_per_host=LIMIT_PER_HOST,
+            ttl_dns_cache=DNS_CACHE_TTL,
+        )
+        _session = aiohttp.ClientSession(
+            connector=_connector,
+            timeout=aiohttp.ClientTimeout(total=None),
+            cookie_jar=aiohttp.DummyCookieJar(),
+        )
+        _session_loop = loop
+    return _session
+
+
+def request_session() -> aiohttp.ClientSession:
+    """回傳單次請求用的 session（以 async with 使用）：共用連線池，cookie 只在此 session 內保留。"""
+    get_http_session()
+    return aiohttp.ClientSession(
+        connector=_connector,
+        connector_owner=False,
+        timeout=aiohttp.ClientTimeout(total=None),
+        cookie_jar=aiohttp.CookieJar(),
+    )
+
+
+async def close_http_session() -> None:
+    global _session, _session_loop, _connector
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    _session_loop = None
+    _connector = None
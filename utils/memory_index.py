@@ -0,0 +1,196 @@
+"""MEMORY.md 索引的增量維護。
+
+routers/memory.py 原本每次新增 / 更新 / 刪除都重建整份索引：列出全部記憶檔、逐一解析 frontmatter、
+依名稱排序後整份覆寫 MEMORY.md，批次編輯時每次操作都是 O(n) 次檔案讀取，也會打亂手動調整的順序。
+
+- 每位使用者的 MEMORY.md 解析一次後保存在記憶體（逐行保留，條目以連結目標檔名定位）
+- upsert_entry / remove_entry 只修改單一行：既有條目原地替換，新條目附加在最後，其餘行不動
+- 200 行 / 25KB 上限在每次修改時以累計的行數與位元組數檢查，超過則拒絕該次修改
+- 修改後延遲 DEBOUNCE_SECONDS 秒才寫檔，期間的多次修改合併為一次原子寫入
+- MEMORY.md 被其他途徑改寫（agent 以 write_file 編輯、memory_extractor）時，
+  依 (mtime, size) 偵測並重新解析，尚未寫出的修改會套用在新內容上
+"""
+import logging
+import os
+import re
+import threading
+
+from utils.memory_manager import (
+    MEMORY_INDEX_MAX_BYTES,
+    MEMORY_INDEX_MAX_LINES,
+    get_memory_index_path,
+    list_memory_files,
+    write_memory_index,
+)
+
+logger = logging.getLogger(__name__)
+
+DEBOUNCE_SECONDS = 0.5
+_HEADER = "# Memory Index"
+_LINK_RE = re.compile(r"\]\(([^)\s]+\.md)\)")
+
+
+def format_entry(filename: str, name: str, description: str) -> str:
+    hook = f"- [{name or filename}]({filename})"
+    if description:
+        hook += f" — {description}"
+    return hook
+
+
+def _line_bytes(line: str) -> int:
+    return len(line.encode("utf-8")) + 1  # 含換行
+
+
+def _stat_key(path: str) -> tuple | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class _UserIndex:
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.path = get_memory_index_path(user_id)
+        self.lock = threading.Lock()
+        self.lines: list[str] = []
+        self.positions: dict[str, int] = {}   # 檔名 → 行號
+        self.total_bytes = 0
+        self.disk_key: tuple | None = None    # 最後一次讀取 / 寫入時 MEMORY.md 的 (mtime_ns, size)
+        self.pending: list[tuple] = []        # 尚未寫出的修改，外部改寫後需重新套用
+        self.timer: threading.Timer | None = None
+        self.loaded = False
+
+    # ── 解析 ──
+
+    def _set_lines(self, lines: list[str]) -> None:
+        self.lines = lines
+        self.positions = {}
+        for i, line in enumerate(lines):
+            m = _LINK_RE.search(line)
+            if m and line.lstrip().startswith("-"):
+                self.positions.setdefault(m.group(1), i)
+        self.total_bytes = sum(_line_bytes(line) for line in lines)
+
+    def _load(self) -> None:
+        """讀取 MEMORY.md；不存在時由現有記憶檔建立（僅此一次需要掃描全部檔案）。"""
+        key = _stat_key(self.path)
+        if key is not None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._set_lines(f.read().splitlines())
+            except OSError:
+                self._set_lines([_HEADER])
+        else:
+            files = sorted(list_memory_files(self.user_id), key=lambda x: x["name"].lower())
+            self._set_lines([_HEADER] + [
+                format_entry(f["filename"], f["name"], f["description"]) for f in files
+            ])
+        self.disk_key = key
+        self.loaded = True
+
+    def _ensure_current(self) -> None:
+        if not self.loaded:
+            self._load()
+            return
+        key = _stat_key(self.path)
+        if key != self.disk_key and key is not None:
+            # 外部改寫：以檔案內容為準，重新套用尚未寫出的修改
+            self._load()
+            for op in self.pending:
+                self._apply(*op)
+
+    # ── 修改 ──
+
+    def _apply(self, op: str, filename: str, line: str | None = None) -> str | None:
+        idx = self.positions.get(filename)
+        if op == "remove":
+            if idx is None:
+                return None
+            self.total_bytes -= _line_bytes(self.lines[idx])
+            del self.lines[idx]
+            del self.positions[filename]
+            for name, pos in self.positions.items():
+                if pos > idx:
+                    self.positions[name] = pos - 1
+            return None
+
+        old_bytes = _line_bytes(self.lines[idx]) if idx is not None else 0
+        new_total = self.total_bytes - old_bytes + _line_bytes(line)
+        new_count = len(self.lines) + (0 if idx is not None else 1)
+        if new_count > MEMORY_INDEX_MAX_LINES:
+            return (
+                f"錯誤：索引超過 {MEMORY_INDEX_MAX_LINES} 行上限"
+                f"（目前 {len(self.lines)} 行）。請先清理舊記憶條目。"
+            )
+        if new_total > MEMORY_INDEX_MAX_BYTES:
+            return (
+                f"錯誤：索引超過 {MEMORY_INDEX_MAX_BYTES // 1024}KB 上限"
+                f"（目前 {self.total_bytes} bytes）。請先清理舊記憶條目。"
+            )
+        if idx is None:
+            self.positions[filename] = len(self.lines)
+            self.lines.append(line)
+        else:
+            self.lines[idx] = line
+        self.total_bytes = new_total
+        return None
+
+    def mutate(self, op: str, filename: str, line: str | None = None) -> str | None:
+        with self.lock:
+            self._ensure_current()
+            error = self._apply(op, filename, line)
+            if error is None:
+                self.pending.append((op, filename, line))
+                if self.timer is None:
+                    self.timer = threading.Timer(DEBOUNCE_SECONDS, self.flush)
+                    self.timer.daemon = True
+                    self.timer.start()
+            return error
+
+    # ── 寫出 ──
+
+    def flush(self) -> None:
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if not self.pending:
+                return
+            self._ensure_current()
+            result = write_memory_index(self.user_id, "\n".join(self.lines) + "\n")
+            if result.startswith("錯誤"):
+                logger.warning("[memory_index] 寫入失敗 user=%s: %s", self.user_id, result)
+            self.pending.clear()
+            self.disk_key = _stat_key(self.path)
+
+
+_indexes: dict[str, _UserIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _get(user_id: str) -> _UserIndex:
+    with _indexes_lock:
+        index = _indexes.get(user_id)
+        if index is None:
+            index = _indexes[user_id] = _UserIndex(user_id)
+        return index
+
+
+def upsert_entry(user_id: str, filename: str, name: str, description: str) -> str | None:
+    """新增或更新單一條目；超過索引上限時回傳錯誤訊息（索引不變）。"""
+    return _get(user_id).mutate("upsert", filename, format_entry(filename, name, description))
+
+
+def remove_entry(user_id: str, filename: str) -> None:
+    _get(user_id).mutate("remove", filename)
+
+
+def flush(user_id: str | None = None) -> None:
+    """立即寫出尚未寫入的修改（user_id=None 表示全部使用者，供 shutdown 使用）。"""
+    with _indexes_lock:
+        targets = list(_indexes.values()) if user_id is None else [_indexes.get(user_id)]
+    for index in targets:
+        if index is not None:
+            index.flush()
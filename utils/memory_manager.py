@@ -19,6 +19,7 @@
 """
 import os
 import re
+import threading
 
 # 專案根目錄
 _PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -356,10 +357,17 @@ def write_memory_index(user_id: str, content: str) -> str:
     os.makedirs(memory_dir, exist_ok=True)
     index_path = get_memory_index_path(user_id)
 
+    # 先寫暫存檔再 rename，讀取端（system prompt 注入）不會讀到寫到一半的索引
+    tmp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
     try:
-        with open(index_path, "w", encoding="utf-8") as f:
+        with open(tmp_path, "w", encoding="utf-8") as f:
             f.write(content)
+        os.replace(tmp_path, index_path)
     except OSError as e:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
         return f"錯誤：寫入 MEMORY.md 失敗 — {e}"
 
     return "已更新 MEMORY.md 記憶索引"
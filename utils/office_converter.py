@@ -0,0 +1,263 @@
+"""LibreOffice 轉檔服務（PPT/PPTX → PDF）。
+
+原本每次轉檔都 `soffice --headless --convert-to pdf` 以全新的預設 profile 啟動，
+且所有行程共用同一個使用者 profile，同時轉檔時會互相搶 profile lock。
+
+此模組維護一個小型 worker pool：
+- 每個 worker 有獨立的 profile 目錄（-env:UserInstallation），轉檔時以該 profile 執行一次性的 soffice，
+  worker 之間不會搶同一個 profile lock；profile 在 worker 的多筆轉檔間沿用，省去每次重新初始化
+- 不常駐 soffice：headless 的 --convert-to 不會可靠地交給已在執行的行程處理，常駐行程只是閒置佔用記憶體
+- 轉檔工作以 asyncio.Queue 排隊，每筆帶 deadline；排到時已逾時則直接失敗，不佔用 worker
+- worker 處理 N 筆後、或轉檔失敗 / 逾時時回收（換新 profile）
+- get_metrics() 提供佇列深度等統計
+
+環境變數：
+    SOFFICE_POOL_SIZE            worker 數量（預設 2）
+    SOFFICE_MAX_JOBS_PER_WORKER  每個 worker 處理幾筆後換新 profile（預設 50）
+"""
+import asyncio
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = max(1, int(os.getenv("SOFFICE_POOL_SIZE", "2")))
+MAX_JOBS_PER_WORKER = max(1, int(os.getenv("SOFFICE_MAX_JOBS_PER_WORKER", "50")))
+DEFAULT_TIMEOUT = 120  # 秒，與原本 subprocess.run(timeout=120) 相同
+
+
+class OfficeConversionError(Exception):
+    """soffice 轉檔失敗（return code 非 0 或未產生輸出檔）。"""
+
+
+class OfficeConversionTimeout(OfficeConversionError):
+    """轉檔超過 deadline（含排隊時間）。"""
+
+
+def find_soffice() -> str | None:
+    """回傳 soffice 執行檔路徑，找不到時回傳 None。"""
+    return shutil.which("soffice") or shutil.which("soffice.bin")
+
+
+def _kill(proc: subprocess.Popen) -> None:
+    """終止 soffice 及其子行程（soffice 啟動器會另外執行 soffice.bin）。"""
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        proc.kill()
+    proc.wait()
+
+
+@dataclass
+class _Job:
+    src: str
+    outdir: str
+    deadline: float  # loop.time() 基準
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class _OfficeWorker:
+    """單一 worker 的獨立 profile 與執行中的 soffice 行程。所有方法皆為同步，由 asyncio.to_thread 呼叫。"""
+
+    def __init__(self, soffice: str, index: int, profile_root: str):
+        self.soffice = soffice
+        self.index = index
+        self.profile_root = profile_root
+        self.profile_dir = ""
+        self.proc: subprocess.Popen | None = None  # 轉檔中的 soffice（shutdown 時終止）
+        self.jobs_done = 0
+        self.recycled = 0
+        self._lock = threading.Lock()
+
+    @property
+    def _profile_arg(self) -> str:
+        return f"-env:UserInstallation={Path(self.profile_dir).as_uri()}"
+
+    def busy(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self) -> None:
+        self.profile_dir = os.path.join(self.profile_root, f"worker{self.index}_{uuid.uuid4().hex[:8]}")
+        os.mkdir(self.profile_dir)  # profile_root 已於 shutdown 移除時不重建
+        self.jobs_done = 0
+        logger.debug("[office_converter] worker %d profile=%s", self.index, self.profile_dir)
+
+    def stop(self) -> None:
+        with self._lock:
+            proc = self.proc
+        if proc is not None and proc.poll() is None:
+            _kill(proc)
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = ""
+
+    def recycle(self) -> None:
+        self.stop()
+        self.start()
+        self.recycled += 1
+
+    def _run(self, cmd: list[str], timeout: float) -> subprocess.CompletedProcess:
+        proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, start_new_session=True,
+        )
+        with self._lock:
+            self.proc = proc
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _kill(proc)
+            proc.communicate()
+            raise
+        finally:
+            with self._lock:
+                self.proc = None
+        return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+    def convert(self, src: str, outdir: str, timeout: float) -> str:
+        """轉檔並回傳 PDF 路徑；失敗時拋 OfficeConversionError / OfficeConversionTimeout。"""
+        if not self.profile_dir:
+            self.start()
+
+        cmd = [
+            self.soffice, self._profile_arg,
+            "--headless", "--invisible", "--nologo", "--norestore", "--nodefault", "--nolockcheck",
+            "--convert-to", "pdf", "--outdir", outdir, src,
+        ]
+        try:
+            proc = self._run(cmd, timeout)
+        except subprocess.TimeoutExpired:
+            # profile 可能留下鎖定檔或半寫入的設定，換新的
+            self.recycle()
+            raise OfficeConversionTimeout(f"soffice 轉換逾時（超過 {timeout:.0f} 秒）")
+
+        self.jobs_done += 1
+        pdf_path = os.path.join(outdir, f"{Path(src).stem}.pdf")
+        if proc.returncode != 0:
+            self.recycle()
+            raise OfficeConversionError(
+                f"soffice 轉換失敗（return code {proc.returncode}）：\n{proc.stderr.strip()[-500:]}"
+            )
+        if not os.path.isfile(pdf_path):
+            self.recycle()
+            raise OfficeConversionError(
+                f"soffice 執行成功但未找到輸出的 PDF 檔案。\nstdout: {proc.stdout.strip()}\nstderr: {proc.stderr.strip()}"
+            )
+        if self.jobs_done >= MAX_JOBS_PER_WORKER:
+            self.recycle()
+        return pdf_path
+
+
+class OfficeConverterPool:
+    """以 asyncio.Queue 分派轉檔工作給固定數量的 soffice worker（各自使用獨立 profile）。
+
+    worker task 於第一次 convert_to_pdf() 時在當前 event loop 上啟動。
+    """
+
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = size
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._workers: list[_OfficeWorker] = []
+        self._profile_root = ""
+        self._busy = 0
+        self._stats = {"completed": 0, "failed": 0, "expired": 0, "recycled": 0}
+
+    def _ensure_started(self, soffice: str) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._profile_root = tempfile.mkdtemp(prefix="eaic_soffice_")
+        for i in range(self.size):
+            worker = _OfficeWorker(soffice, i, self._profile_root)
+            self._workers.append(worker)
+            self._tasks.append(asyncio.create_task(self._run_worker(worker), name=f"soffice-worker-{i}"))
+
+    async def _run_worker(self, worker: _OfficeWorker) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job: _Job = await self._queue.get()
+            try:
+                if job.future.done():
+                    continue
+                remaining = job.deadline - loop.time()
+                if remaining <= 0:
+                    self._stats["expired"] += 1
+                    job.future.set_exception(OfficeConversionTimeout("soffice 轉換逾時（排隊等待超過期限）"))
+                    continue
+                self._busy += 1
+                before = worker.recycled
+                try:
+                    pdf_path = await asyncio.to_thread(worker.convert, job.src, job.outdir, remaining)
+                except Exception as e:
+                    self._stats["failed"] += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    self._stats["completed"] += 1
+                    if not job.future.done():
+                        job.future.set_result(pdf_path)
+                finally:
+                    self._busy -= 1
+                    self._stats["recycled"] += worker.recycled - before
+            finally:
+                self._queue.task_done()
+
+    async def convert_to_pdf(self, src: str, outdir: str, timeout: float = DEFAULT_TIMEOUT) -> str:
+        """將 src 轉為 PDF 輸出至 outdir，回傳 PDF 絕對路徑。timeout 含排隊時間。"""
+        soffice = find_soffice()
+        if not soffice:
+            raise OfficeConversionError("找不到 soffice（LibreOffice），請確認系統已安裝 LibreOffice 並加入 PATH。")
+        self._ensure_started(soffice)
+        loop = asyncio.get_running_loop()
+        job = _Job(src=src, outdir=outdir, deadline=loop.time() + timeout, future=loop.create_future())
+        await self._queue.put(job)
+        return await job.future
+
+    def get_metrics(self) -> dict:
+        """回傳佇列深度、忙碌 worker 數與累計統計。"""
+        return {
+            "pool_size": self.size,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "busy_workers": self._busy,
+            "running_processes": sum(1 for w in self._workers if w.busy()),
+            **self._stats,
+        }
+
+    async def shutdown(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        for worker in self._workers:
+            await asyncio.to_thread(worker.stop)
+        self._workers.clear()
+        if self._profile_root:
+            shutil.rmtree(self._profile_root, ignore_errors=True)
+            self._profile_root = ""
+        self._queue = None
+
+
+# ── 全域單例 ──
+_pool = OfficeConverterPool()
+
+
+async def convert_to_pdf(src: str, outdir: str, timeout: float = DEFAULT_TIMEOUT) -> str:
+    return await _pool.convert_to_pdf(src, outdir, timeout)
+
+
+def get_metrics() -> dict:
+    return _pool.get_metrics()
+
+
+async def shutdown() -> None:
+    await _pool.shutdown()
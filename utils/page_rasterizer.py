@@ -0,0 +1,200 @@
+"""PDF 頁面平行點陣化（PyMuPDF + process pool）。
+
+原本投影片預覽在單一執行緒內逐頁 get_pixmap → save，60 頁的簡報就是 60 次循序的
+渲染 + PNG 編碼，只用得到一顆核心。此模組把頁面切成連續區段（shard）分派到 process pool，
+每個 worker 自行開啟 PDF（同一 worker 會重用最近開啟的文件），並依完成順序逐段回報，
+呼叫端可邊收邊顯示縮圖。
+
+PNG 壓縮：png_compress_level=None 使用 MuPDF 內建編碼；指定 0–9 時改由 Pillow 編碼，
+數字越小越快、檔案越大（1 通常是速度與大小的較佳折衷）。
+
+環境變數：
+    RASTER_WORKERS  process pool 大小（預設 min(4, CPU 數)；設 1 則不使用 process pool）
+"""
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+WORKERS = max(1, int(os.getenv("RASTER_WORKERS", str(min(4, os.cpu_count() or 1)))))
+_MAX_SHARD_PAGES = 4     # 單一 shard 最多頁數，越小回報越即時
+_INLINE_MAX_PAGES = 2    # 頁數不超過此值時直接在 thread 內渲染，省去跨行程開銷
+
+_executor: ProcessPoolExecutor | None = None
+
+
+@dataclass
+class RasterResult:
+    index: int       # 0 起算頁碼
+    path: str        # 輸出檔絕對路徑；失敗時為空字串
+    error: str = ""
+
+
+# ── worker 端（於子行程執行）──
+
+_worker_doc = None
+_worker_doc_key: tuple | None = None
+
+
+def _open_doc(pdf_path: str):
+    """子行程內重用最近開啟的文件（以路徑 + mtime + size 判斷是否同一份）。"""
+    global _worker_doc, _worker_doc_key
+    import fitz  # pymupdf
+
+    st = os.stat(pdf_path)
+    key = (pdf_path, st.st_mtime_ns, st.st_size)
+    if _worker_doc_key != key:
+        if _worker_doc is not None:
+            _worker_doc.close()
+        _worker_doc = fitz.open(pdf_path)
+        _worker_doc_key = key
+    return _worker_doc
+
+
+def _save_pixmap(pix, dst: str, png_compress_level: int | None) -> None:
+    if png_compress_level is None:
+        pix.save(dst)
+        return
+    from PIL import Image
+    img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    img.save(dst, format="PNG", compress_level=png_compress_level)
+
+
+def _render_indices(
+    doc,
+    indices: list[int],
+    out_dir: str,
+    name_template: str,
+    scale: float,
+    png_compress_level: int | None,
+) -> list[tuple[int, str, str]]:
+    import fitz  # pymupdf
+
+    mat = fitz.Matrix(scale, scale)
+    results = []
+    for i in indices:
+        dst = os.path.join(out_dir, name_template.format(i + 1))
+        try:
+            pix = doc[i].get_pixmap(matrix=mat, alpha=False)
+            _save_pixmap(pix, dst, png_compress_level)
+            results.append((i, dst, ""))
+        except Exception as e:
+            results.append((i, "", str(e)))
+    return results
+
+
+def _render_shard(pdf_path: str, indices: list[int], *args) -> list[tuple[int, str, str]]:
+    """子行程入口：渲染一段頁面，回傳 [(index, path, error), ...]。"""
+    return _render_indices(_open_doc(pdf_path), indices, *args)
+
+
+def _render_inline(pdf_path: str, indices: list[int], *args) -> list[tuple[int, str, str]]:
+    """主行程 thread 內渲染（每次自行開關文件，避免多個請求共用同一個 doc 物件）。"""
+    import fitz  # pymupdf
+
+    with fitz.open(pdf_path) as doc:
+        return _render_indices(doc, indices, *args)
+
+
+# ── 呼叫端 ──
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # 主行程有多條執行緒（uvicorn / to_thread），fork 可能複製到被持有的 lock，改用 spawn
+        _executor = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    global _executor
+    if _executor is executor:
+        _executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_page_count(pdf_path: str) -> int:
+    import fitz  # pymupdf
+
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def _split_shards(indices: list[int], workers: int) -> list[list[int]]:
+    shard_size = max(1, min(_MAX_SHARD_PAGES, math.ceil(len(indices) / (workers * 2))))
+    return [indices[i: i + shard_size] for i in range(0, len(indices), shard_size)]
+
+
+async def rasterize_pdf(
+    pdf_path: str,
+    out_dir: str,
+    scale: float,
+    name_template: str = "page_{:03d}.png",
+    pages: list[int] | None = None,
+    png_compress_level: int | None = None,
+    workers: int | None = None,
+) -> AsyncIterator[RasterResult]:
+    """逐段渲染 PDF 頁面為 PNG，依完成順序 yield RasterResult（非頁碼順序）。
+
+    Args:
+        name_template: 輸出檔名格式，以 1 起算頁碼 format
+        pages: 0 起算頁碼清單，None 表示全部
+        workers: 同時在途的 shard 數（上限為 pool 大小）；1 表示在 thread 內循序渲染
+    """
+    if pages is None:
+        pages = list(range(await asyncio.to_thread(get_page_count, pdf_path)))
+    if not pages:
+        return
+    workers = workers or WORKERS
+    args = (out_dir, name_template, scale, png_compress_level)
+
+    if workers <= 1 or len(pages) <= _INLINE_MAX_PAGES:
+        for i in pages:
+            for idx, path, error in await asyncio.to_thread(_render_inline, pdf_path, [i], *args):
+                yield RasterResult(idx, path, error)
+        return
+
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    shards = iter(_split_shards(pages, workers))
+    pending: set[asyncio.Future] = set()
+
+    def _submit_next() -> None:
+        shard = next(shards, None)
+        if shard is not None:
+            pending.add(loop.run_in_executor(executor, _render_shard, pdf_path, shard, *args))
+
+    # 同時最多 workers 個 shard 在途，完成一個補一個
+    for _ in range(workers):
+        _submit_next()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                pending.discard(fut)
+                _submit_next()
+                try:
+                    shard_results = fut.result()
+                except BrokenProcessPool:
+                    # worker 行程異常結束後 pool 無法再用，丟棄讓下次重建
+                    _discard_executor(executor)
+                    raise
+                for idx, path, error in shard_results:
+                    yield RasterResult(idx, path, error)
+    finally:
+        for fut in pending:
+            fut.cancel()
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
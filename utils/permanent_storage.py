@@ -4,6 +4,8 @@ import re
 import shutil
 from datetime import datetime, timezone, timedelta
 
+from utils import search_index
+
 
 def make_safe_filename(name: str) -> str:
     """去除路徑分隔符，保留中文、英數、底線、點、連字號，截 100 字元。"""
@@ -32,4 +34,5 @@ def move_to_permanent(src: str, conversation_folder: str, original_name: str) ->
     dst = get_upload_path(conversation_folder, original_name)
     os.makedirs(os.path.dirname(dst), exist_ok=True)
     shutil.copy2(src, dst)
+    search_index.notify_changed(dst)
     return dst
@@ -3,15 +3,27 @@ PPTX 模板套用工具。
 
 保留 template 的 slideMasters/、slideLayouts/、theme/，
 將 source（pptxgenjs 生成）的 slides/ 替換進去，重新打包輸出。
+
+模板以 (路徑, mtime, size) 為 key 解析一次後快取在記憶體（_TemplatePackage）：
+layout 對應表、[Content_Types].xml、presentation.xml 與其 rels，以及每個 ZIP entry 的原始壓縮資料。
+合併全程在記憶體中進行，不解壓到暫存目錄；只有改變或新增的部分重新壓縮，
+模板的 masters / layouts / theme / media 與 source 的圖片、圖表直接複製壓縮後的 bytes。
 """
+import copy
 import io
-import shutil
-import tempfile
+import logging
+import os
+import re
+import struct
 import zipfile
-from pathlib import Path
+from dataclasses import dataclass
 
 from lxml import etree
 
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
 SLIDE_CONTENT_TYPE = (
     "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
 )
@@ -32,6 +44,125 @@ CT_NS   = "http://schemas.openxmlformats.org/package/2006/content-types"
 P_NS    = "http://schemas.openxmlformats.org/presentationml/2006/main"
 R_NS    = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
 
+CONTENT_TYPES_PART = "[Content_Types].xml"
+PRESENTATION_PART = "ppt/presentation.xml"
+PRESENTATION_RELS_PART = "ppt/_rels/presentation.xml.rels"
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")  # ZIP local file header（30 bytes）
+
+# (realpath, mtime_ns, size) → _TemplatePackage；模板數量少，保留最近使用的幾份即可
+_template_cache = TTLCache(maxsize=4, ttl=3600)
+
+
+@dataclass
+class _TemplatePackage:
+    entries: list[tuple[zipfile.ZipInfo, bytes]]  # 依原順序；bytes 為壓縮後的原始資料
+    layout_map: dict[str, str]
+    content_types: bytes
+    presentation: bytes
+    presentation_rels: bytes
+
+
+# ── ZIP 原始資料存取 ──
+
+def _read_raw(fp, info: zipfile.ZipInfo) -> bytes:
+    """讀取 entry 壓縮後的原始資料（不解壓）。"""
+    fp.seek(info.header_offset)
+    header = _LOCAL_HEADER.unpack(fp.read(_LOCAL_HEADER.size))
+    name_len, extra_len = header[-2], header[-1]
+    fp.seek(info.header_offset + _LOCAL_HEADER.size + name_len + extra_len)
+    return fp.read(info.compress_size)
+
+
+def _write_raw(zout: zipfile.ZipFile, info: zipfile.ZipInfo, raw: bytes, name: str | None = None) -> None:
+    """將壓縮後的原始資料直接寫入 zout（沿用原 CRC / 大小 / 壓縮方式）。"""
+    zi = copy.copy(info)
+    if name is not None:
+        zi.filename = zi.orig_filename = name
+    zi.flag_bits &= ~0x08  # 大小與 CRC 寫在 local header，不另附 data descriptor
+    zi.header_offset = zout.fp.tell()
+    zout.fp.write(zi.FileHeader())
+    zout.fp.write(raw)
+    zout.filelist.append(zi)
+    zout.NameToInfo[zi.filename] = zi
+    zout.start_dir = zout.fp.tell()
+    zout._didModify = True
+
+
+def _is_direct_child(name: str, folder: str, prefix: str = "", suffix: str = "") -> bool:
+    """name 是否為 folder 底下（不含子目錄）、檔名符合 prefix / suffix 的檔案。"""
+    if not name.startswith(folder):
+        return False
+    base = name[len(folder):]
+    return bool(base) and "/" not in base and base.startswith(prefix) and base.endswith(suffix)
+
+
+def _num_key(name: str) -> int:
+    stem = name.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+    return int("".join(filter(str.isdigit, stem)) or "0")
+
+
+# ── 模板解析（快取）──
+
+def _load_template(template_path: str) -> _TemplatePackage:
+    real = os.path.realpath(template_path)
+    st = os.stat(real)
+    key = (real, st.st_mtime_ns, st.st_size)
+    package = _template_cache.get(key, None)
+    if package is not None:
+        return package
+
+    with open(real, "rb") as fp, zipfile.ZipFile(fp) as z:
+        infos = [i for i in z.infolist() if not i.is_dir()]
+        entries = [(info, _read_raw(fp, info)) for info in infos]
+        layouts = {
+            i.filename: z.read(i).decode("utf-8", errors="replace")
+            for i in infos
+            if _is_direct_child(i.filename, "ppt/slideLayouts/", "slideLayout", ".xml")
+        }
+        package = _TemplatePackage(
+            entries=entries,
+            layout_map=_scan_template_layouts(layouts),
+            content_types=z.read(CONTENT_TYPES_PART),
+            presentation=z.read(PRESENTATION_PART),
+            presentation_rels=z.read(PRESENTATION_RELS_PART),
+        )
+    _template_cache.set(key, package)
+    return package
+
+
+def _scan_template_layouts(layouts: dict[str, str]) -> dict[str, str]:
+    """掃描模板的 slideLayouts（part 名稱 → XML 內容），回傳兩種 key 的對應表：
+
+    - name（精確）：layout 的 p:cSld name 屬性，如 "Ending Page"
+    - "type:<ooxml_type>"（fallback）：如 "type:title"、"type:blank"
+
+    Target 為 slide rels 中可直接使用的相對路徑（../slideLayouts/slideLayoutN.xml）。
+    同一 name 或 type 有多個 layout 時，保留編號最小的。
+    """
+    result: dict[str, str] = {}
+    for part in sorted(layouts, key=_num_key):
+        content = layouts[part]
+        target = f"../slideLayouts/{part.rsplit('/', 1)[-1]}"
+        # 提取 name（精確 key）
+        m_name = re.search(r'<p:cSld[^>]*\bname="([^"]*)"', content)
+        if m_name:
+            name = m_name.group(1)
+            if name and name not in result:
+                result[name] = target
+        # 提取 OOXML type（fallback key，加 "type:" 前綴避免與 name 衝突）
+        m_type = re.search(r'\btype="([^"]+)"', content)
+        if m_type:
+            type_key = f"type:{m_type.group(1)}"
+            if type_key not in result:
+                result[type_key] = target
+    # 確保 fallback 始終存在
+    if not result:
+        result["type:title"] = "../slideLayouts/slideLayout1.xml"
+    return result
+
+
+# ── 合併 ──
 
 def apply_pptx_template(source_bytes: bytes, template_path: str, layout_hints: list | None = None) -> bytes:
     """將 source_bytes（pptxgenjs 生成的 PPTX）的投影片套用到 template_path 的企業模板中。
@@ -40,59 +171,51 @@ def apply_pptx_template(source_bytes: bytes, template_path: str, layout_hints: l
     layout_hints 為每張投影片的 layout name（對應模板 slideLayout 的 name 屬性），None 表示自動判斷。
     回傳合併後的 PPTX bytes。
     """
-    with tempfile.TemporaryDirectory() as tmp:
-        tmp_path = Path(tmp)
-        src_dir = tmp_path / "source"
-        tpl_dir = tmp_path / "template"
-
-        with zipfile.ZipFile(io.BytesIO(source_bytes)) as z:
-            z.extractall(src_dir)
-        with zipfile.ZipFile(template_path) as z:
-            z.extractall(tpl_dir)
+    package = _load_template(template_path)
+    src_fp = io.BytesIO(source_bytes)
+    with zipfile.ZipFile(src_fp) as src:
+        return _merge_slides(src, src_fp, package, layout_hints or [])
 
-        _merge_slides(src_dir, tpl_dir, layout_hints or [])
 
-        buf = io.BytesIO()
-        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zout:
-            for f in sorted(tpl_dir.rglob("*")):
-                if f.is_file():
-                    zout.write(f, f.relative_to(tpl_dir))
-        return buf.getvalue()
-
-
-def _merge_slides(src_dir: Path, tpl_dir: Path, layout_hints: list | None = None) -> None:
-    """核心合併邏輯，直接修改 tpl_dir 內容。
+def _merge_slides(src: zipfile.ZipFile, src_fp, package: _TemplatePackage, layout_hints: list | None = None) -> bytes:
+    """核心合併邏輯：以模板 entries 為底，移除舊 slides、加入 source 的 slides 與資源。
 
     layout_hints 為每張投影片的 layout name（對應模板 slideLayout 的 name 屬性）。
     None 或空字串表示該頁自動依位置判斷。
     """
     hints = layout_hints or []
-    print(f"[_merge_slides] hints={hints}")
-    src_slides_dir = src_dir / "ppt" / "slides"
-    tpl_slides_dir = tpl_dir / "ppt" / "slides"
-    tpl_rels_dir   = tpl_slides_dir / "_rels"
-    tpl_slides_dir.mkdir(parents=True, exist_ok=True)
-    tpl_rels_dir.mkdir(parents=True, exist_ok=True)
-
-    # 刪除 template 原有的 slides
-    for f in list(tpl_slides_dir.glob("slide*.xml")):
-        f.unlink()
-    for f in list(tpl_rels_dir.glob("slide*.xml.rels")):
-        f.unlink()
-
-    # 掃描模板 layout，key 為 name（精確）與 "type:<ooxml_type>"（fallback）
-    layout_map = _scan_template_layouts(tpl_dir)
-    print(f"[_merge_slides] layout_map keys={list(layout_map.keys())}")
+    layout_map = package.layout_map
+    src_infos = {i.filename: i for i in src.infolist() if not i.is_dir()}
+
+    # 刪除 template 原有的 slides 與孤立的 notesSlides（備忘稿內容，對應已刪除的模板投影片）
+    # notesMasters 保留，否則 presentation.xml 的 notesSz 定義會找不到參照而報損壞
+    def _dropped(name: str) -> bool:
+        return (
+            _is_direct_child(name, "ppt/slides/", "slide", ".xml")
+            or _is_direct_child(name, "ppt/slides/_rels/", "slide", ".xml.rels")
+            or name.startswith("ppt/notesSlides/")
+        )
+
+    template_entries = [(info, raw) for info, raw in package.entries if not _dropped(info.filename)]
+    existing = {info.filename for info, _ in template_entries}
+
+    # 新增的 entry：name → ("raw", ZipInfo, 壓縮資料) 或 ("data", 未壓縮 bytes)
+    added: dict[str, tuple] = {}
+
+    def _add_raw(name: str, src_name: str) -> None:
+        info = src_infos[src_name]
+        added[name] = ("raw", info, _read_raw(src_fp, info))
 
     # 複製 source slides（重編號從 1 開始）
     src_slides = sorted(
-        src_slides_dir.glob("slide*.xml"),
-        key=lambda p: int("".join(filter(str.isdigit, p.stem)) or "0"),
+        (n for n in src_infos if _is_direct_child(n, "ppt/slides/", "slide", ".xml")),
+        key=_num_key,
     )
     total = len(src_slides)
+    slide_rels: dict[str, bytes] = {}
     for i, src_slide in enumerate(src_slides, 1):
-        shutil.copy(src_slide, tpl_slides_dir / f"slide{i}.xml")
-        src_rel = src_slides_dir / "_rels" / f"{src_slide.name}.rels"
+        _add_raw(f"ppt/slides/slide{i}.xml", src_slide)
+        src_rel = f"ppt/slides/_rels/{src_slide.rsplit('/', 1)[-1]}.rels"
 
         hint = hints[i - 1] if i - 1 < len(hints) else None
         if hint and hint in layout_map:
@@ -111,91 +234,59 @@ def _merge_slides(src_dir: Path, tpl_dir: Path, layout_hints: list | None = None
             layout_target = (layout_map.get("type:blank")
                              or layout_map.get("type:obj")
                              or layout_map.get("type:title"))
-        print(f"[_merge_slides] slide{i}: hint={hint!r} -> layout_target={layout_target}")
-
-        if src_rel.exists():
-            _fix_slide_rels(src_rel, tpl_rels_dir / f"slide{i}.xml.rels", layout_target)
-
-    # 複製 source 的 media（圖片等），不覆蓋 template 已有檔案
-    src_media = src_dir / "ppt" / "media"
-    tpl_media = tpl_dir / "ppt" / "media"
-    if src_media.exists():
-        tpl_media.mkdir(exist_ok=True)
-        for mf in src_media.iterdir():
-            dest = tpl_media / mf.name
-            if not dest.exists():
-                shutil.copy(mf, dest)
-
-    # 複製 source 的 charts 和 embeddings（圖表所需資源）
-    _copy_charts(src_dir, tpl_dir)
-
-    src_emb = src_dir / "ppt" / "embeddings"
-    tpl_emb = tpl_dir / "ppt" / "embeddings"
-    if src_emb.exists():
-        tpl_emb.mkdir(exist_ok=True)
-        for f in src_emb.iterdir():
-            dest = tpl_emb / f.name
-            if not dest.exists():
-                shutil.copy(f, dest)
-
-    # 清除孤立的 notesSlides（備忘稿內容，對應已刪除的模板投影片）
-    # notesMasters 保留，否則 presentation.xml 的 notesSz 定義會找不到參照而報損壞
-    notes_dir = tpl_dir / "ppt" / "notesSlides"
-    if notes_dir.exists():
-        shutil.rmtree(notes_dir)
+        logger.debug("[pptx_template] slide%d: hint=%r -> layout_target=%s", i, hint, layout_target)
 
-    _update_content_types(tpl_dir, len(src_slides))
-    _update_presentation(tpl_dir, len(src_slides))
+        if src_rel in src_infos:
+            slide_rels[f"ppt/slides/_rels/slide{i}.xml.rels"] = _fix_slide_rels(src.read(src_rel), layout_target)
 
+    # 複製 source 的 media（圖片等）與 embeddings（圖表數據），不覆蓋 template 已有檔案
+    for folder in ("ppt/media/", "ppt/embeddings/"):
+        for name in sorted(n for n in src_infos if _is_direct_child(n, folder)):
+            if name not in existing and name not in added:
+                _add_raw(name, name)
 
-def _scan_template_layouts(tpl_dir: Path) -> dict[str, str]:
-    """掃描模板的 slideLayouts，回傳兩種 key 的對應表：
+    # 複製 source 的 charts（圖表所需資源），處理檔名衝突
+    chart_names = _copy_charts(src_infos, existing, slide_rels, _add_raw)
 
-    - name（精確）：layout 的 p:cSld name 屬性，如 "Ending Page"
-    - "type:<ooxml_type>"（fallback）：如 "type:title"、"type:blank"
+    for name, data in slide_rels.items():
+        added[name] = ("data", data)
 
-    Target 為 slide rels 中可直接使用的相對路徑（../slideLayouts/slideLayoutN.xml）。
-    同一 name 或 type 有多個 layout 時，保留編號最小的。
-    """
-    import re
-    layouts_dir = tpl_dir / "ppt" / "slideLayouts"
-    result: dict[str, str] = {}
-    if not layouts_dir.exists():
-        return result
-    for lf in sorted(layouts_dir.glob("slideLayout*.xml"),
-                     key=lambda p: int("".join(filter(str.isdigit, p.stem)) or "0")):
-        try:
-            content = lf.read_text(encoding="utf-8", errors="replace")
-        except Exception:
-            continue
-        target = f"../slideLayouts/{lf.name}"
-        # 提取 name（精確 key）
-        m_name = re.search(r'<p:cSld[^>]*\bname="([^"]*)"', content)
-        if m_name:
-            name = m_name.group(1)
-            if name and name not in result:
-                result[name] = target
-        # 提取 OOXML type（fallback key，加 "type:" 前綴避免與 name 衝突）
-        m_type = re.search(r'\btype="([^"]+)"', content)
-        if m_type:
-            type_key = f"type:{m_type.group(1)}"
-            if type_key not in result:
-                result[type_key] = target
-    # 確保 fallback 始終存在
-    if not result:
-        result["type:title"] = "../slideLayouts/slideLayout1.xml"
-    return result
-
-
-def _fix_slide_rels(src_rels_path: Path, dest_path: Path, layout_target: str | None = None) -> None:
-    """複製 slide rels，將 slideLayout 引用改為指定的 layout_target。
+    content_types = _update_content_types(package.content_types, total, chart_names)
+    presentation, presentation_rels = _update_presentation(
+        package.presentation, package.presentation_rels, total
+    )
+    replaced = {
+        CONTENT_TYPES_PART: content_types,
+        PRESENTATION_PART: presentation,
+        PRESENTATION_RELS_PART: presentation_rels,
+    }
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zout:
+        for info, raw in template_entries:
+            name = info.filename
+            if name in replaced:
+                zout.writestr(name, replaced[name])
+            elif name in added:
+                continue  # source 同名檔案（charts 衝突時已改名，其餘不覆蓋模板）
+            else:
+                _write_raw(zout, info, raw)
+        for name, item in added.items():
+            if item[0] == "raw":
+                _write_raw(zout, item[1], item[2], name)
+            else:
+                zout.writestr(name, item[1])
+    return buf.getvalue()
+
+
+def _fix_slide_rels(rels_xml: bytes, layout_target: str | None = None) -> bytes:
+    """回傳改寫後的 slide rels，將 slideLayout 引用改為指定的 layout_target。
 
     同時移除 notesSlide 引用（模板通常沒有對應的 notesSlide 檔案）。
     layout_target 為 None 時 fallback 至 slideLayout1.xml。
     """
     target = layout_target or "../slideLayouts/slideLayout1.xml"
-    tree = etree.parse(str(src_rels_path))
-    root = tree.getroot()
+    root = etree.fromstring(rels_xml)
     to_remove = []
     for rel in root.findall(f"{{{RELS_NS}}}Relationship"):
         rel_type = rel.get("Type", "")
@@ -205,61 +296,57 @@ def _fix_slide_rels(src_rels_path: Path, dest_path: Path, layout_target: str | N
             to_remove.append(rel)
     for rel in to_remove:
         root.remove(rel)
-    tree.write(str(dest_path), xml_declaration=True, encoding="UTF-8", standalone=True)
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
 
 
-def _copy_charts(src_dir: Path, tpl_dir: Path) -> None:
-    """複製 source 的 charts 目錄到 template，處理檔名衝突（重新編號）。
+def _copy_charts(src_infos: dict, existing: set[str], slide_rels: dict[str, bytes], add_raw) -> list[str]:
+    """加入 source 的 charts，處理檔名衝突（重新編號）；回傳合併後全部 chart 檔名。
 
     若 tpl 已有同名 chart（例如模板自帶），對 source chart 重新編號，
     並同步更新所有 slide rels 中對應的 Target 路徑。
     """
-    src_charts = src_dir / "ppt" / "charts"
-    tpl_charts = tpl_dir / "ppt" / "charts"
-    if not src_charts.exists():
-        return
-
-    tpl_charts.mkdir(parents=True, exist_ok=True)
-    (tpl_charts / "_rels").mkdir(exist_ok=True)
+    tpl_charts = {
+        n.rsplit("/", 1)[-1] for n in existing if _is_direct_child(n, "ppt/charts/", "chart", ".xml")
+    }
+    src_charts = sorted(
+        (n for n in src_infos if _is_direct_child(n, "ppt/charts/", "chart", ".xml")),
+        key=_num_key,
+    )
+    if not src_charts:
+        return sorted(tpl_charts)
 
     # 取得 tpl 已有的最大 chart 編號
-    existing_nums = set()
-    for f in tpl_charts.glob("chart*.xml"):
-        digits = "".join(filter(str.isdigit, f.stem))
-        if digits:
-            existing_nums.add(int(digits))
-    next_num = max(existing_nums, default=0) + 1
+    next_num = max((_num_key(n) for n in tpl_charts if _num_key(n)), default=0) + 1
 
     # 逐一複製 src chart，衝突時重新編號
-    tpl_slides_rels_dir = tpl_dir / "ppt" / "slides" / "_rels"
-    for src_chart in sorted(src_charts.glob("chart*.xml"),
-                            key=lambda p: int("".join(filter(str.isdigit, p.stem)) or "0")):
-        dest_name = src_chart.name
-        if (tpl_charts / dest_name).exists():
+    charts = set(tpl_charts)
+    for src_chart in src_charts:
+        src_name = src_chart.rsplit("/", 1)[-1]
+        dest_name = src_name
+        if dest_name in charts:
             dest_name = f"chart{next_num}.xml"
             next_num += 1
 
-        shutil.copy(src_chart, tpl_charts / dest_name)
+        add_raw(f"ppt/charts/{dest_name}", src_chart)
+        charts.add(dest_name)
 
         # 複製對應的 chart rels
-        src_chart_rel = src_charts / "_rels" / f"{src_chart.name}.rels"
-        if src_chart_rel.exists():
-            shutil.copy(src_chart_rel, tpl_charts / "_rels" / f"{dest_name}.rels")
+        src_chart_rel = f"ppt/charts/_rels/{src_name}.rels"
+        if src_chart_rel in src_infos:
+            add_raw(f"ppt/charts/_rels/{dest_name}.rels", src_chart_rel)
 
         # 若檔名有改變，更新 slide rels 中指向此 chart 的 Target
-        if dest_name != src_chart.name and tpl_slides_rels_dir.exists():
-            old_target = f"../charts/{src_chart.name}"
-            new_target = f"../charts/{dest_name}"
-            for rels_file in tpl_slides_rels_dir.glob("slide*.xml.rels"):
-                content = rels_file.read_text(encoding="utf-8")
+        if dest_name != src_name:
+            old_target = f"../charts/{src_name}".encode()
+            new_target = f"../charts/{dest_name}".encode()
+            for rels_name, content in slide_rels.items():
                 if old_target in content:
-                    rels_file.write_text(content.replace(old_target, new_target), encoding="utf-8")
+                    slide_rels[rels_name] = content.replace(old_target, new_target)
+    return sorted(charts)
 
 
-def _update_content_types(tpl_dir: Path, slide_count: int) -> None:
-    ct_path = tpl_dir / "[Content_Types].xml"
-    tree = etree.parse(str(ct_path))
-    root = tree.getroot()
+def _update_content_types(ct_xml: bytes, slide_count: int, chart_names: list[str]) -> bytes:
+    root = etree.fromstring(ct_xml)
     # 移除舊 slide 與 notesSlide 條目
     for ov in list(root.findall(f"{{{CT_NS}}}Override")):
         part = ov.get("PartName", "")
@@ -271,32 +358,25 @@ def _update_content_types(tpl_dir: Path, slide_count: int) -> None:
         ov.set("PartName", f"/ppt/slides/slide{i}.xml")
         ov.set("ContentType", SLIDE_CONTENT_TYPE)
     # 補齊 chart Override 條目
-    charts_dir = tpl_dir / "ppt" / "charts"
-    if charts_dir.exists():
-        existing_parts = {ov.get("PartName") for ov in root.findall(f"{{{CT_NS}}}Override")}
-        for cf in sorted(charts_dir.glob("chart*.xml")):
-            part = f"/ppt/charts/{cf.name}"
-            if part not in existing_parts:
-                ov = etree.SubElement(root, f"{{{CT_NS}}}Override")
-                ov.set("PartName", part)
-                ov.set("ContentType", CHART_CONTENT_TYPE)
+    existing_parts = {ov.get("PartName") for ov in root.findall(f"{{{CT_NS}}}Override")}
+    for name in chart_names:
+        part = f"/ppt/charts/{name}"
+        if part not in existing_parts:
+            ov = etree.SubElement(root, f"{{{CT_NS}}}Override")
+            ov.set("PartName", part)
+            ov.set("ContentType", CHART_CONTENT_TYPE)
     # 補齊 xlsx Default（圖表 embedding 數據格式）
     extensions = {d.get("Extension") for d in root.findall(f"{{{CT_NS}}}Default")}
     if "xlsx" not in extensions:
         d = etree.SubElement(root, f"{{{CT_NS}}}Default")
         d.set("Extension", "xlsx")
         d.set("ContentType", XLSX_CONTENT_TYPE)
-    tree.write(str(ct_path), xml_declaration=True, encoding="UTF-8", standalone=True)
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
 
 
-def _update_presentation(tpl_dir: Path, slide_count: int) -> None:
-    pres_path = tpl_dir / "ppt" / "presentation.xml"
-    rels_path = tpl_dir / "ppt" / "_rels" / "presentation.xml.rels"
-
-    pres = etree.parse(str(pres_path))
-    rels = etree.parse(str(rels_path))
-    pres_root = pres.getroot()
-    rels_root = rels.getroot()
+def _update_presentation(pres_xml: bytes, rels_xml: bytes, slide_count: int) -> tuple[bytes, bytes]:
+    pres_root = etree.fromstring(pres_xml)
+    rels_root = etree.fromstring(rels_xml)
 
     # 移除舊 slide relationships
     for rel in list(rels_root):
@@ -338,5 +418,7 @@ def _update_presentation(tpl_dir: Path, slide_count: int) -> None:
         rel_el.set("Type", SLIDE_REL_TYPE)
         rel_el.set("Target", f"slides/slide{i}.xml")
 
-    pres.write(str(pres_path), xml_declaration=True, encoding="UTF-8", standalone=True)
-    rels.write(str(rels_path), xml_declaration=True, encoding="UTF-8", standalone=True)
+    return (
+        etree.tostring(pres_root, xml_declaration=True, encoding="UTF-8", standalone=True),
+        etree.tostring(rels_root, xml_declaration=True, encoding="UTF-8", standalone=True),
+    )
@@ -0,0 +1,202 @@
+"""簡報預覽的漸進式產生（背景工作 + 事件紀錄）。
+
+原本 /api/pptx-preview 要等 LibreOffice 轉檔與所有頁面點陣化完成才回應，
+agent 端的 render_pptx 也要等全部縮圖完成（最多 120 秒），大型簡報期間預覽區一片空白。
+
+- 上傳後立即建立 PreviewJob 並回傳 job_id，轉檔與點陣化在背景 task 執行
+- 每頁縮圖一完成就複製到 artifacts 目錄並記錄 "slide" 事件，前端以 SSE（或輪詢）即時顯示
+- PDF 轉出後記錄 "valid" 事件（含總頁數），代表簡報可正常開啟
+- 開頭連續 READY_SLIDES 頁完成（或全部完成）時呼叫 on_ready，讓 agent 不必等整份簡報
+- 轉檔函式與點陣化函式可替換，方便以假的轉換器控制頁面完成時機
+
+事件種類：valid {slide_count}、slide {index, url}、done {slide_urls}、error {error}
+
+環境變數：
+    PPTX_PREVIEW_READY_SLIDES  開頭幾頁完成即通知 agent 繼續（預設 3）
+"""
+import asyncio
+import logging
+import os
+import shutil
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from utils.ttl_registry import TTLRegistry
+
+logger = logging.getLogger(__name__)
+
+READY_SLIDES = max(1, int(os.getenv("PPTX_PREVIEW_READY_SLIDES", "3")))
+JOB_RETENTION = 600   # 完成後保留多久（秒），讓晚連上的 SSE / 輪詢仍能取得結果
+JOB_MAX_RUNTIME = 3600  # 尚未完成的工作最多保留多久（秒）
+_PING_INTERVAL = 15.0
+
+
+@dataclass
+class PreviewJob:
+    job_id: str
+    owner: str                               # 建立者 user id，查詢時比對
+    slide_urls: dict[int, str] = field(default_factory=dict)
+    slide_count: int | None = None           # PDF 轉出後才知道
+    error: str = ""
+    finished: bool = False
+    ready_notified: bool = False
+    events: list[tuple[str, dict]] = field(default_factory=list)
+    task: asyncio.Task | None = None
+    _changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def _emit(self, kind: str, data: dict) -> None:
+        self.events.append((kind, data))
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def ready_prefix(self) -> int:
+        """從第 1 頁起連續完成的頁數。"""
+        n = 0
+        while n in self.slide_urls:
+            n += 1
+        return n
+
+    def snapshot(self) -> dict:
+        """輪詢用：目前狀態（slide_urls 依頁碼排列，未完成的頁為 None）。"""
+        count = self.slide_count if self.slide_count is not None else len(self.slide_urls)
+        return {
+            "job_id": self.job_id,
+            "slide_count": self.slide_count,
+            "slide_urls": [self.slide_urls.get(i) for i in range(count)],
+            "finished": self.finished,
+            "error": self.error,
+        }
+
+    async def follow(self, ping_interval: float = _PING_INTERVAL) -> AsyncIterator[tuple[str, dict | None]]:
+        """從頭重播事件並持續等待新事件，工作結束後返回；閒置時 yield ("ping", None)。"""
+        i = 0
+        while True:
+            while i < len(self.events):
+                yield self.events[i]
+                i += 1
+            if self.finished:
+                return
+            changed = self._changed
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=ping_interval)
+            except asyncio.TimeoutError:
+                yield "ping", None
+
+    async def wait_done(self) -> None:
+        while not self.finished:
+            await self._changed.wait()
+
+
+_jobs = TTLRegistry("pptx_preview_jobs", ttl=JOB_MAX_RUNTIME, maxsize=1000)
+
+
+def create_job(owner: str) -> PreviewJob:
+    job = PreviewJob(job_id=uuid.uuid4().hex, owner=owner)
+    _jobs[job.job_id] = job
+    return job
+
+
+def get_job(job_id: str, owner: str) -> PreviewJob | None:
+    job = _jobs.get(job_id)
+    if job is None or job.owner != owner:
+        return None
+    return job
+
+
+def _finish(job: PreviewJob) -> None:
+    job.finished = True
+    _jobs.touch(job.job_id, JOB_RETENTION)
+
+
+async def run_preview_job(
+    job: PreviewJob,
+    pptx_path: str,
+    artifacts_dir: str,
+    name_prefix: str,
+    url_base: str,
+    cache_key: str,
+    convert: Callable[[str, str], Awaitable[str]],
+    rasterize: Callable[..., AsyncIterator[Any]],
+    get_page_count: Callable[[str], int],
+    scale: float,
+    png_compress_level: int | None = None,
+    on_ready: Callable[[PreviewJob], None] | None = None,
+) -> None:
+    """轉檔 + 逐頁點陣化，每頁完成即發布到 artifacts_dir（以 render_cache 快取整份結果）。
+
+    convert(src, outdir) 回傳 PDF 路徑；rasterize 介面同 utils.page_rasterizer.rasterize_pdf。
+    on_ready 在開頭 READY_SLIDES 頁完成、全部完成或失敗時呼叫一次。
+    """
+    from utils.render_cache import render_cache
+
+    def _notify_ready() -> None:
+        if job.ready_notified or on_ready is None:
+            return
+        job.ready_notified = True
+        try:
+            on_ready(job)
+        except Exception:
+            logger.exception("[preview_jobs] on_ready 失敗 job=%s", job.job_id)
+
+    async def _publish(index: int, src: str) -> None:
+        if index in job.slide_urls:
+            return
+        name = f"{name_prefix}_slide_{index + 1:03d}.png"
+        await asyncio.to_thread(shutil.copyfile, src, os.path.join(artifacts_dir, name))
+        job.slide_urls[index] = f"{url_base}/{name}"
+        job._emit("slide", {"index": index, "url": job.slide_urls[index]})
+        target = READY_SLIDES if job.slide_count is None else min(READY_SLIDES, job.slide_count)
+        if job.ready_prefix() >= target:
+            _notify_ready()
+
+    def _set_count(count: int) -> None:
+        if job.slide_count is None:
+            job.slide_count = count
+            job._emit("valid", {"slide_count": count})
+
+    async def _build(entry_dir: str) -> dict:
+        pdf_path = await convert(pptx_path, entry_dir)
+        count = await asyncio.to_thread(get_page_count, pdf_path)
+        _set_count(count)
+
+        pages: list[str] = []
+        async for result in rasterize(
+            pdf_path, entry_dir, scale, pages=list(range(count)), png_compress_level=png_compress_level,
+        ):
+            if result.error:
+                raise RuntimeError(f"page {result.index + 1}: {result.error}")
+            pages.append(os.path.basename(result.path))
+            await _publish(result.index, result.path)
+        pages.sort()
+        return {"pdf": os.path.basename(pdf_path), "pages": pages}
+
+    try:
+        for attempt in range(2):
+            try:
+                async with render_cache.acquire(cache_key, _build) as entry:
+                    # 快取命中（或加入他人進行中的建置）時，頁面直接從快取發布
+                    _set_count(len(entry.manifest["pages"]))
+                    for i, name in enumerate(entry.manifest["pages"]):
+                        await _publish(i, entry.file(name))
+                break
+            except FileNotFoundError:
+                # 快取目錄在讀取途中被其他 worker 淘汰：作廢後重建一次（已發布的頁面不會重複發布）
+                if attempt or not render_cache.discard_missing(cache_key):
+                    raise
+    except Exception as e:
+        job.error = str(e) or type(e).__name__
+        logger.warning("[preview_jobs] 預覽失敗 job=%s: %s", job.job_id, job.error)
+        job._emit("error", {"error": job.error})
+    else:
+        job._emit("done", {"slide_urls": [job.slide_urls[i] for i in range(job.slide_count or 0)]})
+    finally:
+        _notify_ready()
+        _finish(job)
+        job._changed.set()
+
+
+def start_preview_job(job: PreviewJob, **kwargs) -> PreviewJob:
+    """以背景 task 執行 run_preview_job（參數同 run_preview_job，job 除外）。"""
+    job.task = asyncio.create_task(run_preview_job(job, **kwargs))
+    return job
@@ -0,0 +1,309 @@
+"""投影片渲染結果快取（以檔案內容 hash 為 key）。
+
+capture_ppt_slides 與 /api/pptx-preview 每次都重新 soffice 轉 PDF、逐頁轉 PNG，
+即使是同一份未變更的簡報。此模組把渲染中間產物（PDF、各頁 PNG、投影片資訊、grid 圖）
+存在磁碟快取目錄，下次以 (內容 hash, 縮放倍率, 頁範圍, 變體) 命中時直接複製到 artifacts/。
+
+- 每個 key 對應一個目錄，內含 builder 寫出的檔案與 manifest.json
+- 以總位元組數為上限，超過時依 LRU 淘汰；使用中（acquire 期間）的項目不會被淘汰
+- 同一 key 同時被多個請求要求時只建置一次（single-flight），其餘等待同一結果
+- 行程重啟後會從磁碟重建索引（依目錄 mtime 排序）；多個 worker 共用快取目錄時，
+  索引中沒有的 key 先檢查磁碟上是否已由其他 worker 建置，建置中的暫存目錄（_build_*）不會被清除
+- 淘汰與覆蓋時先把目錄改名為 _trash_* 再刪除（刪除在 thread 內執行，不佔用 event loop），
+  其他行程不會看到刪到一半的項目；pin 只在同一行程內有效，讀取快取檔案遇到
+  FileNotFoundError 時以 discard_missing 作廢後重新 acquire 即可重建
+
+環境變數：
+    RENDER_CACHE_DIR        快取目錄（預設系統暫存目錄下的 eaic_render_cache）
+    RENDER_CACHE_MAX_BYTES  快取總大小上限（預設 512 MB）
+"""
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv("RENDER_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "eaic_render_cache")
+MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+_MANIFEST = "manifest.json"
+_BUILD_PREFIX = "_build_"
+_TRASH_PREFIX = "_trash_"
+_STALE_BUILD_SECONDS = 6 * 3600  # 超過此時間未更新的暫存目錄視為中斷殘留
+_HASH_CHUNK = 1024 * 1024
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    """串流計算檔案 sha256（同步，請以 asyncio.to_thread 呼叫）。"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def make_key(content_hash: str, scale: float, page_range: tuple[int, int] | None = None, variant: str = "") -> str:
+    """組合快取 key。page_range 為 (起, 迄) 含頭尾、1 起算；None 表示全部頁。"""
+    pages = "all" if page_range is None else f"{page_range[0]}-{page_range[1]}"
+    raw = f"{content_hash}|{scale:g}|{pages}|{variant}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:40]
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    path: str          # 項目目錄，內含 builder 產出的檔案
+    manifest: dict     # builder 回傳的描述資料（JSON 可序列化）
+    size: int = 0
+
+    def file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+class RenderCache:
+    """磁碟 LRU 快取，索引保存在記憶體。"""
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._pins: dict[str, int] = {}
+        self._total = 0
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    # ── 索引 ──
+
+    def _load_index(self) -> None:
+        """從磁碟重建索引（同步），僅第一次使用時執行。"""
+        os.makedirs(self.root, exist_ok=True)
+        found: list[tuple[float, CacheEntry]] = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith(_TRASH_PREFIX):
+                # 淘汰途中中斷的殘留（或其他 worker 正在刪除），直接清除
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            if name.startswith(_BUILD_PREFIX):
+                # 可能是其他 worker 正在建置的暫存目錄，只清除久未更新的殘留
+                with contextlib.suppress(OSError):
+                    if time.time() - os.path.getmtime(path) > _STALE_BUILD_SECONDS:
+                        shutil.rmtree(path, ignore_errors=True)
+                continue
+            manifest_path = os.path.join(path, _MANIFEST)
+            if not os.path.isfile(manifest_path):
+                # 建置到一半中斷的殘留目錄
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            try:
+                with open(manifest_path, encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            found.append((os.path.getmtime(manifest_path), CacheEntry(name, path, manifest, _dir_size(path))))
+        for _, entry in sorted(found, key=lambda x: x[0]):
+            self._entries[entry.key] = entry
+            self._total += entry.size
+        self._loaded = True
+
+    def _read_entry(self, key: str) -> CacheEntry | None:
+        """讀取磁碟上已完成的項目（同步）；不存在或 manifest 損毀時回傳 None。"""
+        path = os.path.join(self.root, key)
+        try:
+            with open(os.path.join(path, _MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(key, path, manifest, _dir_size(path))
+
+    def _touch(self, key: str) -> bool:
+        """更新 LRU 順序；項目目錄已被移除（其他 worker 淘汰）時回傳 False。"""
+        self._entries.move_to_end(key)
+        try:
+            os.utime(os.path.join(self._entries[key].path, _MANIFEST))
+        except FileNotFoundError:
+            return False
+        except OSError:
+            pass
+        return True
+
+    def _pick_victims(self) -> list[str]:
+        """從索引移除超出上限的 LRU 項目（未 pin 者），回傳待刪除的目錄。"""
+        victims: list[str] = []
+        for key in list(self._entries):
+            if self._total <= self.max_bytes:
+                break
+            if self._pins.get(key):
+                continue
+            entry = self._entries.pop(key)
+            self._total -= entry.size
+            self._stats["evictions"] += 1
+            victims.append(entry.path)
+            logger.debug("[render_cache] evict %s (%d bytes)", key, entry.size)
+        return victims
+
+    def _trash(self, path: str) -> None:
+        """把目錄改名為 _trash_* 後刪除（同步）；目錄已不存在時略過。"""
+        trash = os.path.join(self.root, f"{_TRASH_PREFIX}{os.path.basename(path)}_{uuid.uuid4().hex[:8]}")
+        try:
+            os.rename(path, trash)
+        except FileNotFoundError:
+            return
+        except OSError:
+            trash = path
+        shutil.rmtree(trash, ignore_errors=True)
+
+    def _delete(self, paths: list[str]) -> None:
+        for path in paths:
+            self._trash(path)
+
+    def discard_missing(self, *keys: str) -> bool:
+        """讀取快取檔案遇到 FileNotFoundError 後呼叫：把目錄已被刪除（其他 worker 淘汰）的 key 移出索引。
+
+        回傳是否有 key 被移除；True 時重新 acquire 會重建，False 表示錯誤與快取無關。
+        """
+        removed = False
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None and not os.path.isfile(entry.file(_MANIFEST)):
+                del self._entries[key]
+                self._total -= entry.size
+                removed = True
+        return removed
+
+    # ── 建置 ──
+
+    async def _build(self, key: str, builder: Callable[[str], Awaitable[dict]]) -> CacheEntry:
+        staging = os.path.join(self.root, f"{_BUILD_PREFIX}{key}_{uuid.uuid4().hex[:8]}")
+        os.makedirs(staging, exist_ok=True)
+        try:
+            manifest = await builder(staging)
+
+            def _finalize() -> CacheEntry:
+                with open(os.path.join(staging, _MANIFEST), "w", encoding="utf-8") as f:
+                    json.dump(manifest, f, ensure_ascii=False)
+                final = os.path.join(self.root, key)
+                # 既有的同名目錄可能正被其他 worker 讀取，先改名移開再換上新目錄
+                self._trash(final)
+                try:
+                    os.replace(staging, final)
+                except OSError:
+                    # 其他 worker 搶先完成同一 key：改用對方的結果
+                    existing = self._read_entry(key)
+                    if existing is None:
+                        raise
+                    shutil.rmtree(staging, ignore_errors=True)
+                    return existing
+                return CacheEntry(key, final, manifest, _dir_size(final))
+
+            return await asyncio.to_thread(_finalize)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    async def _get_or_build(self, key: str, builder: Callable[[str], Awaitable[dict]]) -> CacheEntry:
+        if not self._loaded:
+            async with self._load_lock:
+                if not self._loaded:
+                    await asyncio.to_thread(self._load_index)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if self._touch(key):
+                self._stats["hits"] += 1
+                return entry
+            del self._entries[key]
+            self._total -= entry.size
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats["hits"] += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            # 索引中沒有不代表磁碟上沒有：其他 worker 可能已建置完成
+            entry = await asyncio.to_thread(self._read_entry, key)
+            if entry is not None:
+                self._stats["hits"] += 1
+            else:
+                self._stats["misses"] += 1
+                entry = await self._build(key, builder)
+        except BaseException as e:
+            # 建置者被取消時，等待同一 key 的其他請求改收到一般例外
+            future.set_exception(e if isinstance(e, Exception) else RuntimeError("render cancelled"))
+            future.exception()  # 避免無人等待時出現 "exception was never retrieved"
+            raise
+        else:
+            self._entries[key] = entry
+            self._total += entry.size
+            future.set_result(entry)
+            return entry
+        finally:
+            self._inflight.pop(key, None)
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, key: str, builder: Callable[[str], Awaitable[dict]]):
+        """取得快取項目（未命中時呼叫 builder(目錄) 建置），with 區塊內不會被淘汰。
+
+        builder 為 async 函數：把產物寫入傳入的目錄，回傳 manifest dict。
+        """
+        self._pins[key] = self._pins.get(key, 0) + 1
+        try:
+            entry = await self._get_or_build(key, builder)
+            yield entry
+        finally:
+            self._pins[key] -= 1
+            if not self._pins[key]:
+                del self._pins[key]
+            victims = self._pick_victims()
+            if victims:
+                await asyncio.to_thread(self._delete, victims)
+
+    def get_metrics(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "total_bytes": self._total,
+            "max_bytes": self.max_bytes,
+            "inflight": len(self._inflight),
+            **self._stats,
+        }
+
+
+def copy_files(pairs: list[tuple[str, str]]) -> None:
+    """依 (來源, 目的) 清單複製檔案（同步）。快取檔案不以 hardlink 提供，避免 artifacts 被覆寫時污染快取。"""
+    for src, dst in pairs:
+        shutil.copyfile(src, dst)
+
+
+# ── 全域單例 ──
+render_cache = RenderCache()
@@ -0,0 +1,303 @@
+"""grep_files 的串流搜尋執行器（獨立 worker 行程 + 時間預算）。
+
+原本 grep_files 把每個檔案整個讀進記憶體、先組出全部輸出行再依 offset/head_limit 切片；
+遇到災難性回溯的 regex（如 (a+)+$）或 uploads/ 裡的大型二進位檔時沒有任何保護。
+
+- 搜尋在獨立的 worker 行程中執行：Python 的 re 無法從其他執行緒中斷，
+  超過時間預算時直接終止 worker 行程，回傳目前已收到的部分結果
+- 檔案以 64 KB chunk 串流讀取、逐行比對，記憶體只保留前文 context 行
+- 開頭 8 KB 含 NUL byte 的檔案視為二進位檔，直接略過
+- 輸出行數達到本頁所需（offset + head_limit + 1）即停止
+- 可傳入 trigram 索引（utils/search_index）算出的候選行範圍，範圍外的行只作為 context 不比對
+- worker 行程閒置時保留重用，被終止後下次自動重建；時間預算從 worker 回報就緒後才起算，
+  新 worker 的啟動時間不計入
+
+環境變數：
+    GREP_TIME_BUDGET  單次搜尋時間上限（秒，預設 10）
+"""
+import codecs
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+TIME_BUDGET = float(os.getenv("GREP_TIME_BUDGET", "10"))
+_CHUNK_SIZE = 64 * 1024
+_SNIFF_BYTES = 8192
+_MAX_DISPLAY_CHARS = 2000   # 單行顯示上限（壓縮過的 JS / CSV 可能一行數 MB）
+_BATCH_LINES = 200          # worker 每累積幾行輸出就回傳一次，逾時時仍保有部分結果
+_MAX_IDLE_WORKERS = 2
+_STARTUP_TIMEOUT = 30.0     # 新 worker 啟動（spawn + import）的等待上限
+
+
+@dataclass
+class FileTask:
+    path: str
+    display: str                                  # 輸出時的檔名（相對路徑）
+    ranges: list[tuple[int, int]] | None = None   # 需比對的行範圍（0 起算、end 不含）；None 為全部
+
+
+@dataclass
+class SearchOutcome:
+    lines: list[str] = field(default_factory=list)
+    total_matches: int = 0
+    stopped_early: bool = False   # 已填滿本頁，未搜尋全部檔案
+    timed_out: bool = False       # 超過時間預算，結果不完整
+    current_file: str = ""        # 逾時當下正在搜尋的檔案
+    skipped_binary: int = 0
+
+
+# ── worker 端（於子行程執行）──
+
+class BinaryFile(Exception):
+    pass
+
+
+def iter_lines(path: str):
+    """串流讀檔並逐行 yield（不含換行符）；開頭含 NUL 時拋 BinaryFile。
+
+    search_index 建索引時也用此函式讀檔，兩邊的行號與二進位判斷才會一致。
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    with open(path, "rb") as f:
+        first = True
+        while True:
+            chunk = f.read(_CHUNK_SIZE)
+            if first:
+                if b"\x00" in chunk[:_SNIFF_BYTES]:
+                    raise BinaryFile(path)
+                first = False
+            text = decoder.decode(chunk, final=not chunk)
+            if text:
+                parts = (pending + text).splitlines(keepends=True)
+                pending = ""
+                # 沒有行結尾的最後一段留到下一塊；結尾為 \r 時可能是被讀取邊界切開的 \r\n，同樣留著
+                if parts and (parts[-1].endswith("\r") or _strip_eol(parts[-1]) == parts[-1]):
+                    pending = parts.pop()
+                for part in parts:
+                    yield _strip_eol(part)
+            if not chunk:
+                break
+    if pending:
+        yield _strip_eol(pending)
+
+
+def _strip_eol(part: str) -> str:
+    """去掉 splitlines(keepends=True) 留下的行結尾（\n、\r、\x0c、\u2028 等，與 str.splitlines 一致）。"""
+    return part.splitlines()[0] if part else part
+
+
+def _fmt(lineno: int, line: str, is_match: bool) -> str:
+    if len(line) > _MAX_DISPLAY_CHARS:
+        line = line[:_MAX_DISPLAY_CHARS] + "…"
+    return f"  {'>' if is_match else ' '}{lineno:4d}: {line}"
+
+
+def _run_search(conn, pattern: str, flags: int, tasks: list[FileTask], context_lines: int, needed: int | None) -> None:
+    regex = re.compile(pattern, flags)
+    emitted = 0
+    matches_total = 0
+    batch: list[str] = []
+    batch_matches = 0
+
+    def _flush() -> None:
+        nonlocal batch, batch_matches, emitted
+        if batch:
+            conn.send(("lines", batch, batch_matches))
+            emitted += len(batch)
+            batch = []
+            batch_matches = 0
+
+    skipped_binary = 0
+    stopped = False
+    for task in tasks:
+        if needed is not None and emitted >= needed:
+            stopped = True
+            break
+        conn.send(("file", task.display))
+
+        ranges = task.ranges
+        range_idx = 0
+        before: deque = deque(maxlen=context_lines or 1)
+        after_remaining = 0
+        last_printed = 0
+        header_sent = False
+        try:
+            for idx, line in enumerate(iter_lines(task.path)):
+                lineno = idx + 1
+                check = True
+                if ranges is not None:
+                    while range_idx < len(ranges) and idx >= ranges[range_idx][1]:
+                        range_idx += 1
+                    check = range_idx < len(ranges) and idx >= ranges[range_idx][0]
+                    if not check and after_remaining == 0 and range_idx >= len(ranges):
+                        break  # 已超過最後一個候選範圍
+                if check and regex.search(line):
+                    matches_total += 1
+                    batch_matches += 1
+                    if not header_sent:
+                        batch.append(task.display)
+                        header_sent = True
+                    first_ctx = lineno - len(before) if context_lines else lineno
+                    if last_printed and first_ctx > last_printed + 1:
+                        batch.append("--")
+                    if context_lines:
+                        for k, prev in enumerate(before):
+                            batch.append(_fmt(first_ctx + k, prev, False))
+                        before.clear()
+                    batch.append(_fmt(lineno, line, True))
+                    last_printed = lineno
+                    after_remaining = context_lines
+                elif after_remaining > 0:
+                    batch.append(_fmt(lineno, line, False))
+                    last_printed = lineno
+                    after_remaining -= 1
+                elif context_lines:
+                    before.append(line)
+                if needed is not None and emitted + len(batch) >= needed and after_remaining == 0:
+                    stopped = True
+                    break
+                if len(batch) >= _BATCH_LINES:
+                    _flush()
+        except BinaryFile:
+            skipped_binary += 1
+            continue
+        except OSError:
+            continue
+        if header_sent:
+            batch.append("")
+        _flush()
+        if stopped:
+            break
+
+    _flush()
+    conn.send(("done", matches_total, stopped, skipped_binary))
+
+
+def _worker_main(conn) -> None:
+    conn.send(("ready",))
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        try:
+            _run_search(conn, *job)
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+# ── 呼叫端 ──
+
+class _Worker:
+    def __init__(self):
+        ctx = multiprocessing.get_context("spawn")
+        self.conn, child_conn = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker_main, args=(child_conn,), daemon=True, name="grep-worker")
+        self.proc.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self, timeout: float) -> None:
+        """等待 worker 回報就緒（只有新建的 worker 需要等待）。"""
+        if self.ready:
+            return
+        if not self.conn.poll(timeout):
+            raise RuntimeError("搜尋 worker 啟動逾時")
+        try:
+            msg = self.conn.recv()
+        except (EOFError, OSError) as e:
+            raise RuntimeError("搜尋 worker 意外結束") from e
+        if msg[0] != "ready":
+            raise RuntimeError(f"搜尋 worker 回傳非預期訊息：{msg[0]}")
+        self.ready = True
+
+    def kill(self) -> None:
+        if self.proc.is_alive():
+            self.proc.kill()
+        self.proc.join(timeout=1)
+        self.conn.close()
+
+
+_idle: list[_Worker] = []
+_idle_lock = threading.Lock()
+
+
+def _acquire() -> _Worker:
+    with _idle_lock:
+        while _idle:
+            worker = _idle.pop()
+            if worker.proc.is_alive():
+                return worker
+            worker.kill()
+    return _Worker()
+
+
+def _release(worker: _Worker) -> None:
+    with _idle_lock:
+        if len(_idle) < _MAX_IDLE_WORKERS and worker.proc.is_alive():
+            _idle.append(worker)
+            return
+    worker.kill()
+
+
+def search(
+    pattern: str,
+    flags: int,
+    tasks: list[FileTask],
+    context_lines: int,
+    needed: int | None,
+    budget: float = TIME_BUDGET,
+) -> SearchOutcome:
+    """同步執行搜尋（請以 asyncio.to_thread 呼叫）。needed 為所需輸出行數，None 表示不限。"""
+    outcome = SearchOutcome()
+    worker = _acquire()
+    reusable = False
+    try:
+        worker.wait_ready(_STARTUP_TIMEOUT)
+        worker.conn.send((pattern, flags, tasks, context_lines, needed))
+        deadline = time.monotonic() + budget
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                outcome.timed_out = True
+                break
+            if not worker.conn.poll(min(remaining, 0.5)):
+                if not worker.proc.is_alive():
+                    raise RuntimeError("搜尋 worker 意外結束")
+                continue
+            try:
+                msg = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                raise RuntimeError("搜尋 worker 意外結束") from e
+            kind = msg[0]
+            if kind == "file":
+                outcome.current_file = msg[1]
+            elif kind == "lines":
+                outcome.lines.extend(msg[1])
+                outcome.total_matches += msg[2]
+            elif kind == "done":
+                _, outcome.total_matches, outcome.stopped_early, outcome.skipped_binary = msg
+                reusable = True
+                break
+            elif kind == "error":
+                reusable = True
+                raise RuntimeError(msg[1])
+    finally:
+        if reusable:
+            _release(worker)
+        else:
+            # 逾時或異常：regex 可能仍在回溯，直接終止行程
+            worker.kill()
+    if outcome.timed_out:
+        logger.warning("[search_executor] 搜尋逾時（%.1fs），停在 %s", budget, outcome.current_file)
+    return outcome
@@ -0,0 +1,321 @@
+"""grep_files 用的 trigram 索引（每個對話資料夾 / 記憶目錄各一份）。
+
+原本 grep_files 每次都讀完目錄下所有檔案、逐行跑 regex。此模組為每個根目錄維護：
+    檔案路徑 → (mtime_ns, size, 每 BLOCK_LINES 行一組、大小寫折疊後的 trigram 雜湊排序陣列)
+查詢時從 regex 抽出「一定要出現」的字面字串轉成 trigram，只有包含全部 trigram 的檔案
+與行區段才需要實際讀檔以 regex 驗證；抽不出 trigram 的 pattern 則退回全掃描。
+
+- trigram 不跨行（grep_files 是逐行比對）
+- 每次查詢以 (mtime_ns, size) 驗證索引，過期即重建該檔；write_file / edit_file / delete_file
+  與上傳時另以 notify_changed / notify_deleted 主動更新
+- 過大的檔案與開頭含 NUL 的二進位檔不建索引，查詢時視為「一律是候選」
+  （二進位檔交給 search_executor 略過並計數）
+- 每個 block 只存 trigram 的 30-bit 雜湊（排序後的 array('I')，每個 trigram 4 bytes）；
+  雜湊碰撞只會多出候選、不會漏掉匹配，候選行仍由 regex 驗證。索引只存在本行程記憶體，
+  str 的雜湊隨機化不影響
+- 所有根目錄的索引共用 INDEX_BUDGET_MB 的記憶體上限，超過時依 LRU 釋放最久未用的檔案索引
+- 建索引可傳入 deadline，逾時即停止，未建完的檔案視為一律是候選
+- 所有方法皆為同步，請在 asyncio.to_thread 內呼叫
+
+環境變數：
+    GREP_INDEX_BUDGET_MB  所有 trigram 索引的記憶體上限（MB，預設 128）
+"""
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from utils.search_executor import BinaryFile, iter_lines
+
+try:
+    import re._parser as _sre_parse
+    import re._constants as _sre_const
+except ImportError:  # Python < 3.11
+    import sre_parse as _sre_parse
+    import sre_constants as _sre_const
+
+BLOCK_LINES = 128
+MAX_INDEX_BYTES = 8 * 1024 * 1024  # 超過此大小的檔案不建索引
+INDEX_BUDGET_BYTES = int(float(os.getenv("GREP_INDEX_BUDGET_MB", "128")) * 1024 * 1024)
+_HASH_MASK = (1 << 30) - 1  # 30 bits 以內的 int 排序走單一 digit 的快速路徑
+
+
+# re 的忽略大小寫會把這些字元視為 ASCII 字母（ſ↔s、ı / İ↔i），str.lower() 卻不會（K 則已轉為 k）；
+# 建索引與抽取 trigram 時都先折疊，避免忽略大小寫的查詢漏掉候選
+# （str.replace 在字元不存在時幾乎不花成本，比 dict 版的 str.translate 快一個數量級）
+def _fold(text: str) -> str:
+    return text.replace("\u017f", "s").replace("\u0131", "i").replace("\u0130", "i").lower()
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _contains(sorted_values: array, value: int) -> bool:
+    i = bisect_left(sorted_values, value)
+    return i < len(sorted_values) and sorted_values[i] == value
+
+
+# ── regex → 必要 trigram ──
+
+def _literal_runs(parsed, runs: list[str]) -> None:
+    """收集「串接」位置上連續的字面字元；遇到可選 / 分支 / 字元集合即中斷。"""
+    run: list[str] = []
+
+    def _flush():
+        if len(run) >= 3:
+            runs.append("".join(run))
+        run.clear()
+
+    for op, av in parsed:
+        if op is _sre_const.LITERAL:
+            run.append(chr(av))
+        elif op is _sre_const.AT:
+            continue  # ^ $ \b 等零寬斷言不影響相鄰字元
+        elif op is _sre_const.SUBPATTERN:
+            _flush()
+            add_flags, del_flags, sub = av[1], av[2], av[3]
+            if not add_flags and not del_flags:
+                _literal_runs(sub, runs)
+        elif op in (_sre_const.MAX_REPEAT, _sre_const.MIN_REPEAT):
+            _flush()
+            lo, _hi, sub = av
+            if lo >= 1:
+                _literal_runs(sub, runs)
+        else:
+            _flush()
+    _flush()
+
+
+def required_trigrams(pattern: str, ignore_case: bool) -> set[str]:
+    """回傳任何匹配行都必定包含的小寫 trigram；無法判斷時回傳空集合（表示不過濾）。"""
+    try:
+        parsed = _sre_parse.parse(pattern)
+    except Exception:
+        return set()
+    runs: list[str] = []
+    _literal_runs(parsed, runs)
+    if ignore_case or parsed.state.flags & _sre_const.SRE_FLAG_IGNORECASE:
+        # 其餘非 ASCII 字元的大小寫折疊與 str.lower() 不完全一致，保守起見不過濾
+        if any(not r.isascii() for r in runs):
+            return set()
+    result: set[str] = set()
+    for r in runs:
+        result |= _trigrams(_fold(r))
+    return result
+
+
+# ── 索引 ──
+
+class _FileEntry:
+    __slots__ = ("mtime_ns", "size", "blocks", "nbytes")
+
+    def __init__(self, mtime_ns: int, size: int, blocks: list[array] | None = None):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.blocks = blocks  # None 表示未建索引（一律視為候選）
+        self.nbytes = sum(b.itemsize * len(b) for b in blocks or ())
+
+
+class _DeadlineExceeded(Exception):
+    pass
+
+
+def _block_codes(lines: list[str]) -> array:
+    grams = {line[i:i + 3] for line in _fold("\n".join(lines)).split("\n") for i in range(len(line) - 2)}
+    return array("I", sorted({h & _HASH_MASK for h in map(hash, grams)}))
+
+
+def _build_entry(path: str, st: os.stat_result, deadline: float | None = None) -> _FileEntry:
+    if st.st_size > MAX_INDEX_BYTES:
+        return _FileEntry(st.st_mtime_ns, st.st_size)
+    blocks: list[array] = []
+    lines: list[str] = []
+    try:
+        for line in iter_lines(path):
+            lines.append(line)
+            if len(lines) == BLOCK_LINES:
+                blocks.append(_block_codes(lines))
+                lines.clear()
+                if deadline is not None and time.monotonic() > deadline:
+                    raise _DeadlineExceeded(path)
+    except BinaryFile:
+        return _FileEntry(st.st_mtime_ns, st.st_size)
+    if lines:
+        blocks.append(_block_codes(lines))
+    return _FileEntry(st.st_mtime_ns, st.st_size, blocks)
+
+
+# 所有 TrigramIndex 的 _files 與 LRU 共用同一把鎖；建索引本身在鎖外進行
+_lock = threading.Lock()
+_lru: OrderedDict[tuple["TrigramIndex", str], int] = OrderedDict()
+_lru_bytes = 0
+_freed = 0  # 每次釋放空間遞增；TrigramIndex._full_at 與之相同表示上次存不進去後還沒有空出空間
+
+
+def _forget_locked(index: "TrigramIndex", path: str) -> None:
+    global _lru_bytes, _freed
+    index._files.pop(path, None)
+    nbytes = _lru.pop((index, path), 0)
+    _lru_bytes -= nbytes
+    index._bytes -= nbytes
+    if nbytes:
+        _freed += 1
+
+
+def _store_locked(index: "TrigramIndex", path: str, entry: _FileEntry) -> bool:
+    """存入索引；超過上限時依 LRU 淘汰其他根目錄的項目，回傳是否存入。
+
+    同一個根目錄不淘汰自己的項目：一次查詢依序走過所有檔案，若互相淘汰，
+    下一次查詢會全部重建（LRU 遇到循序掃描時命中率為零）。超出上限的檔案直接不建索引。
+    """
+    global _lru_bytes
+    _forget_locked(index, path)
+    if index._bytes + entry.nbytes > INDEX_BUDGET_BYTES:
+        index._full_at = _freed
+        return False
+    excess = _lru_bytes + entry.nbytes - INDEX_BUDGET_BYTES
+    if excess > 0 and _lru_bytes > index._bytes:
+        victims = []
+        for victim in _lru:
+            if victim[0] is not index:
+                victims.append(victim)
+                excess -= _lru[victim]
+                if excess <= 0:
+                    break
+        for victim_index, victim_path in victims:
+            _forget_locked(victim_index, victim_path)
+    index._files[path] = entry
+    _lru[(index, path)] = entry.nbytes
+    _lru_bytes += entry.nbytes
+    index._bytes += entry.nbytes
+    return True
+
+
+class TrigramIndex:
+    def __init__(self, root: str):
+        self.root = root
+        self._files: dict[str, _FileEntry] = {}
+        self._bytes = 0     # 此根目錄在 _lru 中佔用的 bytes
+        self._full_at = -1  # 有檔案因上限存不進去時記下 _freed；釋放空間前不再替新檔案建索引
+
+    def _entry(
+        self, path: str, st: os.stat_result | None = None, deadline: float | None = None,
+    ) -> _FileEntry | None:
+        if st is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                self.remove(path)
+                return None
+        with _lock:
+            entry = self._files.get(path)
+            if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+                _lru.move_to_end((self, path))
+                return entry
+            if entry is not None:
+                _forget_locked(self, path)
+            if self._full_at == _freed:
+                return None  # 此根目錄已用滿上限，其餘檔案不建索引
+        if deadline is not None and time.monotonic() > deadline:
+            return None
+        try:
+            entry = _build_entry(path, st, deadline)
+        except (OSError, _DeadlineExceeded):
+            return None
+        with _lock:
+            _store_locked(self, path, entry)  # 沒存入時仍可用於本次查詢
+        return entry
+
+    def update(self, path: str) -> None:
+        self._entry(path)
+
+    def remove(self, path: str) -> None:
+        """移除單一檔案，或某資料夾底下的所有檔案。"""
+        prefix = path.rstrip(os.sep) + os.sep
+        with _lock:
+            for p in [p for p in self._files if p == path or p.startswith(prefix)]:
+                _forget_locked(self, p)
+
+    def clear(self) -> None:
+        with _lock:
+            for p in list(self._files):
+                _forget_locked(self, p)
+
+    def candidate_ranges(
+        self, path: str, trigrams: set[str], deadline: float | None = None,
+    ) -> list[tuple[int, int]] | None:
+        """回傳需要驗證的行範圍 [(start, end), ...]（0 起算、end 不含）。
+
+        None 表示整個檔案都需驗證；空 list 表示此檔必定沒有匹配。
+        deadline（time.monotonic()）已過時不再建新索引，未建索引的檔案回傳 None。
+        """
+        if not trigrams:
+            return None
+        entry = self._entry(path, deadline=deadline)
+        if entry is None or entry.blocks is None:
+            return None
+        codes = [hash(g) & _HASH_MASK for g in trigrams]
+        ranges: list[tuple[int, int]] = []
+        for i, block in enumerate(entry.blocks):
+            if all(_contains(block, c) for c in codes):
+                start = i * BLOCK_LINES
+                if ranges and ranges[-1][1] == start:
+                    ranges[-1] = (ranges[-1][0], start + BLOCK_LINES)
+                else:
+                    ranges.append((start, start + BLOCK_LINES))
+        return ranges
+
+
+# ── 全域 registry ──
+
+_indexes: dict[str, TrigramIndex] = {}
+_registry_lock = threading.Lock()
+
+
+def get_index(root: str) -> TrigramIndex:
+    root = os.path.realpath(root)
+    with _registry_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = TrigramIndex(root)
+        return index
+
+
+def _find_index(path: str) -> TrigramIndex | None:
+    with _registry_lock:
+        for root, index in _indexes.items():
+            if path.startswith(root + os.sep):
+                return index
+    return None
+
+
+def notify_changed(path: str) -> None:
+    """檔案新增或修改後呼叫；只更新已存在的索引（尚未搜尋過的目錄不主動建立）。"""
+    path = os.path.realpath(path)
+    index = _find_index(path)
+    if index is not None and os.path.isfile(path):
+        index.update(path)
+
+
+def notify_deleted(path: str) -> None:
+    path = os.path.realpath(path)
+    index = _find_index(path)
+    if index is not None:
+        index.remove(path)
+
+
+def drop_index(root: str) -> None:
+    """對話結束等時機釋放整個根目錄的索引。"""
+    with _registry_lock:
+        index = _indexes.pop(os.path.realpath(root), None)
+    if index is not None:
+        index.clear()
+
+
+def memory_usage() -> int:
+    """目前所有索引佔用的 trigram 陣列 bytes（不含 Python 物件本身的開銷）。"""
+    with _lock:
+        return _lru_bytes
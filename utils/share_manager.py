@@ -1,9 +1,14 @@
 import uuid
 
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 
-from utils.db import SessionLocal
+from utils.db import SessionLocal, async_session
 from utils.models import SharedThread
+from utils.ttl_cache import TTLCache
+
+# token → SharedThread（None 表示不存在）；分享頁面的每個附屬資源都會查一次 token
+_record_cache = TTLCache(maxsize=1024, ttl=300, negative_ttl=30)
 
 
 def get_or_create_share_token(thread_id: str, user_id: str, conversation_folder: str) -> str:
@@ -36,15 +41,20 @@ def get_or_create_share_token(thread_id: str, user_id: str, conversation_folder:
             )
             return existing.token
 
+        invalidate_share_token(token)
         return token
 
 
+def _is_valid_token(token: str) -> bool:
+    return bool(token) and len(token) == 32 and all(c in "0123456789abcdef" for c in token)
+
+
 def get_shared_thread_record(token: str) -> "SharedThread | None":
     """給 token 回傳 SharedThread ORM 物件。格式錯誤或不存在回傳 None。
 
     使用 expunge() 讓物件脫離 session，避免 DetachedInstanceError。
     """
-    if not token or len(token) != 32 or not all(c in "0123456789abcdef" for c in token):
+    if not _is_valid_token(token):
         return None
     with SessionLocal() as session:
         record = (
@@ -55,3 +65,58 @@ def get_shared_thread_record(token: str) -> "SharedThread | None":
         if record is not None:
             session.expunge(record)
         return record
+
+
+# ── async 版本 ──
+
+async def get_or_create_share_token_async(thread_id: str, user_id: str, conversation_folder: str) -> str:
+    """get_or_create_share_token 的 async 版本。"""
+    stmt = select(SharedThread.token).where(SharedThread.thread_id == thread_id)
+    async with async_session() as session:
+        existing = (await session.execute(stmt)).scalar_one_or_none()
+        if existing:
+            return existing
+
+        token = uuid.uuid4().hex
+        session.add(SharedThread(
+            token=token,
+            thread_id=thread_id,
+            user_id=user_id,
+            conversation_folder=conversation_folder,
+        ))
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            return (await session.execute(stmt)).scalar_one()
+
+        _record_cache.pop(token)
+        return token
+
+
+async def get_share_token_async(thread_id: str) -> str | None:
+    """回傳 thread 既有的分享 token，尚未分享時回傳 None（不建立）。"""
+    stmt = select(SharedThread.token).where(SharedThread.thread_id == thread_id)
+    async with async_session() as session:
+        return (await session.execute(stmt)).scalar_one_or_none()
+
+
+async def get_shared_thread_record_async(token: str) -> "SharedThread | None":
+    """get_shared_thread_record 的 async 版本（經 token 快取，含 negative cache）。"""
+    if not _is_valid_token(token):
+        return None
+
+    async def _load():
+        async with async_session() as session:
+            return await session.get(SharedThread, token)
+
+    return await _record_cache.get_or_load(token, _load)
+
+
+def invalidate_share_token(token: str) -> None:
+    """取消分享等情況下呼叫，讓下次查詢重新讀取 DB。"""
+    _record_cache.pop(token)
+
+
+def get_token_cache_stats() -> dict:
+    return _record_cache.stats()
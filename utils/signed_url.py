@@ -1,7 +1,10 @@
+import hashlib
 import os
 import pathlib
 import re
+import threading
 import urllib.parse
+from collections import OrderedDict
 
 _PROJECT_ROOT = pathlib.Path(__file__).parent.parent
 
@@ -160,58 +163,70 @@ class StreamingPathRewriter:
 
 # ── HTML 圖片路徑工具 ────────────────────────────────────────────────────────
 
+# 原本三次 re.sub（屬性 / CSS url() / JS 字串）合併為一次掃描、兩個分支：
+#   1. CSS url(uploads/...) / url('uploads/...')：整段改寫（含未加引號的形式）
+#   2. 引號後緊接 uploads/ / artifacts/：src="..."、href='...'、data-src、JS 字串、其他屬性
+# 兩者皆支援 ../ 前綴（HTML 放在 artifacts/ 子目錄時的合法相對路徑），改寫時去掉。
+# url( 分支需放在前面：同一位置兩者都可能匹配時，以 url() 的完整改寫為準。
+_HTML_PATH_TOKEN = re.compile(
+    r'url\((["\']?)((?:\.\./)?(?:uploads|artifacts)/[^"\')\s]+)\1\)'
+    r'|(["\'\`])((?:\.\./)?(?:uploads|artifacts)/)',
+    re.IGNORECASE,
+)
+
+_REWRITE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_rewrite_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_rewrite_cache_bytes = 0
+_rewrite_cache_lock = threading.Lock()
+
+
+def _rewrite_html_paths(html: str, base: str) -> str:
+    """把 HTML 內 uploads/ / artifacts/ 相對路徑改寫為 {base}/uploads/...（單次掃描）。"""
+    def _replace(m: re.Match) -> str:
+        if m.group(2) is not None:
+            quote, path = m.group(1), m.group(2)
+            normalized = path[3:] if path.startswith("../") else path
+            # url() 路徑內仍可能出現 `uploads/（反引號不在排除字元內），與原本第三次 re.sub 的結果一致
+            if "`" in normalized:
+                normalized = _HTML_PATH_TOKEN.sub(_replace, normalized)
+            return f"url({quote}{base}/{normalized}{quote})"
+        quote, prefix = m.group(3), m.group(4)
+        normalized = prefix[3:] if prefix.startswith("../") else prefix
+        return f"{quote}{base}/{normalized}"
+
+    return _HTML_PATH_TOKEN.sub(_replace, html)
+
 
 def rewrite_html_img_paths(html: str, user_id: str, conv_id: str) -> str:
     """預覽用：將 HTML 中 uploads/ / artifacts/ 相對路徑替換為 /api/user-files/ URL。
 
-    處理 src / href / data-src 屬性及 CSS url() 語法。
+    處理 src / href / data-src 屬性、CSS url() 語法及 JS 字串中的路徑。
     支援 ../uploads/ 前綴（HTML 放在 artifacts/ 子目錄時的合法相對路徑）。
     已是絕對路徑、http(s)://、data:、# 的路徑不處理。
+
+    結果以 (內容雜湊, user, conversation) 快取：artifact_history 中未變動的版本每次 render 不再重算。
     """
+    global _rewrite_cache_bytes
     safe_uid = "".join(c if c.isalnum() or c in "-_" else "_" for c in user_id)
-    base = f"/api/user-files/user_profiles/{safe_uid}/conversations/{conv_id}"
-
-    def _normalize(path: str) -> str:
-        """將 ../uploads/foo 正規化為 uploads/foo。"""
-        return path.lstrip("./").lstrip("/") if path.startswith("../") else path
-
-    def _replace_attr(m: re.Match) -> str:
-        attr, quote, path = m.group(1), m.group(2), m.group(3)
-        if path.startswith(("/", "http://", "https://", "data:", "#")):
-            return m.group(0)
-        return f'{attr}={quote}{base}/{_normalize(path)}{quote}'
-
-    def _replace_url(m: re.Match) -> str:
-        quote, path = m.group(1), m.group(2)
-        if path.startswith(("/", "http://", "https://", "data:", "#")):
-            return m.group(0)
-        return f'url({quote}{base}/{_normalize(path)}{quote})'
-
-    html = re.sub(
-        r'(src|href|data-src)=(["\'])((?:\.\.\/)?(?:uploads|artifacts)/[^"\'> \t\n]+)\2',
-        _replace_attr,
-        html,
-        flags=re.IGNORECASE,
-    )
-    html = re.sub(
-        r'url\((["\']?)((?:\.\.\/)?(?:uploads|artifacts)/[^"\')\s]+)\1\)',
-        _replace_url,
-        html,
-        flags=re.IGNORECASE,
-    )
-
-    def _replace_js_path(m: re.Match) -> str:
-        quote, path = m.group(1), m.group(2)
-        normalized = path[3:] if path.startswith("../") else path
-        return f'{quote}{base}/{normalized}'
-
-    html = re.sub(
-        r'(["\'\`])((?:\.\.\/)?(?:uploads|artifacts)/)',
-        _replace_js_path,
-        html,
-        flags=re.IGNORECASE,
-    )
-    return html
+    key = (hashlib.blake2b(html.encode("utf-8", "surrogatepass"), digest_size=16).digest(), safe_uid, conv_id)
+    with _rewrite_cache_lock:
+        cached = _rewrite_cache.get(key)
+        if cached is not None:
+            _rewrite_cache.move_to_end(key)
+            return cached
+
+    result = _rewrite_html_paths(html, f"/api/user-files/user_profiles/{safe_uid}/conversations/{conv_id}")
+
+    size = len(result)
+    if size <= _REWRITE_CACHE_MAX_BYTES // 4:
+        with _rewrite_cache_lock:
+            if key not in _rewrite_cache:
+                _rewrite_cache[key] = result
+                _rewrite_cache_bytes += size
+                while _rewrite_cache_bytes > _REWRITE_CACHE_MAX_BYTES:
+                    _, evicted = _rewrite_cache.popitem(last=False)
+                    _rewrite_cache_bytes -= len(evicted)
+    return result
 
 
 def rewrite_html_paths_for_publish(
@@ -225,42 +240,4 @@ def rewrite_html_paths_for_publish(
     支援 ../uploads/ 前綴（HTML 放在 artifacts/ 子目錄時的合法相對路徑）。
     已是絕對路徑、http(s)://、data:、# 的路徑不處理。
     """
-    def _replace_attr(m: re.Match) -> str:
-        attr, quote, path = m.group(1), m.group(2), m.group(3)
-        if path.startswith(("/", "http://", "https://", "data:", "#")):
-            return m.group(0)
-        normalized = path[3:] if path.startswith("../") else path
-        return f'{attr}={quote}{base_url}/p/{public_token}/files/{normalized}{quote}'
-
-    def _replace_url(m: re.Match) -> str:
-        quote, path = m.group(1), m.group(2)
-        if path.startswith(("/", "http://", "https://", "data:", "#")):
-            return m.group(0)
-        normalized = path[3:] if path.startswith("../") else path
-        return f'url({quote}{base_url}/p/{public_token}/files/{normalized}{quote})'
-
-    html = re.sub(
-        r'(src|href|data-src)=(["\'])((?:\.\.\/)?(?:uploads|artifacts)/[^"\'> \t\n]+)\2',
-        _replace_attr,
-        html,
-        flags=re.IGNORECASE,
-    )
-    html = re.sub(
-        r'url\((["\']?)((?:\.\.\/)?(?:uploads|artifacts)/[^"\')\s]+)\1\)',
-        _replace_url,
-        html,
-        flags=re.IGNORECASE,
-    )
-
-    def _replace_js_path_pub(m: re.Match) -> str:
-        quote, path = m.group(1), m.group(2)
-        normalized = path[3:] if path.startswith("../") else path
-        return f'{quote}{base_url}/p/{public_token}/files/{normalized}'
-
-    html = re.sub(
-        r'(["\'\`])((?:\.\.\/)?(?:uploads|artifacts)/)',
-        _replace_js_path_pub,
-        html,
-        flags=re.IGNORECASE,
-    )
-    return html
+    return _rewrite_html_paths(html, f"{base_url}/p/{public_token}/files")
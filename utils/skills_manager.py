@@ -6,7 +6,11 @@
   1. discover_skills(user_id)         — 掃描使用者 skills/ 資料夾
   2. build_skill_catalog_json(skills)  — 產生注入 system prompt 的 JSON 目錄
   3. skills_to_json / skills_from_json — 跨模組序列化（供 buildin.py session registry 使用）
-  4. get_skill_content(name, skills)   — 讀取 SKILL.md body（activate_skill 呼叫時使用）
+  4. get_skill_content(name, skills)   — 讀取 SKILL.md body
+  5. get_skill_activation(skill)       — activate_skill 用的 body + 資源清單（依內容版本快取）
+
+掃描結果以 SKILL.md 的 (mtime_ns, size) 為版本快取於行程內；技能寫入 / 刪除時
+呼叫 refresh_skill / invalidate_skill 即時更新單一技能。
 
 SKILL.md 格式參考 agentskills/ 中的 Agent Skills Spec：
   - 檔案開頭為 YAML frontmatter（--- 包圍），必須含 name 與 description
@@ -14,6 +18,7 @@ SKILL.md 格式參考 agentskills/ 中的 Agent Skills Spec：
 """
 import json
 import os
+import threading
 import warnings
 from dataclasses import dataclass, asdict
 from pathlib import Path
@@ -78,6 +83,60 @@ class SkillInfo:
 
 # ── 技能掃描與發現 ──
 
+# 行程共用的技能目錄快取：SKILL.md 路徑 → (mtime_ns, size, 解析結果)
+# 解析結果為 None 表示該版本解析失敗（已發過 warning，檔案未變動前不再重試）。
+# 每次掃描只需 listdir + stat，(mtime_ns, size) 不變的技能直接沿用快取，不再跑 yaml.safe_load。
+_catalog_cache: dict[str, tuple[int, int, Optional[SkillInfo]]] = {}
+_catalog_lock = threading.Lock()
+
+
+def _parse_skill(skill_dir: str, skill_md: Path, source: str) -> Optional[SkillInfo]:
+    try:
+        content = skill_md.read_text(encoding="utf-8")
+        metadata, _ = _parse_frontmatter(content)
+        name = metadata.get("name", "").strip()
+        description = metadata.get("description", "").strip()
+        if not name or not description:
+            warnings.warn(f"Skill at {skill_dir} missing name or description, skipping.")
+            return None
+        return SkillInfo(
+            name=name,
+            description=description,
+            location=skill_dir,
+            skill_dir=skill_dir,
+            source=source,
+        )
+    except Exception as e:
+        warnings.warn(f"Failed to parse skill at {skill_dir}: {e}")
+        return None
+
+
+def _load_skill(skill_dir: str, source: str, real_dir: Optional[str] = None) -> Optional[SkillInfo]:
+    """取得單一技能資訊；SKILL.md 的 (mtime_ns, size) 未變時直接回傳快取。
+
+    快取 key 使用 realpath（real_dir），回傳的 SkillInfo 則保留呼叫端給的 skill_dir。
+    """
+    skill_md = _find_skill_md(Path(skill_dir))
+    if skill_md is None:
+        return None
+    key = os.path.join(real_dir or os.path.realpath(skill_dir), skill_md.name)
+    try:
+        st = skill_md.stat()
+    except OSError:
+        return None
+    with _catalog_lock:
+        cached = _catalog_cache.get(key)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        info = cached[2]
+        # source 由呼叫端決定（同一目錄理論上不會兩種來源，保險起見仍比對）
+        if info is None or info.source == source:
+            return info
+    info = _parse_skill(skill_dir, skill_md, source)
+    with _catalog_lock:
+        _catalog_cache[key] = (st.st_mtime_ns, st.st_size, info)
+    return info
+
+
 def _scan_skills_dir(skills_dir: str, source: str = "user") -> list[SkillInfo]:
     """掃描指定目錄下的所有技能子資料夾。
 
@@ -87,35 +146,38 @@ def _scan_skills_dir(skills_dir: str, source: str = "user") -> list[SkillInfo]:
     if not os.path.isdir(skills_dir):
         return results
 
+    real_root = os.path.realpath(skills_dir)
     for entry in os.listdir(skills_dir):
         skill_dir = os.path.join(skills_dir, entry)
         if not os.path.isdir(skill_dir):
             continue
+        info = _load_skill(skill_dir, source, os.path.join(real_root, entry))
+        if info is not None:
+            results.append(info)
 
-        # 找 SKILL.md（大小寫皆可）
-        skill_md = _find_skill_md(Path(skill_dir))
-        if skill_md is None:
-            continue
+    return results
 
-        try:
-            content = skill_md.read_text(encoding="utf-8")
-            metadata, _ = _parse_frontmatter(content)
-            name = metadata.get("name", "").strip()
-            description = metadata.get("description", "").strip()
-            if not name or not description:
-                warnings.warn(f"Skill at {skill_dir} missing name or description, skipping.")
-                continue
-            results.append(SkillInfo(
-                name=name,
-                description=description,
-                location=skill_dir,
-                skill_dir=skill_dir,
-                source=source,
-            ))
-        except Exception as e:
-            warnings.warn(f"Failed to parse skill at {skill_dir}: {e}")
 
-    return results
+def invalidate_skill(skill_dir: str) -> None:
+    """技能寫入或刪除後呼叫，丟棄該技能目錄的快取（下次掃描時重新解析）。
+
+    一般情況下 (mtime_ns, size) 驗證即可察覺變動；此函式處理同一時間戳內改寫、
+    或整個技能目錄被刪除後釋放快取等情況。
+    """
+    real_dir = os.path.realpath(skill_dir)
+    prefix = os.path.join(real_dir, "")
+    with _catalog_lock:
+        for key in [k for k in _catalog_cache if k.startswith(prefix)]:
+            del _catalog_cache[key]
+        _activation_cache.pop(real_dir, None)
+
+
+def refresh_skill(skill_dir: str, source: str = "user") -> Optional[SkillInfo]:
+    """強制重新解析單一技能並更新快取；技能已不存在時只清除快取。"""
+    invalidate_skill(skill_dir)
+    if not os.path.isdir(skill_dir):
+        return None
+    return _load_skill(skill_dir, source)
 
 
 SYSTEM_SKILLS_DIR = os.path.join(PROJECT_ROOT, "system_skills")
@@ -174,11 +236,97 @@ def get_skill_content(skill_name: str, skills: list[SkillInfo]) -> Optional[str]
     return body
 
 
+# ── 技能啟用內容快取（activate_skill 使用，跨 session 共用）──
+
+RESOURCE_SUBDIRS = ("scripts", "references", "assets")
+RESOURCES_MAX = 50
+
+
+@dataclass(frozen=True)
+class SkillActivation:
+    """activate_skill 需要的技能內容：SKILL.md body 與資源檔清單。"""
+    body: str
+    resources: tuple[str, ...]  # 相對於 PROJECT_ROOT 的路徑（/ 分隔）
+    truncated: bool             # 資源檔超過 RESOURCES_MAX 時為 True
+
+
+# realpath(skill_dir) → (版本, SkillActivation)
+_activation_cache: dict[str, tuple[tuple, SkillActivation]] = {}
+
+
+def _skill_version(skill_dir: str) -> Optional[tuple]:
+    """以 SKILL.md 的 (mtime_ns, size) 與技能目錄、資源子目錄的 mtime 作為內容版本。
+
+    資源子目錄更深層的新增 / 刪除不會反映在 mtime 上，由 invalidate_skill 處理。
+    """
+    skill_md = _find_skill_md(Path(skill_dir))
+    if skill_md is None:
+        return None
+    try:
+        st = skill_md.stat()
+    except OSError:
+        return None
+    version = [skill_md.name, st.st_mtime_ns, st.st_size]
+    for sub in ("",) + RESOURCE_SUBDIRS:
+        try:
+            version.append(os.stat(os.path.join(skill_dir, sub)).st_mtime_ns)
+        except OSError:
+            version.append(-1)
+    return tuple(version)
+
+
+def _list_resources(skill_dir: str) -> tuple[tuple[str, ...], bool]:
+    resources = []
+    for subdir in RESOURCE_SUBDIRS:
+        subdir_path = os.path.join(skill_dir, subdir)
+        if not os.path.isdir(subdir_path):
+            continue
+        for dirpath, _dirnames, filenames in os.walk(subdir_path):
+            for fname in filenames:
+                if len(resources) >= RESOURCES_MAX:
+                    return tuple(resources), True
+                abs_file = os.path.join(dirpath, fname)
+                resources.append(os.path.relpath(abs_file, PROJECT_ROOT).replace("\\", "/"))
+    return tuple(resources), False
+
+
+def get_skill_activation(skill: SkillInfo) -> Optional[SkillActivation]:
+    """取得技能的啟用內容；內容版本未變時直接回傳快取，不重新讀檔與走訪資源目錄。
+
+    Returns:
+        SkillActivation，SKILL.md 不存在時回傳 None。
+
+    Raises:
+        ValueError: SKILL.md frontmatter 格式不正確。
+    """
+    real_dir = os.path.realpath(skill.skill_dir)
+    version = _skill_version(real_dir)
+    if version is None:
+        return None
+    with _catalog_lock:
+        cached = _activation_cache.get(real_dir)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    skill_md = _find_skill_md(Path(real_dir))
+    _, body = _parse_frontmatter(skill_md.read_text(encoding="utf-8"))
+    resources, truncated = _list_resources(skill.skill_dir)
+    activation = SkillActivation(body=body, resources=resources, truncated=truncated)
+    with _catalog_lock:
+        _activation_cache[real_dir] = (version, activation)
+    return activation
+
+
 def skills_to_json(skills: list[SkillInfo]) -> str:
     """將 SkillInfo 清單序列化為 JSON，供跨模組傳遞（如 buildin.py session registry）。"""
     return json.dumps([asdict(s) for s in skills], ensure_ascii=False)
 
 
+def skills_index(skills: list[SkillInfo]) -> dict[str, SkillInfo]:
+    """依 name 建立查詢表（同名時後出現者覆蓋，即用戶技能優先於系統技能，與 get_skill_content 一致）。"""
+    return {s.name: s for s in skills}
+
+
 def skills_from_json(json_str: str) -> list[SkillInfo]:
     """從 JSON 字串反序列化為 SkillInfo 清單。相容舊版無 source 欄位的格式。"""
     data = json.loads(json_str)
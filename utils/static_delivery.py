@@ -0,0 +1,180 @@
+"""公開頁面的靜態檔案傳送（預先壓縮 + ETag + Range）。
+
+routers/published.py 原本以單純的 FileResponse 傳送 /p/{token} 與附屬資源：沒有壓縮，
+也不處理 If-None-Match，大型自包含 HTML 報告每位訪客都要完整下載一次。
+
+- precompress()：發布時在原檔旁產生 .gz（以及安裝 brotli 時的 .br），之後直接傳送壓縮檔
+- 依 Accept-Encoding 選擇 br → gzip → 原檔，回應帶 Vary: Accept-Encoding
+- ETag 由內容 SHA-256 產生（強驗證器，每種編碼各自不同）；If-None-Match 相符回 304
+- 帶 Range 的請求一律傳送原檔，由 Starlette FileResponse 處理 206 / If-Range
+- 壓縮檔的 mtime 早於原檔（例如原檔被覆寫但尚未重新壓縮）時視為過期，不使用
+"""
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import os
+import uuid
+from pathlib import Path
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+from utils.ttl_cache import TTLCache
+
+try:
+    import brotli  # 選用：未安裝時只產生 gzip
+except ImportError:
+    brotli = None
+
+HASH_MAX_BYTES = 64 * 1024 * 1024   # 超過此大小改以 (mtime, size) 作為 ETag，避免首次請求讀完大型影片
+_MIN_COMPRESS_BYTES = 1024
+_HASH_CHUNK = 1024 * 1024
+
+# (path, mtime_ns, size) → SHA-256 hex
+_digest_cache = TTLCache(maxsize=4096, ttl=24 * 3600)
+
+
+def _encoders() -> list[tuple[str, str]]:
+    """(content-encoding, 副檔名)，依偏好順序。"""
+    encs = [("gzip", ".gz")]
+    if brotli is not None:
+        encs.insert(0, ("br", ".br"))
+    return encs
+
+
+def _atomic_write(dst: Path, data: bytes) -> None:
+    # 暫存檔名每次呼叫各自唯一，同一檔案被並行壓縮時不會互相覆寫或 rename 掉對方的暫存檔
+    tmp = dst.with_name(f".{dst.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, dst)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _digest(path: str, st: os.stat_result) -> str:
+    key = (path, st.st_mtime_ns, st.st_size)
+    digest = _digest_cache.get(key, None)
+    if digest is None:
+        digest = _hash_file(path)
+        _digest_cache.set(key, digest)
+    return digest
+
+
+def precompress(path: str | Path, data: bytes | None = None) -> None:
+    """為 path 產生 .gz / .br 壓縮檔（同步，請在 thread 內呼叫）。data 為原檔內容，省略時自行讀取。"""
+    path = Path(path)
+    if data is None:
+        data = path.read_bytes()
+    st = path.stat()
+    _digest_cache.set((str(path), st.st_mtime_ns, st.st_size), hashlib.sha256(data).hexdigest())
+    for enc, suffix in _encoders():
+        variant = path.with_name(path.name + suffix)
+        if len(data) < _MIN_COMPRESS_BYTES:
+            variant.unlink(missing_ok=True)
+            continue
+        if enc == "br":
+            compressed = brotli.compress(data, quality=11)
+        else:
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) >= len(data):
+            variant.unlink(missing_ok=True)
+            continue
+        _atomic_write(variant, compressed)
+
+
+def remove_variants(path: str | Path) -> None:
+    path = Path(path)
+    for _enc, suffix in (("br", ".br"), ("gzip", ".gz")):
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    accepted = set()
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for p in params.split(";"):
+            name, _, value = p.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(token)
+    return accepted
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match 使用弱比較：忽略 W/ 前綴
+    candidates = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return etag in candidates
+
+
+def _select(path: str, request: Request, compressible: bool) -> tuple[str, os.stat_result, str | None]:
+    """同步部分：回傳 (實際傳送檔案, 原檔 stat, content-encoding)。"""
+    st = os.stat(path)
+    if compressible and "range" not in request.headers:
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        for enc, suffix in _encoders():
+            if enc not in accepted:
+                continue
+            try:
+                vst = os.stat(path + suffix)
+            except OSError:
+                continue
+            if vst.st_mtime_ns >= st.st_mtime_ns:
+                return path + suffix, st, enc
+    return path, st, None
+
+
+async def file_response(
+    request: Request,
+    path: str | Path,
+    media_type: str | None = None,
+    cache_control: str = "public, max-age=86400",
+    compressible: bool = False,
+) -> Response:
+    """傳送檔案並處理壓縮協商、ETag / 304 與 Range。
+
+    compressible=True 時會嘗試使用 precompress() 產生的壓縮檔。
+    """
+    path = str(path)
+    send_path, st, encoding = await asyncio.to_thread(_select, path, request, compressible)
+    if st.st_size <= HASH_MAX_BYTES:
+        tag = _digest_cache.get((path, st.st_mtime_ns, st.st_size), None)
+        if tag is None:
+            tag = await asyncio.to_thread(_digest, path, st)
+    else:
+        tag = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+    etag = f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+    headers = {"Cache-Control": cache_control, "ETag": etag}
+    if compressible:
+        headers["Vary"] = "Accept-Encoding"
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        # 傳送的是 .gz / .br，Content-Type 仍須為原檔類型
+        media_type = media_type or mimetypes.guess_type(path)[0]
+    return FileResponse(send_path, media_type=media_type, headers=headers)
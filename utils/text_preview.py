@@ -0,0 +1,72 @@
+"""新產生 / 修改的文字檔預覽（只讀開頭、以內容判斷文字或二進位、依檔案版本快取）。
+
+check_and_process_new_files 原本對每個新增或修改的文字檔整份讀入（最多 500 KB），
+側邊欄顯示全文、對話紀錄只保留前 5000 字；檔案被反覆修改或工具每次呼叫都重新掃描時，同樣的內容一再讀取。
+
+- 只讀取開頭 PREVIEW_MAX_BYTES 位元組，超過的部分標記為截斷（完整內容走檔案下載 / 預覽 chip）
+- 以開頭內容判斷文字或二進位：含 NUL 或無法以 UTF-8 解碼（截斷在多位元組字元中間除外）視為二進位；
+  副檔名無法判斷的檔案（README、LICENSE…）也能依內容預覽
+- 以 (路徑, mtime_ns, size) 快取預覽結果，檔案未變時不再讀取
+"""
+import asyncio
+import os
+from dataclasses import dataclass
+
+from utils.ttl_cache import TTLCache
+
+PREVIEW_MAX_BYTES = 100 * 1024
+SNIFF_BYTES = 8 * 1024
+
+_cache = TTLCache(maxsize=256, ttl=600)
+
+
+@dataclass(frozen=True)
+class TextPreview:
+    is_text: bool
+    text: str = ""
+    truncated: bool = False
+
+
+def _looks_like_text(data: bytes, at_eof: bool) -> bool:
+    if b"\x00" in data[:SNIFF_BYTES]:
+        return False
+    head = data[:SNIFF_BYTES]
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # 只容許結尾被切斷的多位元組字元
+        return e.start >= len(head) - 3 and not (at_eof and len(head) == len(data))
+    return True
+
+
+def _read_preview(path: str, size: int) -> TextPreview:
+    with open(path, "rb") as f:
+        data = f.read(PREVIEW_MAX_BYTES)
+    truncated = size > len(data)
+    if not _looks_like_text(data, at_eof=not truncated):
+        return TextPreview(is_text=False)
+    text = data.decode("utf-8", errors="replace")
+    if truncated:
+        text = text.rstrip("�")  # 截斷處的半個字元
+    return TextPreview(is_text=True, text=text, truncated=truncated)
+
+
+async def get_text_preview(path: str) -> TextPreview | None:
+    """回傳檔案開頭的文字預覽；檔案不存在回傳 None，二進位檔回傳 is_text=False。"""
+    try:
+        st = await asyncio.to_thread(os.stat, path)
+    except OSError:
+        return None
+    key = (path, st.st_mtime_ns, st.st_size)
+    preview = _cache.get(key, None)
+    if preview is None:
+        try:
+            preview = await asyncio.to_thread(_read_preview, path, st.st_size)
+        except OSError:
+            return None
+        _cache.set(key, preview)
+    return preview
+
+
+def get_cache_stats() -> dict:
+    return _cache.stats()
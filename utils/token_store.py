@@ -0,0 +1,211 @@
+"""OAuth 令牌 / 授權碼的到期儲存。
+
+routers/oauth.py 原本以普通 dict 保存令牌，過期項目只有在被查詢時才刪除，
+服務大量 client 的長時間執行個體會無限成長；依使用者撤銷也只能整份掃描。
+
+- 到期時間放在 min-heap：sweep() 只彈出已到期的項目，每筆 O(log n)，put() 時順便執行
+- 以 user_id / client_id 建立次要索引，revoke_user / revoke_client 只處理該使用者 / client 的令牌
+- 被覆寫或撤銷的項目在 heap 中留下的舊紀錄於彈出時略過（比對到期時間），過多時重建 heap
+- 指定 db_path 時以 SQLite 為準（write-through）：每次 get() 都讀取該筆資料列，
+  其他 worker 撤銷或輪替的令牌立即失效；重新啟動後不必整份載入，記憶體只保存用過項目的索引
+"""
+import heapq
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any
+
+_DB_SWEEP_INTERVAL = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    key        TEXT PRIMARY KEY,
+    user_id    TEXT,
+    client_id  TEXT,
+    deadline   REAL NOT NULL,
+    info       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {table}_user ON {table} (user_id);
+CREATE INDEX IF NOT EXISTS {table}_client ON {table} (client_id);
+CREATE INDEX IF NOT EXISTS {table}_deadline ON {table} (deadline);
+"""
+
+
+def _encode(info: dict) -> str:
+    def _default(o: Any):
+        if isinstance(o, datetime):
+            return {"__dt__": o.isoformat()}
+        raise TypeError(type(o).__name__)
+    return json.dumps(info, ensure_ascii=False, default=_default)
+
+
+def _decode(text: str) -> dict:
+    def _hook(d: dict):
+        return datetime.fromisoformat(d["__dt__"]) if set(d) == {"__dt__"} else d
+    return json.loads(text, object_hook=_hook)
+
+
+class ExpiringTokenStore:
+    """key → info dict，每筆有到期時間（epoch 秒）；info 需含 user_id / client_id 供索引。"""
+
+    def __init__(self, name: str, db_path: str | None = None):
+        self.name = name
+        self._data: dict[str, tuple[float, dict]] = {}   # key → (deadline, info)
+        self._heap: list[tuple[float, str]] = []
+        self._by_user: dict[str, set[str]] = {}
+        self._by_client: dict[str, set[str]] = {}
+        self._lock = threading.RLock()
+        self._db: sqlite3.Connection | None = None
+        self._db_swept_at = 0.0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA.format(table=name))
+
+    # ── 記憶體索引 ──
+
+    def _index(self, key: str, deadline: float, info: dict) -> None:
+        self._data[key] = (deadline, info)
+        heapq.heappush(self._heap, (deadline, key))
+        if info.get("user_id"):
+            self._by_user.setdefault(info["user_id"], set()).add(key)
+        if info.get("client_id"):
+            self._by_client.setdefault(info["client_id"], set()).add(key)
+
+    def _unindex(self, key: str) -> dict | None:
+        item = self._data.pop(key, None)
+        if item is None:
+            return None
+        info = item[1]
+        for index, field in ((self._by_user, "user_id"), (self._by_client, "client_id")):
+            keys = index.get(info.get(field))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[info.get(field)]
+        if len(self._heap) > 2 * len(self._data) + 1024:
+            # 撤銷 / 覆寫留下的舊紀錄過多時重建
+            self._heap = [(d, k) for k, (d, _) in self._data.items()]
+            heapq.heapify(self._heap)
+        return info
+
+    # ── 讀寫 ──
+
+    def put(self, key: str, info: dict, deadline: float) -> None:
+        with self._lock:
+            self.sweep()
+            self._unindex(key)
+            self._index(key, deadline, info)
+            if self._db is not None:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {self.name} (key, user_id, client_id, deadline, info) VALUES (?, ?, ?, ?, ?)",
+                    (key, info.get("user_id"), info.get("client_id"), deadline, _encode(info)),
+                )
+
+    def get(self, key: str) -> dict | None:
+        """回傳未過期的 info；過期時移除並回傳 None。"""
+        now = time.time()
+        with self._lock:
+            if self._db is not None:
+                # 多個 worker 共用同一個資料庫：以資料列為準，不信任本行程的記憶體內容
+                row = self._db.execute(
+                    f"SELECT deadline, info FROM {self.name} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self._unindex(key)
+                    return None
+                item = (row[0], _decode(row[1]))
+                cached = self._data.get(key)
+                if cached is None or cached[0] != item[0]:
+                    self._unindex(key)
+                    self._index(key, *item)
+                else:
+                    self._data[key] = item
+            else:
+                item = self._data.get(key)
+            if item is None:
+                return None
+            if item[0] <= now:
+                self.pop(key)
+                return None
+            return item[1]
+
+    def pop(self, key: str) -> dict | None:
+        with self._lock:
+            info = self._unindex(key)
+            if self._db is not None:
+                if info is None:
+                    row = self._db.execute(f"SELECT info FROM {self.name} WHERE key = ?", (key,)).fetchone()
+                    info = _decode(row[0]) if row else None
+                self._db.execute(f"DELETE FROM {self.name} WHERE key = ?", (key,))
+            return info
+
+    def save(self, key: str) -> None:
+        """info 被原地修改後呼叫，將變更寫回 SQLite。"""
+        if self._db is None:
+            return
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                self._db.execute(f"UPDATE {self.name} SET info = ? WHERE key = ?", (_encode(item[1]), key))
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        if self._db is not None:
+            with self._lock:
+                return self._db.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()[0]
+        return len(self._data)
+
+    # ── 到期與撤銷 ──
+
+    def sweep(self, now: float | None = None) -> int:
+        """移除所有已到期的項目，回傳移除數（記憶體部分）。"""
+        now = time.time() if now is None else now
+        removed = 0
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, key = heapq.heappop(self._heap)
+                item = self._data.get(key)
+                if item is not None and item[0] == deadline:
+                    self._unindex(key)
+                    removed += 1
+            # SQLite 中可能有重新啟動後未載入記憶體的過期項目，定期一併清除
+            if self._db is not None and (removed or now - self._db_swept_at > _DB_SWEEP_INTERVAL):
+                self._db.execute(f"DELETE FROM {self.name} WHERE deadline <= ?", (now,))
+                self._db_swept_at = now
+        return removed
+
+    def _revoke(self, index: dict[str, set[str]], column: str, value: str) -> int:
+        count = 0
+        with self._lock:
+            for key in list(index.get(value, ())):
+                if self._unindex(key) is not None:
+                    count += 1
+            if self._db is not None:
+                count = max(count, self._db.execute(
+                    f"DELETE FROM {self.name} WHERE {column} = ?", (value,)
+                ).rowcount)
+        return count
+
+    def revoke_user(self, user_id: str) -> int:
+        """撤銷某使用者的全部項目，回傳撤銷數。"""
+        return self._revoke(self._by_user, "user_id", user_id)
+
+    def revoke_client(self, client_id: str) -> int:
+        """撤銷某 client 的全部項目，回傳撤銷數。"""
+        return self._revoke(self._by_client, "client_id", client_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "heap": len(self._heap),
+                "users": len(self._by_user),
+                "clients": len(self._by_client),
+                "persistent": self._db is not None,
+            }
@@ -0,0 +1,95 @@
+"""行程內的 TTL + LRU 快取（執行緒安全）。
+
+用於短時間內重複查詢、結果幾乎不變的資料（例如公開頁面 token → DB 記錄）：
+- 超過 maxsize 時淘汰最久未使用的項目
+- 值為 None 表示「查無資料」，以較短的 negative_ttl 快取，避免不存在的 key 反覆打 DB
+- get_or_load()：同一 key 同時多個 miss 只會執行一次 loader（single-flight）
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self._generation = 0  # pop / clear 時遞增，避免失效前開始的 loader 把舊值寫回
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Hashable, default: Any = _MISSING) -> Any:
+        """回傳快取值；不存在或已過期時回傳 default（未指定時回傳 _MISSING）。"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires, value = item
+                if expires > now:
+                    self._data.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._data[key]
+            self._misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        ttl = self.negative_ttl if value is None else self.ttl
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            self._generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """快取命中直接回傳；否則執行 loader 並快取結果（含 None）。loader 拋錯時不快取。"""
+        value = self.get(key)
+        if value is not _MISSING:
+            return value
+        fut = self._inflight.get(key)
+        if fut is not None:
+            return await asyncio.shield(fut)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        generation = self._generation
+        try:
+            value = await loader()
+        except BaseException as e:
+            fut.set_exception(e if isinstance(e, Exception) else RuntimeError("loader cancelled"))
+            fut.exception()  # 沒有其他等待者時避免 "exception was never retrieved"
+            raise
+        else:
+            if generation == self._generation:
+                self.set(key, value)
+            fut.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
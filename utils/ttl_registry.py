@@ -0,0 +1,204 @@
+"""行程內暫存狀態的登記表（每個項目有期限，逾期由背景清除）。
+
+agent_tools 與 routers 以 module-level dict 保存等待中的互動狀態（表單、render 暫存、PPTX 上傳事件、
+模板登記…），原本只在正常流程結束時移除；表單被放棄、前端上傳中止、session 異常結束時項目永遠留在記憶體。
+
+- TTLRegistry 提供與 dict 相同的 get / pop / [] / in 介面，既有呼叫端不必修改
+- 每個項目寫入時設定期限（預設 ttl，可個別指定或以 touch 延長）；sliding=True 時每次讀取都會延長
+- 超過 maxsize 時淘汰最早寫入的項目
+- 項目逾期或被淘汰時呼叫 on_expire(key, value)，讓仍在等待的一方（asyncio.Event）得以醒來
+- 讀取時遇到逾期項目會立即移除；start_sweeper() 在背景定期掃描所有登記表，清除沒人再讀取的項目
+- stats() 回傳項目數、累計逾期 / 淘汰數與估計的記憶體用量
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+SWEEP_INTERVAL = 30.0
+_MISSING = object()
+
+
+def _approx_size(obj: Any, depth: int = 3) -> int:
+    """粗估物件佔用的位元組數（只展開 dict / list / tuple / set 數層）。"""
+    size = sys.getsizeof(obj)
+    if depth <= 0:
+        return size
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += _approx_size(k, depth - 1) + _approx_size(v, depth - 1)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for v in obj:
+            size += _approx_size(v, depth - 1)
+    return size
+
+
+class TTLRegistry:
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        maxsize: int,
+        on_expire: Callable[[Hashable, Any], None] | None = None,
+        sliding: bool = False,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.on_expire = on_expire
+        self.sliding = sliding
+        self._data: OrderedDict[Hashable, list] = OrderedDict()  # key → [deadline, value]
+        self._lock = threading.Lock()
+        self._expired = 0
+        self._evicted = 0
+        _registries.append(self)
+
+    # ── dict 介面 ──
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        deadline = time.monotonic() + (self.ttl if ttl is None else ttl)
+        evicted: list[tuple[Hashable, Any]] = []
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = [deadline, value]
+            while len(self._data) > self.maxsize:
+                old_key, (_, old_value) = self._data.popitem(last=False)
+                self._evicted += 1
+                evicted.append((old_key, old_value))
+        for old_key, old_value in evicted:
+            logger.debug("[ttl_registry] %s 超過 %d 筆上限，淘汰 %r", self.name, self.maxsize, old_key)
+            self._notify(old_key, old_value)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            if item[0] > now:
+                if self.sliding:
+                    item[0] = now + self.ttl
+                return item[1]
+            del self._data[key]
+            self._expired += 1
+        self._notify(key, item[1])
+        return default
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def touch(self, key: Hashable, ttl: float | None = None) -> bool:
+        """重設項目期限（從現在起算）；項目不存在時回傳 False。"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return False
+            item[0] = time.monotonic() + (self.ttl if ttl is None else ttl)
+            return True
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self.set(key, value)
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __delitem__(self, key: Hashable) -> None:
+        if self.pop(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    # ── 清除 ──
+
+    def _notify(self, key: Hashable, value: Any) -> None:
+        if self.on_expire is None:
+            return
+        try:
+            self.on_expire(key, value)
+        except Exception:
+            logger.exception("[ttl_registry] %s on_expire 失敗 key=%r", self.name, key)
+
+    def sweep(self) -> int:
+        """移除所有逾期項目，回傳移除數。"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [(k, item[1]) for k, item in self._data.items() if item[0] <= now]
+            for k, _ in expired:
+                del self._data[k]
+            self._expired += len(expired)
+        for k, value in expired:
+            self._notify(k, value)
+        return len(expired)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            values = [item[1] for item in self._data.values()]
+            stats = {
+                "entries": len(values),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "expired": self._expired,
+                "evicted": self._evicted,
+            }
+        stats["approx_bytes"] = sum(_approx_size(v) for v in values)
+        return stats
+
+
+_registries: list[TTLRegistry] = []
+_sweeper: asyncio.Task | None = None
+
+
+def sweep_all() -> int:
+    return sum(registry.sweep() for registry in _registries)
+
+
+async def _sweep_loop(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = sweep_all()
+        except Exception:
+            logger.exception("[ttl_registry] 背景清除失敗")
+            continue
+        if removed:
+            logger.debug("[ttl_registry] 清除 %d 筆逾期項目", removed)
+
+
+def start_sweeper(interval: float = SWEEP_INTERVAL) -> None:
+    """在目前的 event loop 啟動背景清除（重複呼叫無作用）。on_expire 因此在 event loop 上執行。"""
+    global _sweeper
+    if _sweeper is None or _sweeper.done():
+        _sweeper = asyncio.get_running_loop().create_task(_sweep_loop(interval))
+
+
+async def stop_sweeper() -> None:
+    global _sweeper
+    task, _sweeper = _sweeper, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+def get_all_stats() -> dict:
+    return {registry.name: registry.stats() for registry in _registries}